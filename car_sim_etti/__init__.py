@@ -1,5 +1,7 @@
+import getpass
 import logging
 import os
+import platform
 import sys
 
 from time import gmtime, strftime
@@ -11,8 +13,8 @@ APP_NAME = 'CarSim ETTI'
 APP_SLUG = 'car_sim_etti'
 
 
-STATION = os.environ['COMPUTERNAME']
-USER = os.getlogin()
+STATION = os.environ.get('COMPUTERNAME', platform.node())
+USER = getpass.getuser()
 
 CURRENT_DIR = os.path.dirname(__file__)
 if getattr(sys, 'frozen', False):
@@ -1,12 +1,12 @@
-import json
 import logging
-import numpy
 import os
 import sys
 import threading
 
 
-from time import sleep, time as now
+from collections import OrderedDict
+
+from time import gmtime, sleep, strftime, time as now
 
 from PyQt5 import QtWidgets
 from PyQt5.QtWidgets import QApplication, QMainWindow
@@ -14,9 +14,12 @@ from PyQt5.QtGui import QIcon, QPixmap, QFont
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
 
-from car_sim_etti import settings, APP_SLUG
+from car_sim_etti import settings, APP_SLUG, LOG_DIR
 from car_sim_etti.utils.gauge import AnalogGaugeWidget
+from car_sim_etti.utils.frame_commit import FrameCommitter
+from car_sim_etti.utils.frame_timing import FrameTimingRecorder
 from car_sim_etti.utils.data_viewer import DataViewer, DataViewerFull, Signal as PlotterSignal
+from car_sim_etti.utils.hil_output import HilOutputStreamer, create_transport
 from car_sim_etti.utils.generic import (
     NOT_AVAILABLE,
 
@@ -36,9 +39,26 @@ from car_sim_etti.utils.generic import (
 
     BRAKING_SYSTEM_OVERVIEW_IMG,
 
-    sim_profile_valid,
     __get_fps_growth__,
 )
+from car_sim_etti.utils.profile_cache import ProfileCache
+from car_sim_etti.utils.profile_catalog import ProfileCatalog
+from car_sim_etti.utils.profile_format import PROFILE_EXTENSION
+from car_sim_etti.utils.profile_preparation import PreparationPipeline, prepare_simulation_profile
+from car_sim_etti.utils.scheduler import DeadlineScheduler
+from car_sim_etti.utils.simulation_engine import FrameSink, SimulationEngine
+from car_sim_etti.utils.wss_faults import (
+    WHEEL_FL,
+    WHEEL_FR,
+    WHEEL_RL,
+    WHEEL_RR,
+
+    WSS_FAULT_NONE,
+    WSS_FAULT_TYPES,
+
+    WssFault,
+    WssFaultSet,
+)
 
 LOGGER = logging.getLogger(APP_SLUG)
 
@@ -50,44 +70,186 @@ CURRENT_DIR = os.path.dirname(__file__)
 SIM_PROFILES_PATH = os.path.join(CURRENT_DIR, 'static', 'simulation_profiles', 'ABS')
 
 
-class SimulationThread(QThread):
+class SimulationThread(QThread, FrameSink):
     """SimulationThread
 
+        Plays the simulation engine on absolute deadlines and forwards its frames to the GUI thread.
     """
-    counted = pyqtSignal(int)
+    frame_emitted = pyqtSignal(object)
+    playback_finished = pyqtSignal(bool)
     running = False
-    stop_sim_signal = False
 
-    def __init__(self, period=.01):
+    def __init__(self, engine, policy=settings.SIMULATION_TICK_POLICY):
+        """
+
+        :param engine: simulation engine, its clock is replaced by a deadline scheduler
+        :param policy: late ticks policy, one of TICK_POLICIES
+        """
         super(SimulationThread, self).__init__()
-        self.period = period
+        self.engine = engine
+        self.scheduler = DeadlineScheduler(engine.period, policy=policy)
+        self.engine.clock = self.scheduler
+        self.engine.timeout = SIMULATION_THREAD_TIMEOUT
+        self.engine.add_sink(self)
+        self.latest_frame_tick = -1
+
+    @property
+    def timing_stats(self):
+        return self.scheduler.stats
+
+    def stop(self):
+        self.engine.stop()
+
+    def on_frame(self, frame):
+        self.latest_frame_tick = frame.tick
+        self.frame_emitted.emit(frame)
+
+    def on_stop(self, engine, completed):
+        self.playback_finished.emit(completed)
 
     def run(self):
 
-        count = 0
-        loop_index = 0
         LOGGER.info('Simulation thread started!')
         self.running = True
-        start = now()
-        while count < SIMULATION_THREAD_TIMEOUT:
+        completed = self.engine.run()
+        self.running = False
 
-            if self.stop_sim_signal:
-                end = now()
-                LOGGER.info('Simulation thread stopped! {}s'.format(end - start))
-                self.running = False
-                sleep(1)
-                break
+        if completed:
+            LOGGER.info('Simulation thread finished! {}s'.format(self.scheduler.elapsed()))
+        elif self.engine.stopped:
+            LOGGER.info('Simulation thread stopped! {}s'.format(self.scheduler.elapsed()))
+        else:
+            LOGGER.info('Simulation thread stopped after timeout [{}] reached! {}s'
+                        .format(SIMULATION_THREAD_TIMEOUT, self.scheduler.elapsed()))
+        LOGGER.info('Simulation timing: {}'.format(self.timing_stats))
 
-            count += self.period
-            self.counted.emit(loop_index)
-            loop_index += 1
 
-            sleep(self.period)
+def __build_plot_signals__(signals):
+    """__build_plot_signals__
 
-        if not self.stop_sim_signal:
-            end = now()
-            LOGGER.info('Simulation thread stopped after timeout [{}] reached! {}s'
-                        .format(SIMULATION_THREAD_TIMEOUT, end - start))
+        Build data viewers signals.
+    :param signals: prepared signals, plot signals data are views of it
+    :type signals: SignalStore
+    :return: velocity and pressure plot signals
+    :rtype: tuple
+    """
+    velocity_plot_signals = []
+
+    fl_vel_p_signal_data = signals[SIGNAL_FL_VEL]
+
+    fl_vel_p_signal = PlotterSignal(
+        label='FL_SPEED',
+        color='#ff8000',
+        data=fl_vel_p_signal_data
+    )
+    velocity_plot_signals.append(fl_vel_p_signal)
+
+    fr_vel_p_signal_data = signals[SIGNAL_FR_VEL]
+
+    fr_vel_p_signal = PlotterSignal(
+        label='FR_SPEED',
+        color='#848000',
+        data=fr_vel_p_signal_data
+    )
+    velocity_plot_signals.append(fr_vel_p_signal)
+
+    rl_vel_p_signal_data = signals[SIGNAL_RL_VEL]
+
+    rl_vel_p_signal = PlotterSignal(
+        label='RL_SPEED',
+        color='#bb4f66',
+        data=rl_vel_p_signal_data
+    )
+    velocity_plot_signals.append(rl_vel_p_signal)
+
+    rr_vel_p_signal_data = signals[SIGNAL_RR_VEL]
+
+    rr_vel_p_signal = PlotterSignal(
+        label='RR_SPEED',
+        color='#09dd66',
+        data=rr_vel_p_signal_data
+    )
+    velocity_plot_signals.append(rr_vel_p_signal)
+        
+    pressure_plot_signals = []
+
+    fl_pres_p_signal_data = signals[SIGNAL_FL_PRES]
+
+    fl_pres_p_signal = PlotterSignal(
+        label='FL_PRES',
+        color='#64A36B',
+        data=fl_pres_p_signal_data
+    )
+    pressure_plot_signals.append(fl_pres_p_signal)
+
+    fr_pres_p_signal_data = signals[SIGNAL_FR_PRES]
+
+    fr_pres_p_signal = PlotterSignal(
+        label='FR_PRES',
+        color='#64A391',
+        data=fr_pres_p_signal_data
+    )
+    pressure_plot_signals.append(fr_pres_p_signal)
+
+    rl_pres_p_signal_data = signals[SIGNAL_RL_PRES]
+
+    rl_pres_p_signal = PlotterSignal(
+        label='RL_PRES',
+        color='#648DA3',
+        data=rl_pres_p_signal_data
+    )
+    pressure_plot_signals.append(rl_pres_p_signal)
+
+    rr_pres_p_signal_data = signals[SIGNAL_RR_PRES]
+
+    rr_pres_p_signal = PlotterSignal(
+        label='RR_PRES',
+        color='#7164A3',
+        data=rr_pres_p_signal_data
+    )
+    pressure_plot_signals.append(rr_pres_p_signal)
+
+    return velocity_plot_signals, pressure_plot_signals
+
+
+class ProfileLoaderThread(QThread):
+    """ProfileLoaderThread
+
+        Prepare simulation profile away from the GUI thread. Prepared signals are handed over once, through the
+        loaded signal.
+    """
+    progress = pyqtSignal(int, str)
+    loaded = pyqtSignal(object, object, object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, file, target_speed, wss_faults, skip_until_index, seed, pipeline):
+        super(ProfileLoaderThread, self).__init__()
+        self.file = file
+        self.target_speed = target_speed
+        self.wss_faults = wss_faults
+        self.skip_until_index = skip_until_index
+        self.seed = seed
+        self.pipeline = pipeline
+
+    def run(self):
+        start = now()
+        prepared = prepare_simulation_profile(
+            self.file,
+            target_speed=self.target_speed,
+            wss_faults=self.wss_faults,
+            skip_until_index=self.skip_until_index,
+            seed=self.seed,
+            pipeline=self.pipeline,
+            progress=self.progress.emit,
+        )
+        if prepared is None:
+            self.failed.emit('Invalid simulation profile! {}'.format(self.file))
+            return
+
+        velocity_plot_signals, pressure_plot_signals = __build_plot_signals__(prepared.signals)
+
+        LOGGER.info('Simulation profile prepared in {:.3f}s! {}'.format(now() - start, self.pipeline.stats()))
+        self.loaded.emit(prepared, velocity_plot_signals, pressure_plot_signals)
 
 
 class CarSimETTI(QMainWindow):
@@ -110,7 +272,11 @@ class CarSimETTI(QMainWindow):
         self.rl_pres = []
         self.rr_pres = []
 
-        self.wss_error = 'none'
+        self.wss_faults = WssFaultSet()
+
+        # skip index and noise seed drawn per simulation profile file, kept until reshuffled so prepared profiles
+        # get reused by the preparation pipeline
+        self.profile_draws = {}
 
         # widgets
         # widgets generic
@@ -118,6 +284,7 @@ class CarSimETTI(QMainWindow):
         self.start_sim_profile_button = None
         self.load_and_start_sim_profile_button = None
         self.stop_sim_profile_button = None
+        self.reshuffle_sim_profile_button = None
         self.time_base_combo_box = None
         self.simulation_profile_label = None
 
@@ -159,8 +326,16 @@ class CarSimETTI(QMainWindow):
         self.rl_wss_error_combo_box = None
         self.rr_wss_error_combo_box = None
 
+        self.profile_catalog = ProfileCatalog(SIM_PROFILES_PATH)
+        self.profile_cache = ProfileCache(max_bytes=settings.PROFILE_CACHE_MAX_BYTES)
+        self.preparation_pipeline = PreparationPipeline(self.profile_cache)
+
+        self.profile_loader_thread = None
+        self.__start_when_loaded__ = False
+
         self.simulation_thread = None
         self.simulation_profile = None
+        self.prepared_profile = None
         self.simulation_running = False
         self.simulation_index = 0
         self.simulation_index_growth = -1
@@ -180,6 +355,16 @@ class CarSimETTI(QMainWindow):
         self.data_viewer_full = DataViewerFull()
         self.data_viewer_full.show()
 
+        self.frame_timing = FrameTimingRecorder()
+        self.speed_gauge.painted.connect(lambda duration: self.frame_timing.record('gauge_paint', duration))
+        self.timing_hud_label = None
+        self.timing_hud_update = 0
+        if settings.TIMING_HUD:
+            self.__init_timing_hud__()
+
+        self.frame_committer = FrameCommitter(budget=settings.FRAME_COMMIT_BUDGET)
+        self.__bind_frame_committer__()
+
     def __reset_simulation_signals__(self):
         """__reset_simulation_signals__
         
@@ -210,14 +395,21 @@ class CarSimETTI(QMainWindow):
         self.rl_pres = []
         self.rr_pres = []
 
-    def load_simulation_profile(self, specific_file=None, skip_until_index=0):
+    def load_simulation_profile(self, specific_file=None, skip_until_index=0, seed=None, start=False):
         """load_simulation_profile
 
-            Load signals values from simulation profile file.
+            Load signals values from simulation profile file. Profile is prepared on a worker thread, signals are
+            available once on_profile_loaded is called.
+        :param seed: noise seed, same seed yields same signals
+        :param start: start simulation once profile is loaded
         :return: process result
         :rtype: bool
         """
-        if specific_file is None:
+        if self.profile_loader_thread is not None and self.profile_loader_thread.isRunning():
+            LOGGER.warning('Simulation profile already loading!')
+            return False
+
+        if not specific_file:
             file = self.__get_file__()
             if not file:
                 warning = 'Invalid simulation profile file! {}'.format(file)
@@ -228,278 +420,96 @@ class CarSimETTI(QMainWindow):
 
         # LOGGER.info('Loading simulation profile: {}'.format(file))
 
-        try:
-            file_handler = open(file, 'r')
-            file_content = file_handler.read()
-            file_handler.close()
-        except Exception as err:
-            error = 'Failed to load simulation profile! {}'.format(err)
-            LOGGER.error(error)
-            return False
-
-        try:
-            sim_profile = json.loads(file_content)
-        except Exception as err:
-            error = 'Failed to parse simulation profile file content! {}'.format(err)
-            LOGGER.error(error)
-            return False
-
-        if not sim_profile_valid(sim_profile):
-            error = 'Invalid simulation profile! {}'.format(file)
-            LOGGER.error(error)
-            return False
-
-        self.simulation_profile = sim_profile
-        del sim_profile
-
-        self.simulation_index_growth = 2
-        self.simulation_period = 0.04
-
-        self.__reset_simulation_signals__()
-
-        self.abs_ref = self.simulation_profile[SIGNAL_ABS_REF]
-
-        # LOGGER.info('MAX SPEED: {}km/h'.format(max(self.abs_ref)))
-
-        self.fl_vel = self.simulation_profile[SIGNAL_FL_VEL]
-        self.fr_vel = self.simulation_profile[SIGNAL_FR_VEL]
-        self.rl_vel = self.simulation_profile[SIGNAL_RL_VEL]
-        self.rr_vel = self.simulation_profile[SIGNAL_RR_VEL]
-
-        self.fl_pres = self.simulation_profile[SIGNAL_FL_PRES]
-        self.fr_pres = self.simulation_profile[SIGNAL_FR_PRES]
-        self.rl_pres = self.simulation_profile[SIGNAL_RL_PRES]
-        self.rr_pres = self.simulation_profile[SIGNAL_RR_PRES]
-
-        self.abs_ref = self.abs_ref[skip_until_index:]
-
-        self.fl_vel = self.fl_vel[skip_until_index:]
-        self.fr_vel = self.fr_vel[skip_until_index:]
-        self.rl_vel = self.rl_vel[skip_until_index:]
-        self.rr_vel = self.rr_vel[skip_until_index:]
-
-        self.fl_pres = self.fl_pres[skip_until_index:]
-        self.fr_pres = self.fr_pres[skip_until_index:]
-        self.rl_pres = self.rl_pres[skip_until_index:]
-        self.rr_pres = self.rr_pres[skip_until_index:]
-
-        for index, abs_ref in enumerate(self.fl_vel):
-            if abs_ref > self.target_speed + 1 and self.abs_ref[index] > self.target_speed + 1:
-                raw_time = int(str(now()).split('.')[1])
-                offset = (raw_time % 20) / 10
-                sleep(0.001)
-                self.fl_vel[index] = float('{0:.2f}'.format(self.target_speed + 0.69 + offset))
-
-        for index, abs_ref in enumerate(self.fr_vel):
-            if abs_ref > self.target_speed + 1 and self.abs_ref[index] > self.target_speed + 1:
-                raw_time = int(str(now()).split('.')[1])
-                offset = (raw_time % 20) / 10
-                sleep(0.001)
-                self.fr_vel[index] = float('{0:.2f}'.format(self.target_speed + 0.69 + offset))
-
-        for index, abs_ref in enumerate(self.rl_vel):
-            if abs_ref > self.target_speed + 1 and self.abs_ref[index] > self.target_speed + 1:
-                raw_time = int(str(now()).split('.')[1])
-                offset = (raw_time % 20) / 10
-                sleep(0.001)
-                self.rl_vel[index] = float('{0:.2f}'.format(self.target_speed + 0.69 + offset))
-
-        for index, abs_ref in enumerate(self.rr_vel):
-            if abs_ref > self.target_speed + 1 and self.abs_ref[index] > self.target_speed + 1:
-                raw_time = int(str(now()).split('.')[1])
-                offset = (raw_time % 20) / 10
-                sleep(0.001)
-                self.rr_vel[index] = float('{0:.2f}'.format(self.target_speed + 0.69 + offset))
-
-        for index, abs_ref in enumerate(self.abs_ref):
-            if abs_ref > self.target_speed + 1:
-                raw_time = int(str(now()).split('.')[1])
-                offset = (raw_time % 20) / 10
-                sleep(0.001)
-                self.abs_ref[index] = self.target_speed + offset
-
-        self.simulation_stamps = len(self.fl_vel)
-
-        LOGGER.info('Treating WSS error: {}'.format(self.wss_error))
-        if self.wss_error == 'none':
-            pass
-        elif 'gnd' in self.wss_error:
-            for index in range(self.simulation_stamps):
-                raw_time = int(str(now()).split('.')[1])
-                offset = (raw_time % 169) / 100
-                press_l = 39.5 + (raw_time % 11) / 10
-                press_r = 39.5 + (raw_time % 9) / 10
-                sleep(0.0001)
-                if 'fl' in self.wss_error:
-                    self.fl_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.fl_pres[index] > 5:
-                        self.fl_pres[index] = press_l
-                        self.fr_pres[index] = press_r
-                elif 'fr' in self.wss_error:
-                    self.fr_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.fl_pres[index] > 5:
-                        self.fl_pres[index] = press_l
-                        self.fr_pres[index] = press_r
-                elif 'rl' in self.wss_error:
-                    self.rl_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.rl_pres[index] > 5:
-                        self.rl_pres[index] = press_l
-                        self.rr_pres[index] = press_r
-                elif 'rr' in self.wss_error:
-                    self.rr_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.rl_pres[index] > 5:
-                        self.rl_pres[index] = press_l
-                        self.rr_pres[index] = press_r
-
-        elif 'vcc' in self.wss_error:
-            for index in range(self.simulation_stamps):
-                raw_time = int(str(now()).split('.')[1])
-                offset = 253 + (raw_time % 20) / 10
-                press_l = 39.5 + (raw_time % 11) / 10
-                press_r = 39.5 + (raw_time % 9) / 10
-                sleep(0.0001)
-                if 'fl' in self.wss_error:
-                    self.fl_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.fl_pres[index] > 5:
-                        self.fl_pres[index] = press_l
-                        self.fr_pres[index] = press_r
-                elif 'fr' in self.wss_error:
-                    self.fr_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.fl_pres[index] > 5:
-                        self.fl_pres[index] = press_l
-                        self.fr_pres[index] = press_r
-                elif 'rl' in self.wss_error:
-                    self.rl_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.rl_pres[index] > 5:
-                        self.rl_pres[index] = press_l
-                        self.rr_pres[index] = press_r
-                elif 'rr' in self.wss_error:
-                    self.rr_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.rl_pres[index] > 5:
-                        self.rl_pres[index] = press_l
-                        self.rr_pres[index] = press_r
-
-        elif 'open' in self.wss_error:
-            for index in range(self.simulation_stamps):
-                raw_time = int(str(now()).split('.')[1])
-                offset = 10 + (raw_time % 235)
-                press_l = 39.5 + (raw_time % 11) / 10
-                press_r = 39.5 + (raw_time % 9) / 10
-                sleep(0.00069)
-                if 'fl' in self.wss_error:
-                    self.fl_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.fl_pres[index] > 5:
-                        self.fl_pres[index] = press_l
-                        self.fr_pres[index] = press_r
-                elif 'fr' in self.wss_error:
-                    self.fr_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.fl_pres[index] > 5:
-                        self.fl_pres[index] = press_l
-                        self.fr_pres[index] = press_r
-                elif 'rl' in self.wss_error:
-                    self.rl_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.rl_pres[index] > 5:
-                        self.rl_pres[index] = press_l
-                        self.rr_pres[index] = press_r
-                elif 'rr' in self.wss_error:
-                    self.rr_vel[index] = float('{0:.2f}'.format(offset))
-                    if self.rl_pres[index] > 5:
-                        self.rl_pres[index] = press_l
-                        self.rr_pres[index] = press_r
-
-        LOGGER.info('Simulation profile successfully loaded!')
-
-        velocity_plot_signals = []
-
-        fl_vel_p_signal_data = numpy.zeros(self.simulation_stamps)
-        for index, val in enumerate(self.fl_vel):
-            fl_vel_p_signal_data[index] = val
+        self.__start_when_loaded__ = start
+        self.load_and_start_sim_profile_button.setEnabled(False)
+        self.load_sim_profile_button.setEnabled(False)
+        self.start_sim_profile_button.setEnabled(False)
 
-        fl_vel_p_signal = PlotterSignal(
-            label='FL_SPEED',
-            color='#ff8000',
-            data=fl_vel_p_signal_data
+        self.profile_loader_thread = ProfileLoaderThread(
+            file,
+            target_speed=self.target_speed,
+            wss_faults=self.wss_faults,
+            skip_until_index=skip_until_index,
+            seed=seed,
+            pipeline=self.preparation_pipeline,
         )
-        velocity_plot_signals.append(fl_vel_p_signal)
+        self.profile_loader_thread.progress.connect(self.on_profile_loader_progress)
+        self.profile_loader_thread.loaded.connect(self.on_profile_loaded)
+        self.profile_loader_thread.failed.connect(self.on_profile_load_failed)
+        self.profile_loader_thread.start()
+        return True
 
-        fr_vel_p_signal_data = numpy.zeros(self.simulation_stamps)
-        for index, val in enumerate(self.fr_vel):
-            fr_vel_p_signal_data[index] = val
+    def on_profile_loader_progress(self, percent, stage):
+        """on_profile_loader_progress
 
-        fr_vel_p_signal = PlotterSignal(
-            label='FR_SPEED',
-            color='#848000',
-            data=fr_vel_p_signal_data
-        )
-        velocity_plot_signals.append(fr_vel_p_signal)
+            Display simulation profile preparation progress.
+        :param percent: preparation progress
+        :type percent: int
+        :param stage: preparation stage description
+        :type stage: str
+        :return: None
+        """
+        self.load_and_start_sim_profile_button.setText('Loading {}%'.format(percent))
+        self.simulation_progress_pbar.setValue(percent)
+        LOGGER.info('Preparing profile: {} ({}%)'.format(stage, percent))
 
-        rl_vel_p_signal_data = numpy.zeros(self.simulation_stamps)
-        for index, val in enumerate(self.rl_vel):
-            rl_vel_p_signal_data[index] = val
+    def on_profile_load_failed(self, error):
+        """on_profile_load_failed
 
-        rl_vel_p_signal = PlotterSignal(
-            label='RL_SPEED',
-            color='#bb4f66',
-            data=rl_vel_p_signal_data
-        )
-        velocity_plot_signals.append(rl_vel_p_signal)
+        :param error: failure description
+        :type error: str
+        :return: None
+        """
+        LOGGER.error(error)
+        self.__enable_profile_loading__()
 
-        rr_vel_p_signal_data = numpy.zeros(self.simulation_stamps)
-        for index, val in enumerate(self.rr_vel):
-            rr_vel_p_signal_data[index] = val
+    def __enable_profile_loading__(self):
+        """__enable_profile_loading__
 
-        rr_vel_p_signal = PlotterSignal(
-            label='RR_SPEED',
-            color='#09dd66',
-            data=rr_vel_p_signal_data
-        )
-        velocity_plot_signals.append(rr_vel_p_signal)
-        
-        pressure_plot_signals = []
+            Restore profile loading widgets after preparation.
+        :return: None
+        """
+        self.load_and_start_sim_profile_button.setEnabled(True)
+        self.load_and_start_sim_profile_button.setText('Start sim profile')
+        self.load_sim_profile_button.setEnabled(True)
+        self.start_sim_profile_button.setEnabled(True)
+        self.simulation_progress_pbar.setValue(0)
 
-        fl_pres_p_signal_data = numpy.zeros(self.simulation_stamps)
-        for index, val in enumerate(self.fl_pres):
-            fl_pres_p_signal_data[index] = val
+    def on_profile_loaded(self, prepared, velocity_plot_signals, pressure_plot_signals):
+        """on_profile_loaded
 
-        fl_pres_p_signal = PlotterSignal(
-            label='FL_PRES',
-            color='#64A36B',
-            data=fl_pres_p_signal_data
-        )
-        pressure_plot_signals.append(fl_pres_p_signal)
+            Take over prepared simulation profile, on the GUI thread.
+        :param prepared: prepared simulation profile
+        :type prepared: PreparedProfile
+        :param velocity_plot_signals: velocity data viewer signals
+        :type velocity_plot_signals: list of PlotterSignal
+        :param pressure_plot_signals: pressure data viewer signals
+        :type pressure_plot_signals: list of PlotterSignal
+        :return: None
+        """
+        self.simulation_profile = prepared.profile
+        self.prepared_profile = prepared
 
-        fr_pres_p_signal_data = numpy.zeros(self.simulation_stamps)
-        for index, val in enumerate(self.fr_pres):
-            fr_pres_p_signal_data[index] = val
+        self.simulation_index_growth = 2
+        self.simulation_period = 0.04
 
-        fr_pres_p_signal = PlotterSignal(
-            label='FR_PRES',
-            color='#64A391',
-            data=fr_pres_p_signal_data
-        )
-        pressure_plot_signals.append(fr_pres_p_signal)
+        self.__reset_simulation_signals__()
 
-        rl_pres_p_signal_data = numpy.zeros(self.simulation_stamps)
-        for index, val in enumerate(self.rl_pres):
-            rl_pres_p_signal_data[index] = val
+        self.abs_ref = prepared.signals[SIGNAL_ABS_REF]
 
-        rl_pres_p_signal = PlotterSignal(
-            label='RL_PRES',
-            color='#648DA3',
-            data=rl_pres_p_signal_data
-        )
-        pressure_plot_signals.append(rl_pres_p_signal)
+        self.fl_vel = prepared.signals[SIGNAL_FL_VEL]
+        self.fr_vel = prepared.signals[SIGNAL_FR_VEL]
+        self.rl_vel = prepared.signals[SIGNAL_RL_VEL]
+        self.rr_vel = prepared.signals[SIGNAL_RR_VEL]
 
-        rr_pres_p_signal_data = numpy.zeros(self.simulation_stamps)
-        for index, val in enumerate(self.rr_pres):
-            rr_pres_p_signal_data[index] = val
+        self.fl_pres = prepared.signals[SIGNAL_FL_PRES]
+        self.fr_pres = prepared.signals[SIGNAL_FR_PRES]
+        self.rl_pres = prepared.signals[SIGNAL_RL_PRES]
+        self.rr_pres = prepared.signals[SIGNAL_RR_PRES]
 
-        rr_pres_p_signal = PlotterSignal(
-            label='RR_PRES',
-            color='#7164A3',
-            data=rr_pres_p_signal_data
-        )
-        pressure_plot_signals.append(rr_pres_p_signal)
+        self.simulation_stamps = prepared.stamps
+
+        LOGGER.info('Simulation profile successfully loaded!')
 
         all_signals = []
         all_signals.extend(velocity_plot_signals)
@@ -512,7 +522,9 @@ class CarSimETTI(QMainWindow):
         except Exception as exception:
             LOGGER.error(exception)
 
-        return True
+        self.__enable_profile_loading__()
+        if self.__start_when_loaded__:
+            self.start_simulation()
 
     def __get_file__(self):
         """__get_file__
@@ -523,7 +535,8 @@ class CarSimETTI(QMainWindow):
         options = QtWidgets.QFileDialog.Options()
         options |= QtWidgets.QFileDialog.DontUseNativeDialog
         file, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Load simulation profile", "",
-                                                        "JSON (*.json);;All Files (*);;Python Files (*.py)",
+                                                        "Simulation profile (*{});;JSON (*.json);;All Files (*)"
+                                                        .format(PROFILE_EXTENSION),
                                                         options=options)
         if file:
             return file
@@ -637,10 +650,8 @@ class CarSimETTI(QMainWindow):
         self.time_base_combo_box.currentTextChanged.connect(self.update_time_base)
 
         self.fl_wss_error_combo_box = QtWidgets.QComboBox(self)
-        self.fl_wss_error_combo_box.addItem('none')
-        self.fl_wss_error_combo_box.addItem('gnd')
-        self.fl_wss_error_combo_box.addItem('vcc')
-        self.fl_wss_error_combo_box.addItem('open')
+        self.fl_wss_error_combo_box.addItem(WSS_FAULT_NONE)
+        self.fl_wss_error_combo_box.addItems(WSS_FAULT_TYPES)
         self.fl_wss_error_combo_box.setCurrentIndex(0)
         self.fl_wss_error_combo_box.resize(50, 20)
         self.fl_wss_error_combo_box.move(settings.FL_PRES_PBAR_X - 55, settings.FL_PRES_PBAR_Y + 70)
@@ -654,10 +665,8 @@ class CarSimETTI(QMainWindow):
         wss_error_label.show()
 
         self.fr_wss_error_combo_box = QtWidgets.QComboBox(self)
-        self.fr_wss_error_combo_box.addItem('none')
-        self.fr_wss_error_combo_box.addItem('gnd')
-        self.fr_wss_error_combo_box.addItem('vcc')
-        self.fr_wss_error_combo_box.addItem('open')
+        self.fr_wss_error_combo_box.addItem(WSS_FAULT_NONE)
+        self.fr_wss_error_combo_box.addItems(WSS_FAULT_TYPES)
         self.fr_wss_error_combo_box.setCurrentIndex(0)
         self.fr_wss_error_combo_box.resize(50, 20)
         self.fr_wss_error_combo_box.move(settings.FR_PRES_PBAR_X - 55, settings.FR_PRES_PBAR_Y + 70)
@@ -671,10 +680,8 @@ class CarSimETTI(QMainWindow):
         wss_error_label.show()
 
         self.rl_wss_error_combo_box = QtWidgets.QComboBox(self)
-        self.rl_wss_error_combo_box.addItem('none')
-        self.rl_wss_error_combo_box.addItem('gnd')
-        self.rl_wss_error_combo_box.addItem('vcc')
-        self.rl_wss_error_combo_box.addItem('open')
+        self.rl_wss_error_combo_box.addItem(WSS_FAULT_NONE)
+        self.rl_wss_error_combo_box.addItems(WSS_FAULT_TYPES)
         self.rl_wss_error_combo_box.setCurrentIndex(0)
         self.rl_wss_error_combo_box.resize(50, 20)
         self.rl_wss_error_combo_box.move(settings.RL_PRES_PBAR_X + 25, settings.RL_PRES_PBAR_Y + 70)
@@ -688,10 +695,8 @@ class CarSimETTI(QMainWindow):
         wss_error_label.show()
 
         self.rr_wss_error_combo_box = QtWidgets.QComboBox(self)
-        self.rr_wss_error_combo_box.addItem('none')
-        self.rr_wss_error_combo_box.addItem('gnd')
-        self.rr_wss_error_combo_box.addItem('vcc')
-        self.rr_wss_error_combo_box.addItem('open')
+        self.rr_wss_error_combo_box.addItem(WSS_FAULT_NONE)
+        self.rr_wss_error_combo_box.addItems(WSS_FAULT_TYPES)
         self.rr_wss_error_combo_box.setCurrentIndex(0)
         self.rr_wss_error_combo_box.resize(50, 20)
         self.rr_wss_error_combo_box.move(settings.RR_PRES_PBAR_X + 25, settings.RR_PRES_PBAR_Y + 70)
@@ -739,6 +744,15 @@ class CarSimETTI(QMainWindow):
         self.stop_sim_profile_button.setEnabled(False)
         self.stop_sim_profile_button.show()
 
+        self.reshuffle_sim_profile_button = QtWidgets.QPushButton(self)
+        self.reshuffle_sim_profile_button.setText('Reshuffle')
+        # noinspection PyTypeChecker
+        self.reshuffle_sim_profile_button.clicked.connect(self.reshuffle_simulation_profiles)
+        self.reshuffle_sim_profile_button.move(180, self.stop_sim_profile_button.y() +
+                                               self.stop_sim_profile_button.height() + 10)
+        self.reshuffle_sim_profile_button.resize(100, 30)
+        self.reshuffle_sim_profile_button.show()
+
         braking_system_overview_pixmap = QPixmap(BRAKING_SYSTEM_OVERVIEW_IMG)
         self.braking_system_overview_label = QtWidgets.QLabel(self)
         self.braking_system_overview_label.setPixmap(braking_system_overview_pixmap)
@@ -912,104 +926,80 @@ class CarSimETTI(QMainWindow):
         self.simulation_progress_pbar.show()
 
     def __update_wss_error__(self):
-        """
+        """__update_wss_error__
 
-        :return:
+            Collect simulated wheel speed sensor faults, any number of wheels may be faulty at once.
+        :return: None
         """
-        fl_wss_err = str(self.fl_wss_error_combo_box.currentText())
-        fr_wss_err = str(self.fr_wss_error_combo_box.currentText())
-        rl_wss_err = str(self.rl_wss_error_combo_box.currentText())
-        rr_wss_err = str(self.rr_wss_error_combo_box.currentText())
-
-        if fl_wss_err == 'none' and fr_wss_err == 'none' and rl_wss_err == 'none' and rr_wss_err == 'none':
-            self.wss_error = 'none'
-            self.fl_wss_error_combo_box.setEnabled(True)
-            self.fr_wss_error_combo_box.setEnabled(True)
-            self.rl_wss_error_combo_box.setEnabled(True)
-            self.rr_wss_error_combo_box.setEnabled(True)
-            LOGGER.info('wss err: {}'.format(self.wss_error))
-            return
+        wss_error_combo_boxes = (
+            (WHEEL_FL, self.fl_wss_error_combo_box),
+            (WHEEL_FR, self.fr_wss_error_combo_box),
+            (WHEEL_RL, self.rl_wss_error_combo_box),
+            (WHEEL_RR, self.rr_wss_error_combo_box),
+        )
+
+        faults = []
+        for wheel, combo_box in wss_error_combo_boxes:
+            wss_err = str(combo_box.currentText())
+            if wss_err != WSS_FAULT_NONE:
+                faults.append(WssFault(wheel, wss_err))
 
-        if fl_wss_err != 'none':
-            self.wss_error = fl_wss_err + '_fl'
-            self.fl_wss_error_combo_box.setEnabled(True)
-            self.fr_wss_error_combo_box.setEnabled(False)
-            self.rl_wss_error_combo_box.setEnabled(False)
-            self.rr_wss_error_combo_box.setEnabled(False)
-
-        elif fr_wss_err != 'none':
-            self.wss_error = fr_wss_err + '_fr'
-            self.fl_wss_error_combo_box.setEnabled(False)
-            self.fr_wss_error_combo_box.setEnabled(True)
-            self.rl_wss_error_combo_box.setEnabled(False)
-            self.rr_wss_error_combo_box.setEnabled(False)
-
-        elif rl_wss_err != 'none':
-            self.wss_error = rl_wss_err + '_rl'
-            self.fl_wss_error_combo_box.setEnabled(False)
-            self.fr_wss_error_combo_box.setEnabled(False)
-            self.rl_wss_error_combo_box.setEnabled(True)
-            self.rr_wss_error_combo_box.setEnabled(False)
-
-        elif rr_wss_err != 'none':
-            self.wss_error = rr_wss_err + '_rr'
-            self.fl_wss_error_combo_box.setEnabled(False)
-            self.fr_wss_error_combo_box.setEnabled(False)
-            self.rl_wss_error_combo_box.setEnabled(False)
-            self.rr_wss_error_combo_box.setEnabled(True)
-
-        LOGGER.info('wss err: {}'.format(self.wss_error))
+        self.wss_faults = WssFaultSet(faults)
+        LOGGER.info('wss err: {}'.format(self.wss_faults))
 
     def load_and_start_simulation_profile(self):
         """
 
         :return:
         """
-        sleep(.1)
         LOGGER.info('Preparing profile...')
-        sleep(.1)
         target_speed = int(self.set_target_speed_slider.value())
         road_friction_coefficient = self.road_friction_coefficient_label.text()
 
-        if target_speed % 10 == 0:
-            formatted_target_speed = target_speed
-        else:
-            formatted_target_speed = (target_speed // 10 + 1) * 10
-
         if '/' in road_friction_coefficient:
-            formatted_road_friction_coefficient = '38'
+            mu, split_mu = [float(value) for value in road_friction_coefficient.split('/')]
         else:
-            formatted_road_friction_coefficient = road_friction_coefficient.replace('.', '')
-
-        if formatted_road_friction_coefficient == '07':  # WARNING
-            formatted_road_friction_coefficient = '06'
-
-        if formatted_road_friction_coefficient == '08':  # WARNING
-            formatted_road_friction_coefficient = '09'
-
-        target_sim_profile = '{}_{}.json'.format(formatted_target_speed, formatted_road_friction_coefficient)
+            mu, split_mu = float(road_friction_coefficient), None
+
+        # profiles may have been added or rewritten since, e.g. by the MDF converter, checked once per start
+        self.profile_catalog.refresh_if_changed()
+        entry = self.profile_catalog.find(target_speed, mu, split_mu)
+        if entry is None:
+            LOGGER.error('No simulation profile available for {}km/h on {} mu!'
+                         .format(target_speed, road_friction_coefficient))
+            return
 
-        profile = 'SPEED: {} -> {}\n'.format(target_speed, formatted_target_speed)
-        profile += 'RFC: {} -> {}\n'.format(road_friction_coefficient, formatted_road_friction_coefficient)
-        profile += 'SP: {}\n'.format(target_sim_profile)
+        profile = 'SPEED: {} -> {}\n'.format(target_speed, entry.speed)
+        profile += 'RFC: {} -> {}/{}\n'.format(road_friction_coefficient, entry.mu, entry.split_mu)
+        profile += 'SP: {}\n'.format(entry.file_name)
 
-        target_sim_profile_path = os.path.join(SIM_PROFILES_PATH, target_sim_profile)
+        target_sim_profile_path = entry.path
         if not RELEASED:
             self.simulation_profile_label.setText('{}'.format(target_sim_profile_path))
 
-        raw_time = int(str(now()).split('.')[1])
-
-        skip_until_index = raw_time % 650
+        draw = self.profile_draws.get(target_sim_profile_path)
+        if draw is None:
+            raw_time = int(str(now()).split('.')[1])
+            draw = self.profile_draws[target_sim_profile_path] = (raw_time % 650, raw_time)
+        skip_until_index, seed = draw
 
         self.target_speed = target_speed
-        if target_speed % 10 == 0:
-            sleep(4)
-        self.load_simulation_profile(specific_file=target_sim_profile_path, skip_until_index=skip_until_index)
+        self.load_simulation_profile(specific_file=target_sim_profile_path, skip_until_index=skip_until_index,
+                                     seed=seed, start=True)
 
         profile += 'SKIP: {}\n'.format(skip_until_index)
+        profile += 'SEED: {}\n'.format(seed)
 
-        # LOGGER.info(profile)
-        self.start_simulation()
+        LOGGER.info(profile)
+
+    def reshuffle_simulation_profiles(self):
+        """reshuffle_simulation_profiles
+
+            Forget drawn skip indexes and seeds, next start of each simulation profile draws new ones.
+        :return: None
+        """
+        self.profile_draws.clear()
+        LOGGER.info('Simulation profiles reshuffled')
 
     def __update_target_speed__(self):
         """
@@ -1044,50 +1034,199 @@ class CarSimETTI(QMainWindow):
         self.simulation_time_base = float(value.replace('x', ''))
         LOGGER.info('Changed simulation time base to {}'.format(self.simulation_time_base))
 
-    def on_thread_counter(self, index):
-        self.simulation_index += self.simulation_index_growth
+    def on_simulation_frame(self, frame):
+        """on_simulation_frame
+
+            Display simulation frame, on the GUI thread.
+        :param frame: simulation frame
+        :type frame: SimulationFrame
+        :return: None
+        """
+        # a newer frame is already queued, displaying this one would only delay it
+        if frame.tick < self.simulation_thread.latest_frame_tick:
+            self.frame_timing.drop_frame()
+            return
 
+        scheduler = self.simulation_thread.scheduler
+        self.frame_timing.begin_frame(frame.tick, frame.index, scheduler.clock() - scheduler.deadline(frame.tick))
+
+        self.simulation_index = frame.index
         self.simulation_progress = int((self.simulation_index * 100) / self.simulation_stamps)
 
-        if self.simulation_progress != self.simulation_progress_old:
-            # self.simulation_progress_label.setText('{}%'.format(self.simulation_progress))
-            self.simulation_progress_old = self.simulation_progress
-            self.simulation_progress_pbar.setValue(self.simulation_progress)
+        self.frame_committer.commit(self.__get_display_state__(frame))
+
+        self.frame_timing.end_frame()
+        if self.timing_hud_label is not None and now() - self.timing_hud_update >= settings.TIMING_HUD_PERIOD:
+            self.__update_timing_hud__()
+
+    def __bind_frame_committer__(self):
+        """__bind_frame_committer__
+
+            Bind display state keys to the widgets showing them, each update timed under its timing section.
+        :return: None
+        """
+        bindings = (
+            ('fl_vel', 'update_simulation_velocity', self.fl_vel_label.setText),
+            ('fr_vel', 'update_simulation_velocity', self.fr_vel_label.setText),
+            ('rl_vel', 'update_simulation_velocity', self.rl_vel_label.setText),
+            ('rr_vel', 'update_simulation_velocity', self.rr_vel_label.setText),
+
+            ('abs_ref', 'update_simulation_velocity', self.speed_gauge.update_value),
+
+            ('fl_pres', 'update_simulation_pressure', self.fl_pres_label.setText),
+            ('fr_pres', 'update_simulation_pressure', self.fr_pres_label.setText),
+            ('rl_pres', 'update_simulation_pressure', self.rl_pres_label.setText),
+            ('rr_pres', 'update_simulation_pressure', self.rr_pres_label.setText),
+
+            ('fl_pres_bar', 'update_simulation_pressure_graphics', self.fl_pres_pbar.setValue),
+            ('fr_pres_bar', 'update_simulation_pressure_graphics', self.fr_pres_pbar.setValue),
+            ('rl_pres_bar', 'update_simulation_pressure_graphics', self.rl_pres_pbar.setValue),
+            ('rr_pres_bar', 'update_simulation_pressure_graphics', self.rr_pres_pbar.setValue),
+
+            ('progress', 'update_simulation_progress', self.simulation_progress_pbar.setValue),
+
+            ('speed_plot', 'speed_plot_redraw', self.data_viewer.speed_plotter.display_data),
+            ('pressure_plot', 'pressure_plot_redraw', self.data_viewer.pressure_plotter.display_data),
+            ('full_plot', 'full_plot_redraw', self.data_viewer_full.plotter.display_data),
+        )
+        for key, section, applier in bindings:
+            self.frame_committer.bind(key, self.frame_timing.timed(section, applier))
+
+    def __init_timing_hud__(self):
+        """__init_timing_hud__
+
+            On screen frame timing overlay.
+        :return: None
+        """
+        self.timing_hud_label = QtWidgets.QLabel(self)
+        self.timing_hud_label.setFont(QFont('Monospace', 7))
+        self.timing_hud_label.setStyleSheet('background-color: rgba(255, 255, 255, 200);')
+        self.timing_hud_label.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.timing_hud_label.move(settings.TIMING_HUD_X, settings.TIMING_HUD_Y)
+        self.timing_hud_label.setText('timing')
+        self.timing_hud_label.raise_()
+        self.timing_hud_label.show()
+
+    def __update_timing_hud__(self):
+        """__update_timing_hud__
+
+        :return: None
+        """
+        lines = ['ticks: {}'.format(self.simulation_thread.timing_stats)] + self.frame_timing.summary()
+        self.timing_hud_label.setText('\n'.join(lines))
+        self.timing_hud_label.adjustSize()
+        self.timing_hud_update = now()
+
+    def __write_timing_file__(self, completed):
+        """__write_timing_file__
 
-        if self.simulation_index > self.simulation_stamps - 1:
+            Write the timing file of the last run, next to the log files.
+        :param completed: True if the whole profile was played
+        :type completed: bool
+        :return: None
+        """
+        file = os.path.join(LOG_DIR, '{}_timing_{}.csv'.format(APP_SLUG, strftime('%Y_%m_%d_%H_%M_%S', gmtime())))
+        header = [
+            'profile: {}'.format(self.prepared_profile.file),
+            'time base: {}, period: {}s, index growth: {}'.format(self.simulation_time_base, self.simulation_period,
+                                                                 self.simulation_index_growth),
+            'completed: {}'.format(completed),
+            'ticks: {}'.format(self.simulation_thread.timing_stats),
+            self.frame_committer.stats(),
+        ]
+        if self.frame_timing.write(file, header):
+            LOGGER.info('Timing file: {}'.format(file))
+
+    def __get_display_state__(self, frame):
+        """__get_display_state__
+
+        :param frame: simulation frame
+        :type frame: SimulationFrame
+        :return: display state, values by key
+        :rtype: OrderedDict
+        """
+        values = frame.values
+        state = OrderedDict()
+
+        state['fl_vel'] = '{}'.format(values[SIGNAL_FL_VEL])
+        state['fr_vel'] = '{}'.format(values[SIGNAL_FR_VEL])
+        state['rl_vel'] = '{}'.format(values[SIGNAL_RL_VEL])
+        state['rr_vel'] = '{}'.format(values[SIGNAL_RR_VEL])
+
+        state['abs_ref'] = values[SIGNAL_ABS_REF]
+
+        state['fl_pres'] = '{}'.format(values[SIGNAL_FL_PRES])
+        state['fr_pres'] = '{}'.format(values[SIGNAL_FR_PRES])
+        state['rl_pres'] = '{}'.format(values[SIGNAL_RL_PRES])
+        state['rr_pres'] = '{}'.format(values[SIGNAL_RR_PRES])
+
+        state['fl_pres_bar'] = int(values[SIGNAL_FL_PRES])
+        state['fr_pres_bar'] = int(values[SIGNAL_FR_PRES])
+        state['rl_pres_bar'] = int(values[SIGNAL_RL_PRES])
+        state['rr_pres_bar'] = int(values[SIGNAL_RR_PRES])
+
+        state['progress'] = self.simulation_progress
+
+        state['speed_plot'] = frame.index
+        state['pressure_plot'] = frame.index
+        state['full_plot'] = frame.index
+
+        return state
+
+    def on_simulation_finished(self, completed):
+        """on_simulation_finished
+
+        :param completed: True if the whole profile was played
+        :type completed: bool
+        :return: None
+        """
+        self.frame_committer.flush()
+        LOGGER.info(self.frame_committer.stats())
+        for line in self.frame_timing.summary():
+            LOGGER.info('Frame timing {}'.format(line))
+        if self.timing_hud_label is not None:
+            self.__update_timing_hud__()
+        if settings.TIMING_FILES:
+            self.__write_timing_file__(completed)
+        if completed:
             self.simulation_index = self.simulation_stamps - 1
-            self.simulation_thread.stop_sim_signal = True
-            self.start_sim_profile_button.setEnabled(True)
-            self.load_and_start_sim_profile_button.setEnabled(True)
-            self.load_and_start_sim_profile_button.setText('Start sim profile')
-            self.data_viewer_full.enable_signal_check_boxes()
-            self.time_base_combo_box.setEnabled(True)
-            self.load_sim_profile_button.setEnabled(True)
-            self.stop_sim_profile_button.setEnabled(False)
-            self.set_target_speed_slider.setEnabled(True)
-            self.split_road_friction_coefficient_checkbox.setEnabled(True)
-            if not self.split_road_friction_coefficient_checkbox.isChecked():
-                self.set_road_friction_coefficient_slider.setEnabled(True)
-            LOGGER.info('Emitted simulation stop signal!')
-        else:
-            pass
-            self.__update_simulation_velocity__()
-            self.__update_simulation_pressure__()
-            self.__update_simulation_pressure_graphics__()
-            self.data_viewer.speed_plotter.display_data(self.simulation_index)
-            self.data_viewer.pressure_plotter.display_data(self.simulation_index)
-            self.data_viewer_full.plotter.display_data(self.simulation_index)
+            self.simulation_progress_pbar.setValue(100)
+            LOGGER.info('Simulation profile finished!')
+        self.simulation_running = False
+        self.__enable_simulation_controls__()
+
+    def __enable_simulation_controls__(self):
+        """__enable_simulation_controls__
+
+        :return: None
+        """
+        self.start_sim_profile_button.setEnabled(True)
+        self.load_and_start_sim_profile_button.setEnabled(True)
+        self.load_and_start_sim_profile_button.setText('Start sim profile')
+        self.data_viewer_full.enable_signal_check_boxes()
+        self.time_base_combo_box.setEnabled(True)
+        self.load_sim_profile_button.setEnabled(True)
+        self.stop_sim_profile_button.setEnabled(False)
+        self.set_target_speed_slider.setEnabled(True)
+        self.split_road_friction_coefficient_checkbox.setEnabled(True)
+        if not self.split_road_friction_coefficient_checkbox.isChecked():
+            self.set_road_friction_coefficient_slider.setEnabled(True)
 
     def start_simulation(self):
         if not self.simulation_profile:
             LOGGER.info('No simulation profile loaded!')
             return
 
-        sampling_period = self.simulation_profile[SIGNAL_SAMPLING_PERIOD]
-        fps, growth = __get_fps_growth__(sampling_period, self.simulation_time_base)
+        engine = SimulationEngine(self.prepared_profile.signals, self.prepared_profile.sampling_period,
+                                  time_base=self.simulation_time_base)
+        if settings.HIL_OUTPUT:
+            try:
+                engine.add_sink(HilOutputStreamer(create_transport(settings.HIL_OUTPUT)))
+            except ValueError as err:
+                LOGGER.error('HIL output disabled! {}'.format(err))
 
-        self.simulation_period = 1 / fps
-        self.simulation_index_growth = growth
+        self.simulation_period = engine.period
+        self.simulation_index_growth = engine.index_growth
 
         LOGGER.info('Simulation period: {}\nSimulation index growth: {}\nSimulation stamps: {}\n'
                     .format(self.simulation_period, self.simulation_index_growth, self.simulation_stamps))
@@ -1097,8 +1236,11 @@ class CarSimETTI(QMainWindow):
         self.simulation_progress = 0
         self.simulation_progress_old = -1
 
-        self.simulation_thread = SimulationThread(period=self.simulation_period)
-        self.simulation_thread.counted.connect(self.on_thread_counter)
+        self.frame_committer.reset()
+        self.frame_timing.reset()
+        self.simulation_thread = SimulationThread(engine)
+        self.simulation_thread.frame_emitted.connect(self.on_simulation_frame)
+        self.simulation_thread.playback_finished.connect(self.on_simulation_finished)
         self.start_sim_profile_button.setEnabled(False)
         self.time_base_combo_box.setEnabled(False)
         self.load_sim_profile_button.setEnabled(False)
@@ -1123,18 +1265,8 @@ class CarSimETTI(QMainWindow):
 
         :return:
         """
-        self.simulation_thread.stop_sim_signal = True
-        self.start_sim_profile_button.setEnabled(True)
-        self.load_and_start_sim_profile_button.setEnabled(True)
-        self.load_and_start_sim_profile_button.setText('Start sim profile')
-        self.data_viewer_full.enable_signal_check_boxes()
-        self.time_base_combo_box.setEnabled(True)
-        self.load_sim_profile_button.setEnabled(True)
-        self.stop_sim_profile_button.setEnabled(False)
-        self.split_road_friction_coefficient_checkbox.setEnabled(True)
-        self.set_target_speed_slider.setEnabled(True)
-        if not self.split_road_friction_coefficient_checkbox.isChecked():
-            self.set_road_friction_coefficient_slider.setEnabled(True)
+        self.simulation_thread.stop()
+        self.__enable_simulation_controls__()
         sleep(.1)
         LOGGER.info('Forced stopped simulation!')
 
@@ -14,6 +14,22 @@ WINDOW_TITLE = 'CarSimIPX ETTI'
 MIN_FPS = 24
 MAX_FPS = 36
 
+SIMULATION_TICK_POLICY = 'catch_up'  # late simulation ticks are either caught up ('catch_up') or dropped ('skip')
+
+FRAME_COMMIT_BUDGET = 0.015  # seconds of widget updates per displayed frame, the rest is deferred to the next frame
+
+TIMING_HUD = False  # on screen frame timing overlay
+TIMING_HUD_PERIOD = 0.5  # seconds between overlay refreshes
+TIMING_HUD_X = 20
+TIMING_HUD_Y = 40
+TIMING_FILES = True  # write a per frame timing file for every run, next to the log files
+
+HIL_OUTPUT = None  # stream SPI frames to a test rig: 'spidev[:bus.device[:speed]]', 'udp:host:port' or 'loopback'
+
+PLOT_DECIMATION = 'minmax'  # full signals are drawn decimated, either 'minmax' (keeps peaks) or 'lttb'
+
+PROFILE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # parsed and validated simulation profiles kept in memory
+
 
 FR_VEL_LABEL_X = 250
 FR_VEL_LABEL_Y = 380
@@ -48,17 +64,27 @@ PRES_PBAR_MAX = 250
 
 NOB_TO_N = {0: 0, 1: 1, 2: 1, 3: 2, 4: 2, 5: 3, 6: 3, 7: 3, 8: 3}
 
+# extended frames encode data bytes + 1 on 10 bits, 0 standing for 1024
+SPI_MAX_DATA_LENGTH = 1023
+
 
 def build_spi_command(cmd_id, data):
     """build_spi_command
         Build SPI command.
     :param cmd_id: command's ID in range [0, 31]
     :type cmd_id: int
-    :param data: list of 8 bits data to be sent, maximum 1024 bytes
+    :param data: list of 8 bits data to be sent, maximum 1023 bytes
     :type data: list of int
-    :return: None
+    :return: SPI frame bytes
+    :rtype: list of int
     """
+    if not 0 <= cmd_id <= 31:
+        raise ValueError('Invalid SPI command ID [{}]! Expected range is [0, 31]!'.format(cmd_id))
+
     number_of_data_bytes = len(data)
+    if number_of_data_bytes > SPI_MAX_DATA_LENGTH:
+        raise ValueError('Too many SPI data bytes [{}]! Maximum is {}!'.format(number_of_data_bytes,
+                                                                               SPI_MAX_DATA_LENGTH))
 
     if number_of_data_bytes <= 7:
         extend = 0
@@ -77,7 +103,8 @@ def build_spi_command(cmd_id, data):
 
     spi_data = [header_byte]
 
-    if data_0_byte:
+    # length byte is sent even when 0, i.e. for data bytes + 1 multiple of 256
+    if extend:
         spi_data.append(data_0_byte)
 
     spi_data.extend(data)
@@ -1,3 +1,4 @@
+import numpy
 import pyqtgraph as pg
 
 
@@ -10,6 +11,7 @@ from PyQt5.QtGui import QIcon
 
 from car_sim_etti import settings
 from car_sim_etti import APP_SLUG
+from car_sim_etti.utils.decimation import DECIMATION_LTTB, DecimationPyramid, lttb_indexes, minmax_indexes
 
 
 LOGGER = getLogger(APP_SLUG)
@@ -33,6 +35,11 @@ class Plotter(QtWidgets.QWidget):
 
     """
     DATA_BUFFER_SIZE = 1000
+    # each curve is split in segments of this many samples, only the last segment is rebuilt when data is appended
+    SEGMENT_SIZE = 256
+    # finished segments are merged, this many at once, into a single history curve decimated to the plot width, so
+    # the number of items and points drawn stays bounded however long the run is
+    MERGED_SEGMENTS = 8
 
     def __init__(self, parent):
         """
@@ -42,6 +49,12 @@ class Plotter(QtWidgets.QWidget):
         self.plot_widget = None
         self.signals = []
         self.plot_curves = []
+        self.history_curves = []
+        self.__history_end__ = 0
+        self.__x__ = numpy.arange(0)
+        self.__displayed_index__ = 0
+        self.__pyramids__ = None
+        self.__full_display__ = False
         self.init_gui()
 
     def init_gui(self):
@@ -52,6 +65,9 @@ class Plotter(QtWidgets.QWidget):
         self.plot_widget.setYRange(-1, 100)
         self.plot_widget.setXRange(0, self.DATA_BUFFER_SIZE)
         self.plot_widget.enableAutoRange('xy', False)
+        # repaint only the area covered by the segments updated in a frame, in a single pass
+        self.plot_widget.setViewportUpdateMode(QtWidgets.QGraphicsView.BoundingRectViewportUpdate)
+        self.plot_widget.sigXRangeChanged.connect(self.__update_full_curves__)
         h_box.addWidget(self.plot_widget)
 
     def init_signals(self, signals):
@@ -63,39 +79,151 @@ class Plotter(QtWidgets.QWidget):
         """
         # LOGGER.info('Initing {} signals!'.format(len(signals)))
         self.DATA_BUFFER_SIZE = 1000
+        self.__clear_curves__()
         self.plot_widget.clear()
         self.plot_widget.setXRange(0, self.DATA_BUFFER_SIZE)
         self.plot_widget.setYRange(-1, 100)
 
         del self.signals
-        del self.plot_curves
-        self.signals = []
-        self.plot_curves = []
+        self.signals = list(signals)
+        self.plot_curves = [[] for _ in self.signals]
+        self.__pyramids__ = None
 
         maxim_val = -1
-        for signal_index, signal in enumerate(signals):
-            self.signals.append(signal)
-            curve = pg.PlotCurveItem(pen=signal.color)
-            self.plot_curves.append(curve)
-            self.plot_widget.addItem(self.plot_curves[signal_index])
-            maxim_val = max(max(signal.data), maxim_val)
+        length = 0
+        for signal in self.signals:
+            if len(signal.data):
+                maxim_val = max(float(numpy.max(signal.data)), maxim_val)
+            length = max(len(signal.data), length)
+        self.__x__ = numpy.arange(length)
 
         maxim_val += 50
         self.plot_widget.setYRange(-1, maxim_val)
 
+    def __clear_curves__(self):
+        """__clear_curves__
+
+            Remove all curve segments.
+        :return: None
+        """
+        view_box = self.plot_widget.getViewBox()
+        for curves in self.plot_curves:
+            for curve in curves:
+                view_box.removeItem(curve)
+        for curve in self.history_curves:
+            view_box.removeItem(curve)
+        self.plot_curves = [[] for _ in self.signals]
+        self.history_curves = []
+        self.__history_end__ = 0
+        self.__displayed_index__ = 0
+        self.__full_display__ = False
+
+    def __add_curve__(self, color):
+        """__add_curve__
+
+            Add curve straight to the view box, the plot item bookkeeping is linear in the number of items.
+        :param color: curve color
+        :type color: str
+        :return: added curve
+        :rtype: pg.PlotCurveItem
+        """
+        curve = pg.PlotCurveItem(pen=color)
+        self.plot_widget.getViewBox().addItem(curve)
+        return curve
+
+    def __update_curve__(self, signal_index, max_index):
+        """__update_curve__
+
+            Extend signal curve up to max_index. Only the segments receiving new samples are rebuilt, so the cost
+            does not depend on how much was already displayed. Segments start where the history curve ends.
+        :param signal_index: signal index
+        :type signal_index: int
+        :param max_index: number of samples to be displayed
+        :type max_index: int
+        :return: None
+        """
+        signal = self.signals[signal_index]
+        curves = self.plot_curves[signal_index]
+
+        last_segment = (max_index - 1 - self.__history_end__) // self.SEGMENT_SIZE
+        for segment in range(max(len(curves) - 1, 0), last_segment + 1):
+            if segment == len(curves):
+                curves.append(self.__add_curve__(signal.color))
+
+            # segments overlap by one sample, so the curve stays continuous
+            start = self.__history_end__ + segment * self.SEGMENT_SIZE
+            end = min(start + self.SEGMENT_SIZE + 1, max_index)
+            curves[segment].setData(x=self.__x__[start:end], y=signal.data[start:end])
+
     def display_data(self, max_index=1):
         """
 
         :param max_index:
         :return:
         """
+        if max_index < self.__displayed_index__:
+            self.__clear_curves__()
+
         if max_index >= self.DATA_BUFFER_SIZE:
-            self.DATA_BUFFER_SIZE += 500
+            while max_index >= self.DATA_BUFFER_SIZE:
+                self.DATA_BUFFER_SIZE += 500
+            self.plot_widget.setXRange(0, self.DATA_BUFFER_SIZE)
 
-        self.plot_widget.setXRange(0, self.DATA_BUFFER_SIZE)
+        if max_index <= 0:
+            return
+
+        for plot_index in range(len(self.plot_curves)):
+            self.__update_curve__(plot_index, max_index)
+        self.__displayed_index__ = max_index
+
+        # all signals share the same length, so they all have the same number of segments
+        if self.plot_curves and len(self.plot_curves[0]) > self.MERGED_SEGMENTS:
+            self.__merge_segments__()
+
+    def __merge_segments__(self):
+        """__merge_segments__
+
+            Move finished segments into the history curves, the last segment is still growing and stays.
+        :return: None
+        """
+        finished = len(self.plot_curves[0]) - 1
+        history_end = self.__history_end__ + finished * self.SEGMENT_SIZE
+        view_box = self.plot_widget.getViewBox()
+
+        for plot_index, signal in enumerate(self.signals):
+            if len(self.history_curves) == plot_index:
+                self.history_curves.append(self.__add_curve__(signal.color))
+            # history ends on the first sample of the growing segment, so the curve stays continuous
+            indexes = self.__decimate__(signal.data[:history_end + 1])
+            self.history_curves[plot_index].setData(x=self.__x__[indexes], y=signal.data[indexes])
+
+            curves = self.plot_curves[plot_index]
+            for curve in curves[:finished]:
+                view_box.removeItem(curve)
+            del curves[:finished]
+
+        self.__history_end__ = history_end
+
+    def __decimate__(self, values):
+        """__decimate__
+
+            Select about two samples per horizontal pixel of the current view, first and last samples included.
+        :param values: signal values
+        :type values: numpy.ndarray
+        :return: selected sample indexes, sorted
+        :rtype: numpy.ndarray
+        """
+        # width is 0 until the widget was laid out, samples are kept as they are then
+        pixels = self.plot_widget.getViewBox().width() or self.DATA_BUFFER_SIZE
+        bucket = int(self.DATA_BUFFER_SIZE / pixels)
+        if bucket < 2:
+            return numpy.arange(len(values))
+
+        if settings.PLOT_DECIMATION == DECIMATION_LTTB:
+            return lttb_indexes(values, max(len(values) // bucket, 3))
 
-        for plot_index, plot_curve in enumerate(self.plot_curves):
-            plot_curve.setData(self.signals[plot_index].data[:max_index])
+        indexes = minmax_indexes(values, bucket)
+        return numpy.unique(numpy.concatenate(([0], indexes, [len(values) - 1])))
 
     def display_signals(self, signals_enabled):
         """
@@ -104,14 +232,36 @@ class Plotter(QtWidgets.QWidget):
         :return:
         """
         # LOGGER.info('display signals: {}'.format(signals_enabled))
-        # self.plot_widget.clear()
-        for plot_index, plot_curve in enumerate(self.plot_curves):
-            if signals_enabled[plot_index]:
-                # LOGGER.info('Plotting signal [{}/{}]...'.format(plot_index + 1, len(signals_enabled)))
-                plot_curve.setData(self.signals[plot_index].data)
-            else:
-                plot_curve.setData(None)
-                # LOGGER.info('Signal [{}/{}] skipped!'.format(plot_index + 1, len(signals_enabled)))
+        if not self.__full_display__:
+            self.__clear_curves__()
+            if self.__pyramids__ is None:
+                self.__pyramids__ = [DecimationPyramid(signal.data, method=settings.PLOT_DECIMATION)
+                                     for signal in self.signals]
+            for plot_index, signal in enumerate(self.signals):
+                self.plot_curves[plot_index].append(self.__add_curve__(signal.color))
+                self.__displayed_index__ = max(len(signal.data), self.__displayed_index__)
+            self.__full_display__ = True
+
+        # toggling a signal only shows or hides its curve, decimated data is kept
+        for plot_index, curves in enumerate(self.plot_curves):
+            curves[0].setVisible(bool(signals_enabled[plot_index]))
+        self.__update_full_curves__()
+
+    def __update_full_curves__(self, *args):
+        """__update_full_curves__
+
+            Feed visible full signal curves with the decimation level matching the view range and width.
+        :return: None
+        """
+        if not self.__full_display__:
+            return
+
+        x_min, x_max = self.plot_widget.getViewBox().viewRange()[0]
+        pixels = self.plot_widget.getViewBox().width()
+        for plot_index, curves in enumerate(self.plot_curves):
+            if curves[0].isVisible():
+                x, y = self.__pyramids__[plot_index].select(x_min, x_max, pixels)
+                curves[0].setData(x=x, y=y)
 
 
 class DataViewer(QtWidgets.QMainWindow):
@@ -0,0 +1,148 @@
+import numpy
+
+
+DECIMATION_MINMAX = 'minmax'  # keeps min and max of every bucket, peaks are never lost
+DECIMATION_LTTB = 'lttb'  # largest triangle three buckets, one visually representative point per bucket
+
+DECIMATION_METHODS = (DECIMATION_MINMAX, DECIMATION_LTTB)
+
+LEVEL_FACTOR = 4  # bucket size ratio between consecutive pyramid levels
+MIN_LEVEL_BUCKETS = 64  # coarsest level still has at least this many buckets
+
+
+def minmax_indexes(values, bucket):
+    """minmax_indexes
+
+        Select the min and max sample of every bucket, in sample order.
+    :param values: signal values
+    :type values: numpy.ndarray
+    :param bucket: bucket size in samples
+    :type bucket: int
+    :return: selected sample indexes, sorted
+    :rtype: numpy.ndarray
+    """
+    count = len(values) // bucket
+    body = values[:count * bucket].reshape(count, bucket)
+    offsets = numpy.arange(count) * bucket
+    pairs = [numpy.stack([body.argmin(axis=1) + offsets, body.argmax(axis=1) + offsets], axis=1)]
+
+    if len(values) > count * bucket:
+        tail = values[count * bucket:]
+        pairs.append(numpy.array([[tail.argmin(), tail.argmax()]]) + count * bucket)
+
+    return numpy.unique(numpy.concatenate(pairs))
+
+
+def lttb_indexes(values, threshold):
+    """lttb_indexes
+
+        Largest triangle three buckets downsampling.
+        First and last samples are always kept, every bucket in between contributes the sample forming the largest
+        triangle with the previously selected sample and the average of the next bucket.
+    :param values: signal values
+    :type values: numpy.ndarray
+    :param threshold: number of samples to be kept
+    :type threshold: int
+    :return: selected sample indexes, sorted
+    :rtype: numpy.ndarray
+    """
+    length = len(values)
+    if threshold >= length or threshold < 3:
+        return numpy.arange(length)
+
+    edges = numpy.linspace(1, length - 1, threshold - 1).astype(numpy.int64)
+    selected = numpy.empty(threshold, dtype=numpy.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start = edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else length
+        average_x = (next_start + next_end - 1) / 2
+        average_y = values[next_start:next_end].mean()
+
+        candidates = numpy.arange(start, end)
+        areas = numpy.abs((previous - average_x) * (values[start:end] - values[previous]) -
+                          (previous - candidates) * (average_y - values[previous]))
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+class DecimationPyramid:
+    """DecimationPyramid
+
+        Level of detail pyramid of a signal. Level 0 holds every sample, each next level has LEVEL_FACTOR times larger
+        buckets. Levels are stored as sample indexes, so a view only slices the level fitting its pixel width.
+    """
+    def __init__(self, values, method=DECIMATION_MINMAX):
+        """
+
+        :param values: signal values
+        :type values: numpy.ndarray
+        :param method: decimation method, one of DECIMATION_METHODS
+        :type method: str
+        """
+        if method not in DECIMATION_METHODS:
+            raise ValueError('Unknown decimation method [{}]! Supported methods are: {}!'
+                             .format(method, DECIMATION_METHODS))
+
+        self.values = numpy.asarray(values, dtype=numpy.float64)
+        self.method = method
+        self.buckets = [1]
+        self.levels = [numpy.arange(len(self.values))]
+
+        bucket = LEVEL_FACTOR
+        while len(self.values) // bucket >= MIN_LEVEL_BUCKETS:
+            if method == DECIMATION_MINMAX:
+                indexes = minmax_indexes(self.values, bucket)
+            else:
+                indexes = lttb_indexes(self.values, len(self.values) // bucket)
+            self.buckets.append(bucket)
+            self.levels.append(indexes)
+            bucket *= LEVEL_FACTOR
+
+    def level_for(self, x_min, x_max, pixels):
+        """level_for
+
+            Get the coarsest level whose buckets span at most two horizontal pixels, about one bucket per pixel.
+        :param x_min: view start, in samples
+        :type x_min: float
+        :param x_max: view end, in samples
+        :type x_max: float
+        :param pixels: view width in pixels
+        :type pixels: int or float
+        :return: level index
+        :rtype: int
+        """
+        samples_per_pixel = max(x_max - x_min, 1) / max(pixels, 1)
+        level = 0
+        for index, bucket in enumerate(self.buckets):
+            if bucket <= 2 * samples_per_pixel:
+                level = index
+        return level
+
+    def select(self, x_min, x_max, pixels):
+        """select
+
+            Get the points to be drawn for a view.
+        :param x_min: view start, in samples
+        :type x_min: float
+        :param x_max: view end, in samples
+        :type x_max: float
+        :param pixels: view width in pixels
+        :type pixels: int or float
+        :return: x (sample indexes) and y values
+        :rtype: tuple
+        """
+        indexes = self.levels[self.level_for(x_min, x_max, pixels)]
+
+        # one extra point on each side, so lines leave the view instead of stopping at its border
+        start = max(int(numpy.searchsorted(indexes, x_min)) - 1, 0)
+        end = min(int(numpy.searchsorted(indexes, x_max, side='right')) + 1, len(indexes))
+        indexes = indexes[start:end]
+
+        return indexes, self.values[indexes]
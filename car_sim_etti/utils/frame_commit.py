@@ -0,0 +1,106 @@
+from collections import OrderedDict
+from time import perf_counter
+
+
+class FrameCommitter:
+    """FrameCommitter
+
+        Applies display state to widgets once per frame, touching only widgets whose value changed.
+        Widget work per frame is capped by a time budget: updates left over are deferred to the next frame, keeping
+        only their latest value, and go first then.
+    """
+    def __init__(self, budget=None, clock=perf_counter):
+        """
+
+        :param budget: max time spent applying updates per frame in seconds, None for no limit
+        :param clock: clock used to measure the budget, in seconds
+        """
+        self.budget = budget
+        self.clock = clock
+        self.applied = 0
+        self.unchanged = 0
+        self.deferred = 0
+        self.__appliers__ = {}
+        self.__committed__ = {}
+        self.__pending__ = OrderedDict()
+
+    def bind(self, key, applier):
+        """bind
+
+        :param key: display state key
+        :type key: str
+        :param applier: widget update, called with the new value
+        :type applier: callable
+        :return: None
+        """
+        self.__appliers__[key] = applier
+
+    def reset(self):
+        """reset
+
+            Forget committed state and counters, so the next commit updates every widget and stats cover one run.
+        :return: None
+        """
+        self.applied = 0
+        self.unchanged = 0
+        self.deferred = 0
+        self.__committed__.clear()
+        self.__pending__.clear()
+
+    def commit(self, state):
+        """commit
+
+            Diff state against the committed one and apply changes within the frame budget.
+        :param state: display state, values by key
+        :type state: dict
+        :return: number of widget updates applied
+        :rtype: int
+        """
+        for key, value in state.items():
+            if key in self.__committed__ and self.__committed__[key] == value:
+                self.__pending__.pop(key, None)
+                self.unchanged += 1
+            else:
+                self.__pending__[key] = value
+
+        return self.__apply__(self.budget)
+
+    def flush(self):
+        """flush
+
+            Apply every pending update, regardless of the budget.
+        :return: number of widget updates applied
+        :rtype: int
+        """
+        return self.__apply__(None)
+
+    def __apply__(self, budget):
+        """__apply__
+
+        :param budget: time budget in seconds, None for no limit
+        :type budget: float
+        :return: number of widget updates applied
+        :rtype: int
+        """
+        applied = 0
+        start = self.clock()
+        while self.__pending__:
+            key, value = self.__pending__.popitem(last=False)
+            self.__appliers__[key](value)
+            self.__committed__[key] = value
+            applied += 1
+            if budget is not None and self.clock() - start >= budget:
+                break
+
+        self.applied += applied
+        self.deferred += len(self.__pending__)
+        return applied
+
+    def stats(self):
+        """stats
+
+        :return: commit statistics
+        :rtype: str
+        """
+        return 'frame commit: {} applied, {} unchanged, {} deferred'.format(self.applied, self.unchanged,
+                                                                           self.deferred)
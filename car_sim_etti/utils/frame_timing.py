@@ -0,0 +1,198 @@
+import csv
+import logging
+
+
+from collections import OrderedDict
+from time import perf_counter
+
+
+from car_sim_etti import APP_SLUG
+
+
+LOGGER = logging.getLogger(APP_SLUG)
+
+
+FRAME_COLUMNS = ('tick', 'index', 'latency', 'frame')  # leading columns of the timing file, sections follow
+
+
+class SectionStats:
+    """SectionStats
+
+        Running duration statistics of a timed section.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, duration):
+        """add
+
+        :param duration: section duration in seconds
+        :type duration: float
+        :return: None
+        """
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.
+
+    def __repr__(self):
+        return '{} calls, mean {:.3f}ms max {:.3f}ms'.format(self.count, self.mean * 1000, self.max * 1000)
+
+
+class FrameTimingRecorder:
+    """FrameTimingRecorder
+
+        Records the GUI time spent per displayed simulation frame: frame latency (tick deadline to display), total
+        frame time and named sections within it, e.g. widget updates, plot redraws and gauge paints.
+        Meant for the GUI thread only.
+    """
+    def __init__(self, clock=perf_counter):
+        """
+
+        :param clock: clock used for measurements, in seconds
+        """
+        self.clock = clock
+        self.sections = OrderedDict()
+        self.frame_stats = SectionStats()
+        self.latency_stats = SectionStats()
+        self.dropped_frames = 0
+        self.rows = []
+        self.__row__ = None
+        self.__frame_start__ = None
+
+    def reset(self):
+        """reset
+
+            Forget previous run measurements, known sections are kept.
+        :return: None
+        """
+        self.sections = OrderedDict((section, SectionStats()) for section in self.sections)
+        self.frame_stats = SectionStats()
+        self.latency_stats = SectionStats()
+        self.dropped_frames = 0
+        self.rows = []
+        self.__row__ = None
+        self.__frame_start__ = None
+
+    def begin_frame(self, tick, index, latency):
+        """begin_frame
+
+        :param tick: simulation tick index
+        :type tick: int
+        :param index: profile sample index
+        :type index: int
+        :param latency: time elapsed from the tick deadline until the frame got displayed, in seconds
+        :type latency: float
+        :return: None
+        """
+        self.__row__ = OrderedDict([('tick', tick), ('index', index), ('latency', latency), ('frame', None)])
+        self.latency_stats.add(latency)
+        self.__frame_start__ = self.clock()
+
+    def end_frame(self):
+        """end_frame
+
+        :return: frame duration in seconds
+        :rtype: float
+        """
+        duration = self.clock() - self.__frame_start__
+        self.frame_stats.add(duration)
+        self.__row__['frame'] = duration
+        self.rows.append(self.__row__)
+        self.__row__ = None
+        return duration
+
+    def drop_frame(self):
+        """drop_frame
+
+            Count a frame skipped because a newer one was already queued.
+        :return: None
+        """
+        self.dropped_frames += 1
+
+    def record(self, section, duration):
+        """record
+
+            Record a section duration, within the current frame. Outside of frames, e.g. paints Qt runs after a frame
+            handler returned, the duration goes to the last displayed frame.
+        :param section: section name
+        :type section: str
+        :param duration: duration in seconds
+        :type duration: float
+        :return: None
+        """
+        stats = self.sections.get(section)
+        if stats is None:
+            stats = self.sections[section] = SectionStats()
+        stats.add(duration)
+
+        row = self.__row__ if self.__row__ is not None else (self.rows[-1] if self.rows else None)
+        if row is not None:
+            row[section] = row.get(section, 0.) + duration
+
+    def timed(self, section, function):
+        """timed
+
+        :param section: section name
+        :type section: str
+        :param function: function to be measured
+        :type function: callable
+        :return: function wrapper recording each call duration under section
+        :rtype: callable
+        """
+        def wrapper(*args, **kwargs):
+            start = self.clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(section, self.clock() - start)
+
+        return wrapper
+
+    def summary(self):
+        """summary
+
+        :return: one line per statistic
+        :rtype: list of str
+        """
+        lines = ['frames: {}, {} dropped'.format(self.frame_stats, self.dropped_frames),
+                 'latency: mean {:.3f}ms max {:.3f}ms'.format(self.latency_stats.mean * 1000,
+                                                             self.latency_stats.max * 1000)]
+        lines.extend('{}: {}'.format(section, stats) for section, stats in self.sections.items())
+        return lines
+
+    def write(self, file, header=None):
+        """write
+
+            Write per frame timings as CSV, in milliseconds, preceded by the summary as comment lines.
+        :param file: output file path
+        :type file: str
+        :param header: extra comment lines, e.g. run details
+        :type header: list of str
+        :return: True if written
+        :rtype: bool
+        """
+        columns = list(FRAME_COLUMNS) + list(self.sections)
+        try:
+            with open(file, 'w', newline='') as file_handler:
+                for line in (header or []) + self.summary():
+                    file_handler.write('# {}\n'.format(line))
+
+                writer = csv.writer(file_handler)
+                writer.writerow(columns)
+                for row in self.rows:
+                    writer.writerow([row['tick'], row['index']] +
+                                    ['{:.3f}'.format(row[column] * 1000) if row.get(column) is not None else ''
+                                     for column in columns[2:]])
+        except Exception as err:
+            LOGGER.error('Failed to write timing file {}!'.format(file))
+            LOGGER.error(err)
+            return False
+
+        return True
@@ -1,5 +1,8 @@
 import math
 
+
+from time import perf_counter
+
 try:
     from PyQt5.QtWidgets import QMainWindow
 
@@ -7,7 +10,7 @@ try:
     from PyQt5.QtWidgets import QApplication
 
     from PyQt5.QtGui import QPolygon, QPolygonF, QColor, QPen, QFont
-    from PyQt5.QtGui import QPainter, QFontMetrics, QConicalGradient
+    from PyQt5.QtGui import QPainter, QFontMetrics, QConicalGradient, QPixmap
 
     from PyQt5.QtCore import Qt, QTime, QTimer, QPoint, QPointF, QRect, QSize
     from PyQt5.QtCore import QObject, pyqtSignal
@@ -24,6 +27,7 @@ class AnalogGaugeWidget(QWidget):
 
     """
     valueChanged = pyqtSignal(int)
+    painted = pyqtSignal(float)  # paint duration in seconds
 
     def __init__(self, parent=None):
         super(AnalogGaugeWidget, self).__init__(parent)
@@ -118,6 +122,10 @@ class AnalogGaugeWidget(QWidget):
         self.needle_scale_factor = 0.8
         self.enable_Needle_Polygon = True
 
+        # pie, scale markers and scale text only change with size or style, they are rendered once in a pixmap
+        self.static_layer = None
+        self.static_layer_key = None
+
         # necessary for resize
         self.setMouseTracking(False)
 
@@ -433,9 +441,9 @@ class AnalogGaugeWidget(QWidget):
         polygon_pie.append(QPointF(x, y))
         return polygon_pie
 
-    def draw_filled_polygon(self, outline_pen_with=0):
+    def draw_filled_polygon(self, outline_pen_with=0, device=None):
         if not self.scale_polygon_colors == None:
-            painter_filled_polygon = QPainter(self)
+            painter_filled_polygon = QPainter(self if device is None else device)
             painter_filled_polygon.setRenderHint(QPainter.Antialiasing)
             # Koordinatenursprung in die Mitte der Flaeche legen
             painter_filled_polygon.translate(self.width() / 2, self.height() / 2)
@@ -466,14 +474,15 @@ class AnalogGaugeWidget(QWidget):
             # self.brush = QBrush(QColor(255, 0, 255, 255))
             # painter_filled_polygon.setBrush(self.brush)
             painter_filled_polygon.drawPolygon(colored_scale_polygon)
+            painter_filled_polygon.end()
             # return painter_filled_polygon
 
     ###############################################################################################
     # Scale Marker
     ###############################################################################################
 
-    def draw_big_scaled_markter(self):
-        my_painter = QPainter(self)
+    def draw_big_scaled_markter(self, device=None):
+        my_painter = QPainter(self if device is None else device)
         my_painter.setRenderHint(QPainter.Antialiasing)
         # Koordinatenursprung in die Mitte der Flaeche legen
         my_painter.translate(self.width() / 2, self.height() / 2)
@@ -492,9 +501,10 @@ class AnalogGaugeWidget(QWidget):
         for i in range(self.scala_main_count + 1):
             my_painter.drawLine(scale_line_lenght, 0, scale_line_outer_start, 0)
             my_painter.rotate(steps_size)
+        my_painter.end()
 
-    def create_scale_marker_values_text(self):
-        painter = QPainter(self)
+    def create_scale_marker_values_text(self, device=None):
+        painter = QPainter(self if device is None else device)
         # painter.setRenderHint(QPainter.HighQualityAntialiasing)
         painter.setRenderHint(QPainter.Antialiasing)
 
@@ -527,11 +537,12 @@ class AnalogGaugeWidget(QWidget):
             # print(w, h, x, y, text)
             text = [x - int(w / 2), y - int(h / 2), int(w), int(h), Qt.AlignCenter, text]
             painter.drawText(text[0], text[1], text[2], text[3], text[4], text[5])
+        painter.end()
         # painter.restore()
 
-    def create_fine_scaled_marker(self):
+    def create_fine_scaled_marker(self, device=None):
         #  Description_dict = 0
-        my_painter = QPainter(self)
+        my_painter = QPainter(self if device is None else device)
 
         my_painter.setRenderHint(QPainter.Antialiasing)
         # Koordinatenursprung in die Mitte der Flaeche legen
@@ -545,6 +556,7 @@ class AnalogGaugeWidget(QWidget):
         for i in range((self.scala_main_count * self.scala_subdiv_count) + 1):
             my_painter.drawLine(scale_line_lenght, 0, scale_line_outer_start, 0)
             my_painter.rotate(steps_size)
+        my_painter.end()
 
     def create_values_text(self):
         painter = QPainter(self)
@@ -625,25 +637,65 @@ class AnalogGaugeWidget(QWidget):
         # self.emit(QtCore.SIGNAL("resize()"))
         # print("resizeEvent")
 
+    def get_static_layer_key(self):
+        """get_static_layer_key
+
+            Everything the static layers depend on, a different key means the cached pixmap is outdated.
+        :return: static layers description
+        :rtype: tuple
+        """
+        return (self.width(), self.height(), self.devicePixelRatioF(), self.widget_diameter,
+                self.enable_filled_Polygon, self.enable_barGraph, self.enable_fine_scaled_marker,
+                self.enable_big_scaled_marker, self.enable_scale_text,
+                tuple(tuple(color) for color in self.scale_polygon_colors or ()),
+                self.value_min, self.value_max, self.scale_angle_start_value, self.scale_angle_size, self.angle_offset,
+                self.gauge_color_outer_radius_factor, self.gauge_color_inner_radius_factor,
+                self.scala_main_count, self.scala_subdiv_count, self.scale_fontname, self.scale_fontsize,
+                self.ScaleValueColor.rgba())
+
+    def render_static_layer(self):
+        """render_static_layer
+
+            Render colored pie, scale markers and scale text in a pixmap.
+        :return: None
+        """
+        pixel_ratio = self.devicePixelRatioF()
+        self.static_layer = QPixmap(int(self.width() * pixel_ratio), int(self.height() * pixel_ratio))
+        self.static_layer.setDevicePixelRatio(pixel_ratio)
+        self.static_layer.fill(Qt.transparent)
+
+        # colored pie area, follows the value if bar graph is disabled so it is drawn on each frame then
+        if self.enable_filled_Polygon and self.enable_barGraph:
+            self.draw_filled_polygon(device=self.static_layer)
+
+        # draw scale marker lines
+        if self.enable_fine_scaled_marker:
+            self.create_fine_scaled_marker(device=self.static_layer)
+        if self.enable_big_scaled_marker:
+            self.draw_big_scaled_markter(device=self.static_layer)
+
+        # draw scale marker value text
+        if self.enable_scale_text:
+            self.create_scale_marker_values_text(device=self.static_layer)
+
     def paintEvent(self, event):
         # Main Drawing Event:
         # Will be executed on every change
         # vgl http://doc.qt.io/qt-4.8/qt-demos-affine-xform-cpp.html
         # print("event", event)
+        paint_start = perf_counter()
 
-        # colored pie area
-        if self.enable_filled_Polygon:
-            self.draw_filled_polygon()
+        static_layer_key = self.get_static_layer_key()
+        if self.static_layer is None or static_layer_key != self.static_layer_key:
+            self.render_static_layer()
+            self.static_layer_key = static_layer_key
 
-        # draw scale marker lines
-        if self.enable_fine_scaled_marker:
-            self.create_fine_scaled_marker()
-        if self.enable_big_scaled_marker:
-            self.draw_big_scaled_markter()
+        if self.enable_filled_Polygon and not self.enable_barGraph:
+            self.draw_filled_polygon()
 
-        # draw scale marker value text
-        if self.enable_scale_text:
-            self.create_scale_marker_values_text()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.static_layer)
+        painter.end()
 
         # Display Value
         if self.enable_value_text:
@@ -657,6 +709,8 @@ class AnalogGaugeWidget(QWidget):
         if self.enable_CenterPoint:
             self.draw_big_needle_center_point(diameter=(self.widget_diameter / 6))
 
+        self.painted.emit(perf_counter() - paint_start)
+
     ###############################################################################################
     # MouseEvents
     ###############################################################################################
@@ -1,4 +1,5 @@
 import logging
+import numpy
 import os.path as py_path
 
 
@@ -29,17 +30,137 @@ SIGNAL_RR_PRES = 'rr_pres'
 SIGNAL_SAMPLING_PERIOD = 'sampling_period'
 
 ALLOWED_SAMPLING_PERIODS = (0.001, 0.01, 0.1, 1, 2)
+
+# measurement tools log 0.12 instead of 0 while a signal is not yet available
+SENTINEL_VALUE = 0.12
 FPS = {0.001: 24, 0.001: 24, 0.001: 24, 0.001: 24, 0.001: 24, 0.001: 24}
 
 BRAKING_SYSTEM_OVERVIEW_IMG = py_path.join(IMAGES_DIR, 'braking_system_overview.png')
 
 
-def sim_profile_valid(profile):
+# numpy dtype kinds accepted for each signal samples type
+SAMPLE_KINDS = {
+    int: 'iu',
+    float: 'iuf',
+}
+
+
+class SignalSpec:
+    """SignalSpec
+
+        Simulation profile signal description.
+    """
+    def __init__(self, name, dtype=float, minimum=0, maximum=None, required=True):
+        """
+
+        :param name: signal name, as found in simulation profile
+        :param dtype: samples type
+        :param minimum: lowest allowed sample value, None for no limit
+        :param maximum: highest allowed sample value, None for no limit
+        :param required: signal must be defined within simulation profile
+        """
+        self.name = name
+        self.dtype = dtype
+        self.minimum = minimum
+        self.maximum = maximum
+        self.required = required
+
+
+SIGNAL_SCHEMA = (
+    SignalSpec(SIGNAL_ABS_REF),
+
+    SignalSpec(SIGNAL_FL_VEL),
+    SignalSpec(SIGNAL_FR_VEL),
+    SignalSpec(SIGNAL_RL_VEL),
+    SignalSpec(SIGNAL_RR_VEL),
+
+    SignalSpec(SIGNAL_FL_PRES),
+    SignalSpec(SIGNAL_FR_PRES),
+    SignalSpec(SIGNAL_RL_PRES),
+    SignalSpec(SIGNAL_RR_PRES),
+)
+
+
+def __first_non_numeric_index__(signal):
+    """__first_non_numeric_index__
+
+        Find first sample that is not a number. Only used to report errors, so it may iterate.
+    :param signal: signal samples
+    :type signal: list or numpy.ndarray
+    :return: index and sample
+    :rtype: tuple
+    """
+    for index, value in enumerate(signal):
+        if not isinstance(value, (int, float, numpy.integer, numpy.floating)) or isinstance(value, bool):
+            return index, value
+    return None, None
+
+
+def __signal_valid__(spec, signal):
+    """__signal_valid__
+
+        Check signal samples against its specification, whole column at once.
+    :param spec: signal specification
+    :type spec: SignalSpec
+    :param signal: signal samples
+    :type signal: list or numpy.ndarray
+    :return: validation result
+    :rtype: bool
+    """
+    if not isinstance(signal, (list, numpy.ndarray)):
+        error = 'Signal <{}> type list expected! Got {} instead!'.format(spec.name, type(signal))
+        LOGGER.error(error)
+        return False
+
+    try:
+        samples = numpy.asarray(signal)
+    except ValueError as err:
+        LOGGER.error('Signal <{}> samples expected to be {}! {}'.format(spec.name, spec.dtype.__name__, err))
+        return False
+
+    if samples.ndim != 1:
+        error = 'Signal <{}> expected to be one dimensional! Got shape {} instead!'.format(spec.name, samples.shape)
+        LOGGER.error(error)
+        return False
+
+    if samples.dtype.kind not in SAMPLE_KINDS[spec.dtype]:
+        index, value = __first_non_numeric_index__(signal)
+        error = 'Signal <{}> value type {} expected! Got {} at index {}!'\
+            .format(spec.name, spec.dtype.__name__, type(value), index)
+        LOGGER.error(error)
+        return False
+
+    validation = True
+
+    if spec.minimum is not None:
+        below = numpy.flatnonzero(samples < spec.minimum)
+        if below.size:
+            index = below[0]
+            error = 'Signal <{}> value expected to be greater than {}! Got {} instead at index {} ({} values)!'\
+                .format(spec.name, spec.minimum, samples[index], index, below.size)
+            LOGGER.error(error)
+            validation = False
+
+    if spec.maximum is not None:
+        above = numpy.flatnonzero(samples > spec.maximum)
+        if above.size:
+            index = above[0]
+            error = 'Signal <{}> value expected to be lower than {}! Got {} instead at index {} ({} values)!'\
+                .format(spec.name, spec.maximum, samples[index], index, above.size)
+            LOGGER.error(error)
+            validation = False
+
+    return validation
+
+
+def sim_profile_valid(profile, schema=SIGNAL_SCHEMA):
     """sim_profile_valid
 
         Check if specified simulation profile is valid.
     :param profile: simulation profile
     :type profile: dict
+    :param schema: expected signals
+    :type schema: tuple of SignalSpec
     :return: validation result
     :rtype: bool
     """
@@ -59,270 +180,32 @@ def sim_profile_valid(profile):
         else:
             if sampling_period not in ALLOWED_SAMPLING_PERIODS:
                 error = 'Signal <{}> value [{}] not allowed! Supported values are: {}!'\
-                    .format(SIGNAL_SAMPLING_PERIOD, ALLOWED_SAMPLING_PERIODS, sampling_period)
+                    .format(SIGNAL_SAMPLING_PERIOD, sampling_period, ALLOWED_SAMPLING_PERIODS)
                 LOGGER.error(error)
                 validation = False
 
-    signal_name = SIGNAL_ABS_REF
-    abs_ref = profile.get(signal_name, None)
-    signal = abs_ref
-    if signal is None:
-        error = 'Signal <{}> not defined within simulation profile!'.format(signal_name)
-        LOGGER.error(error)
-        validation = False
-    else:
-        if not isinstance(signal, list):
-            error = 'Signal <{}> type list expected! Got {} instead!'\
-                .format(signal_name, type(signal))
-            LOGGER.error(error)
-            validation = False
-        else:
-            for index, value in enumerate(signal):
-                if not isinstance(value, int) and not isinstance(value, float):
-                    error = 'Signal <{}> value type int or float expected! Got {} at index {}!'\
-                        .format(signal_name, type(value), index)
-                    LOGGER.error(error)
-                    validation = False
-                else:
-                    if value < 0:
-                        error = 'Signal <{}> value expected to be greater than 0! Got {} instead at index {}!'\
-                            .format(signal_name, value, index)
-                        LOGGER.error(error)
-                        validation = False
-
-    signal_name = SIGNAL_FL_VEL
-    fl_vel = profile.get(signal_name, None)
-    signal = fl_vel
-    if signal is None:
-        error = 'Signal <{}> not defined within simulation profile!'.format(signal_name)
-        LOGGER.error(error)
-        validation = False
-    else:
-        if not isinstance(signal, list):
-            error = 'Signal <{}> type list expected! Got {} instead!'\
-                .format(signal_name, type(signal))
-            LOGGER.error(error)
-            validation = False
-        else:
-            for index, value in enumerate(signal):
-                if not isinstance(value, int) and not isinstance(value, float):
-                    error = 'Signal <{}> value type int or float expected! Got {} at index {}!'\
-                        .format(signal_name, type(value), index)
-                    LOGGER.error(error)
-                    validation = False
-                else:
-                    if value < 0:
-                        error = 'Signal <{}> value expected to be greater than 0! Got {} instead at index {}!'\
-                            .format(signal_name, value, index)
-                        LOGGER.error(error)
-                        validation = False
-
-    signal_name = SIGNAL_FR_VEL
-    fr_vel = profile.get(signal_name, None)
-    signal = fr_vel
-    if signal is None:
-        error = 'Signal <{}> not defined within simulation profile!'.format(signal_name)
-        LOGGER.error(error)
-        validation = False
-    else:
-        if not isinstance(signal, list):
-            error = 'Signal <{}> type list expected! Got {} instead!'\
-                .format(signal_name, type(signal))
-            LOGGER.error(error)
-            validation = False
-        else:
-            for index, value in enumerate(signal):
-                if not isinstance(value, int) and not isinstance(value, float):
-                    error = 'Signal <{}> value type int or float expected! Got {} at index {}!'\
-                        .format(signal_name, type(value), index)
-                    LOGGER.error(error)
-                    validation = False
-                else:
-                    if value < 0:
-                        error = 'Signal <{}> value expected to be greater than 0! Got {} instead at index {}!'\
-                            .format(signal_name, value, index)
-                        LOGGER.error(error)
-                        validation = False
-
-    signal_name = SIGNAL_RL_VEL
-    rl_vel = profile.get(signal_name, None)
-    signal = rl_vel
-    if signal is None:
-        error = 'Signal <{}> not defined within simulation profile!'.format(signal_name)
-        LOGGER.error(error)
-        validation = False
-    else:
-        if not isinstance(signal, list):
-            error = 'Signal <{}> type list expected! Got {} instead!'\
-                .format(signal_name, type(signal))
-            LOGGER.error(error)
-            validation = False
-        else:
-            for index, value in enumerate(signal):
-                if not isinstance(value, int) and not isinstance(value, float):
-                    error = 'Signal <{}> value type int or float expected! Got {} at index {}!'\
-                        .format(signal_name, type(value), index)
-                    LOGGER.error(error)
-                    validation = False
-                else:
-                    if value < 0:
-                        error = 'Signal <{}> value expected to be greater than 0! Got {} instead at index {}!'\
-                            .format(signal_name, value, index)
-                        LOGGER.error(error)
-                        validation = False
-
-    signal_name = SIGNAL_RR_VEL
-    rr_vel = profile.get(signal_name, None)
-    signal = rr_vel
-    if signal is None:
-        error = 'Signal <{}> not defined within simulation profile!'.format(signal_name)
-        LOGGER.error(error)
-        validation = False
-    else:
-        if not isinstance(signal, list):
-            error = 'Signal <{}> type list expected! Got {} instead!'\
-                .format(signal_name, type(signal))
-            LOGGER.error(error)
-            validation = False
-        else:
-            for index, value in enumerate(signal):
-                if not isinstance(value, int) and not isinstance(value, float):
-                    error = 'Signal <{}> value type int or float expected! Got {} at index {}!'\
-                        .format(signal_name, type(value), index)
-                    LOGGER.error(error)
-                    validation = False
-                else:
-                    if value < 0:
-                        error = 'Signal <{}> value expected to be greater than 0! Got {} instead at index {}!'\
-                            .format(signal_name, value, index)
-                        LOGGER.error(error)
-                        validation = False
-
-    signal_name = SIGNAL_FL_PRES
-    fl_pres = profile.get(signal_name, None)
-    signal = fl_pres
-    if signal is None:
-        error = 'Signal <{}> not defined within simulation profile!'.format(signal_name)
-        LOGGER.error(error)
-        validation = False
-    else:
-        if not isinstance(signal, list):
-            error = 'Signal <{}> type list expected! Got {} instead!'\
-                .format(signal_name, type(signal))
-            LOGGER.error(error)
-            validation = False
-        else:
-            for index, value in enumerate(signal):
-                if not isinstance(value, int) and not isinstance(value, float):
-                    error = 'Signal <{}> value type int or float expected! Got {} at index {}!'\
-                        .format(signal_name, type(value), index)
-                    LOGGER.error(error)
-                    validation = False
-                else:
-                    if value < 0:
-                        error = 'Signal <{}> value expected to be greater than 0! Got {} instead at index {}!'\
-                            .format(signal_name, value, index)
-                        LOGGER.error(error)
-                        validation = False
-
-    signal_name = SIGNAL_FR_PRES
-    fr_pres = profile.get(signal_name, None)
-    signal = fr_pres
-    if signal is None:
-        error = 'Signal <{}> not defined within simulation profile!'.format(signal_name)
-        LOGGER.error(error)
-        validation = False
-    else:
-        if not isinstance(signal, list):
-            error = 'Signal <{}> type list expected! Got {} instead!'\
-                .format(signal_name, type(signal))
-            LOGGER.error(error)
-            validation = False
-        else:
-            for index, value in enumerate(signal):
-                if not isinstance(value, int) and not isinstance(value, float):
-                    error = 'Signal <{}> value type int or float expected! Got {} at index {}!'\
-                        .format(signal_name, type(value), index)
-                    LOGGER.error(error)
-                    validation = False
-                else:
-                    if value < 0:
-                        error = 'Signal <{}> value expected to be greater than 0! Got {} instead at index {}!'\
-                            .format(signal_name, value, index)
-                        LOGGER.error(error)
-                        validation = False
-
-    signal_name = SIGNAL_RL_PRES
-    rl_pres = profile.get(signal_name, None)
-    signal = rl_pres
-    if signal is None:
-        error = 'Signal <{}> not defined within simulation profile!'.format(signal_name)
-        LOGGER.error(error)
-        validation = False
-    else:
-        if not isinstance(signal, list):
-            error = 'Signal <{}> type list expected! Got {} instead!'\
-                .format(signal_name, type(signal))
-            LOGGER.error(error)
-            validation = False
+    lengths = {}
+    for spec in schema:
+        signal = profile.get(spec.name, None)
+        if signal is None:
+            if spec.required:
+                error = 'Signal <{}> not defined within simulation profile!'.format(spec.name)
+                LOGGER.error(error)
+                validation = False
+            continue
+
+        if __signal_valid__(spec, signal):
+            lengths[spec.name] = len(signal)
         else:
-            for index, value in enumerate(signal):
-                if not isinstance(value, int) and not isinstance(value, float):
-                    error = 'Signal <{}> value type int or float expected! Got {} at index {}!'\
-                        .format(signal_name, type(value), index)
-                    LOGGER.error(error)
-                    validation = False
-                else:
-                    if value < 0:
-                        error = 'Signal <{}> value expected to be greater than 0! Got {} instead at index {}!'\
-                            .format(signal_name, value, index)
-                        LOGGER.error(error)
-                        validation = False
-
-    signal_name = SIGNAL_RR_PRES
-    rr_pres = profile.get(signal_name, None)
-    signal = rr_pres
-    if signal is None:
-        error = 'Signal <{}> not defined within simulation profile!'.format(signal_name)
-        LOGGER.error(error)
-        validation = False
-    else:
-        if not isinstance(signal, list):
-            error = 'Signal <{}> type list expected! Got {} instead!'\
-                .format(signal_name, type(signal))
-            LOGGER.error(error)
             validation = False
-        else:
-            for index, value in enumerate(signal):
-                if not isinstance(value, int) and not isinstance(value, float):
-                    error = 'Signal <{}> value type int or float expected! Got {} at index {}!'\
-                        .format(signal_name, type(value), index)
-                    LOGGER.error(error)
-                    validation = False
-                else:
-                    if value < 0:
-                        error = 'Signal <{}> value expected to be greater than 0! Got {} instead at index {}!'\
-                            .format(signal_name, value, index)
-                        LOGGER.error(error)
-                        validation = False
 
     if not validation:
         return False
 
-    if len(fl_vel) == len(fr_vel) == len(rl_vel) == len(rr_vel) == len(fl_pres) == len(fr_pres) == len(rl_pres) \
-            == len(rr_pres) == len(abs_ref):
-        pass
-    else:
+    if len(set(lengths.values())) > 1:
         error = 'Simulation signals length miss match!\n'
-        error += '{}: {} entries\n'.format(SIGNAL_ABS_REF, len(abs_ref))
-        error += '{}: {} entries\n'.format(SIGNAL_FL_VEL, len(fl_vel))
-        error += '{}: {} entries\n'.format(SIGNAL_FR_VEL, len(fr_vel))
-        error += '{}: {} entries\n'.format(SIGNAL_RL_VEL, len(rl_vel))
-        error += '{}: {} entries\n'.format(SIGNAL_RR_VEL, len(rr_vel))
-        error += '{}: {} entries\n'.format(SIGNAL_FL_PRES, len(fl_pres))
-        error += '{}: {} entries\n'.format(SIGNAL_FR_PRES, len(fr_pres))
-        error += '{}: {} entries\n'.format(SIGNAL_RL_PRES, len(rl_pres))
-        error += '{}: {} entries\n'.format(SIGNAL_RR_PRES, len(rr_pres))
+        for signal_name, length in lengths.items():
+            error += '{}: {} entries\n'.format(signal_name, length)
 
         LOGGER.error(error)
         validation = False
@@ -0,0 +1,316 @@
+import logging
+import socket
+import threading
+
+
+from abc import ABC, abstractmethod
+from time import perf_counter
+
+
+from car_sim_etti import APP_SLUG
+from car_sim_etti.utils.scheduler import TimingStats
+from car_sim_etti.utils.simulation_engine import FrameSink
+from car_sim_etti.utils.spi import DEFAULT_FRAME_LAYOUTS, decode_frames, encode_frames, get_tick_indexes
+
+
+LOGGER = logging.getLogger(APP_SLUG)
+
+
+TRANSPORT_SPIDEV = 'spidev'
+TRANSPORT_UDP = 'udp'
+TRANSPORT_LOOPBACK = 'loopback'
+
+TRANSPORTS = (TRANSPORT_SPIDEV, TRANSPORT_UDP, TRANSPORT_LOOPBACK)
+
+DEFAULT_SPI_SPEED = 1000000  # Hz
+DEFAULT_SPI_MODE = 0
+
+
+class Transport(ABC):
+    """Transport
+
+        Byte sink the HIL output is streamed to. Methods are called on the HIL sender thread.
+        send must be overridden, so an incomplete transport fails when created instead of mid run.
+    """
+    def open(self):
+        """open
+
+        :return: None
+        """
+        pass
+
+    @abstractmethod
+    def send(self, data):
+        """send
+
+        :param data: bytes of every frame of one tick
+        :type data: memoryview
+        :return: None
+        """
+
+    def close(self):
+        """close
+
+        :return: None
+        """
+        pass
+
+
+class SpidevTransport(Transport):
+    """SpidevTransport
+
+        Linux SPI device, through the optional spidev package.
+    """
+    def __init__(self, bus=0, device=0, speed=DEFAULT_SPI_SPEED, mode=DEFAULT_SPI_MODE):
+        """
+
+        :param bus: SPI bus number
+        :param device: chip select number
+        :param speed: SPI clock in Hz
+        :param mode: SPI mode, clock polarity and phase
+        """
+        self.bus = bus
+        self.device = device
+        self.speed = speed
+        self.mode = mode
+        self.spi = None
+
+    def open(self):
+        # optional dependency, only needed on the test rig PC
+        import spidev
+
+        self.spi = spidev.SpiDev()
+        self.spi.open(self.bus, self.device)
+        self.spi.max_speed_hz = self.speed
+        self.spi.mode = self.mode
+
+    def send(self, data):
+        self.spi.writebytes2(data)
+
+    def close(self):
+        if self.spi is not None:
+            self.spi.close()
+            self.spi = None
+
+    def __repr__(self):
+        return 'spidev {}.{} @ {}Hz'.format(self.bus, self.device, self.speed)
+
+
+class UdpTransport(Transport):
+    """UdpTransport
+
+        One datagram per tick, for rigs bridging SPI over Ethernet.
+    """
+    def __init__(self, host, port):
+        """
+
+        :param host: receiver host
+        :param port: receiver UDP port
+        """
+        self.address = (host, port)
+        self.socket = None
+
+    def open(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, data):
+        self.socket.sendto(data, self.address)
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def __repr__(self):
+        return 'udp {}:{}'.format(*self.address)
+
+
+class LoopbackTransport(Transport):
+    """LoopbackTransport
+
+        In process stand-in for a test rig: keeps every sent byte.
+    """
+    def __init__(self):
+        self.received = bytearray()
+        self.sends = 0
+
+    def open(self):
+        self.received = bytearray()
+        self.sends = 0
+
+    def send(self, data):
+        self.received.extend(data)
+        self.sends += 1
+
+    def frames(self):
+        """frames
+
+        :return: frames received so far
+        :rtype: SpiFrames
+        """
+        return decode_frames(bytes(self.received))
+
+    def __repr__(self):
+        return 'loopback'
+
+
+def create_transport(spec):
+    """create_transport
+
+        Create transport from its textual specification: 'spidev[:bus.device[:speed]]', 'udp:host:port' or
+        'loopback'.
+    :param spec: transport specification
+    :type spec: str
+    :return: transport
+    :rtype: Transport
+    """
+    kind, _, options = spec.partition(':')
+    if kind == TRANSPORT_LOOPBACK:
+        return LoopbackTransport()
+
+    if kind == TRANSPORT_UDP:
+        host, _, port = options.rpartition(':')
+        if not host or not port.isdigit():
+            raise ValueError('UDP transport expects udp:host:port! Got [{}] instead!'.format(spec))
+        return UdpTransport(host, int(port))
+
+    if kind == TRANSPORT_SPIDEV:
+        device, _, speed = options.partition(':')
+        bus, _, chip_select = (device or '0.0').partition('.')
+        try:
+            return SpidevTransport(int(bus), int(chip_select or 0), int(speed) if speed else DEFAULT_SPI_SPEED)
+        except ValueError:
+            raise ValueError('SPI transport expects spidev:bus.device[:speed]! Got [{}] instead!'.format(spec))
+
+    raise ValueError('Unknown transport [{}]! Supported transports are: {}!'.format(kind, TRANSPORTS))
+
+
+class HilOutputStreamer(FrameSink):
+    """HilOutputStreamer
+
+        Streams SPI frames of every played tick through a transport, on its own sender thread.
+        The whole profile is encoded once on start. Each tick the engine thread copies its frames into the back
+        buffer of a double buffer, the sender thread swaps buffers and sends the front one, so a slow transport never
+        stalls playback. A tick still unsent when the next one arrives is dropped, only the latest values matter.
+        A tick is late (deadline miss) when its send completes one period or more after the engine produced it.
+    """
+    def __init__(self, transport, layouts=DEFAULT_FRAME_LAYOUTS, clock=perf_counter):
+        """
+
+        :param transport: output transport
+        :param layouts: frames sent each tick
+        :param clock: clock used to measure send lateness, in seconds
+        """
+        self.transport = transport
+        self.layouts = layouts
+        self.clock = clock
+
+        self.encoded = None
+        self.index_growth = 1
+        self.stats = None
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self.__buffers__ = None
+        self.__back__ = 0
+        self.__length__ = 0
+        self.__pending__ = False
+        self.__pending_time__ = None
+        self.__running__ = False
+        self.__condition__ = threading.Condition()
+        self.__thread__ = None
+
+    @property
+    def deadline_misses(self):
+        return self.stats.late_ticks if self.stats is not None else 0
+
+    def on_start(self, engine):
+        self.index_growth = engine.index_growth
+        self.encoded = encode_frames(engine.signals, self.layouts, get_tick_indexes(engine.stamps, self.index_growth))
+        tick_length = len(self.encoded.tick(0)) if self.encoded.ticks else 0
+        self.__buffers__ = [bytearray(tick_length), bytearray(tick_length)]
+        self.__back__ = 0
+        self.__length__ = tick_length
+        self.__pending__ = False
+
+        self.stats = TimingStats(engine.period)
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+
+        try:
+            self.transport.open()
+        except Exception as err:
+            LOGGER.error('Failed to open HIL output {}! Streaming disabled for this run!'.format(self.transport))
+            LOGGER.error(err)
+            self.__thread__ = None
+            return
+
+        self.__running__ = True
+        self.__thread__ = threading.Thread(target=self.__send_task__, name='hil_output', daemon=True)
+        self.__thread__.start()
+        LOGGER.info('HIL output started: {}, {} ticks encoded ({} bytes)'.format(
+            self.transport, self.encoded.ticks, self.encoded.data.nbytes))
+
+    def on_frame(self, frame):
+        if self.__thread__ is None:
+            return
+
+        # engine sample index (tick + 1) * growth, see SimulationEngine.run
+        tick_data = self.encoded.tick(frame.index // self.index_growth - 1)
+        with self.__condition__:
+            self.__buffers__[self.__back__][:] = tick_data
+            if self.__pending__:
+                self.dropped += 1
+            self.__pending__ = True
+            self.__pending_time__ = self.clock()
+            self.__condition__.notify()
+
+    def on_stop(self, engine, completed):
+        if self.__thread__ is None:
+            return
+
+        with self.__condition__:
+            self.__running__ = False
+            self.__condition__.notify()
+        self.__thread__.join()
+        self.transport.close()
+        LOGGER.info('HIL output stopped: {}'.format(self.report()))
+
+    def __send_task__(self):
+        """__send_task__
+
+            Sender thread: waits for a pending tick, swaps buffers and sends the front one.
+        :return: None
+        """
+        while True:
+            with self.__condition__:
+                while not self.__pending__ and self.__running__:
+                    self.__condition__.wait()
+                if not self.__pending__:
+                    return
+
+                front = self.__back__
+                self.__back__ = 1 - front
+                self.__pending__ = False
+                produced = self.__pending_time__
+
+            try:
+                self.transport.send(memoryview(self.__buffers__[front])[:self.__length__])
+                self.sent += 1
+            except Exception as err:
+                if not self.errors:
+                    LOGGER.error('HIL output send failed! {}'.format(err))
+                self.errors += 1
+            self.stats.add(self.clock() - produced)
+
+    def report(self):
+        """report
+
+        :return: streaming statistics
+        :rtype: str
+        """
+        return '{} ticks sent, {} dropped, {} deadline misses, {} errors, send latency mean {:.3f}ms max {:.3f}ms'\
+            .format(self.sent, self.dropped, self.deadline_misses, self.errors, self.stats.mean_lateness * 1000,
+                    self.stats.max_lateness * 1000)
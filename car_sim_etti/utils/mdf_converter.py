@@ -1,112 +1,450 @@
+import argparse
+import glob
+import hashlib
 import json
+import logging
+import numpy
 import os
+import sys
+
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+
 from asammdf.mdf import MDF
 
 
-def convert_mdf_to_sim_profile(mdf_file, rename):
+from car_sim_etti import APP_SLUG
+from car_sim_etti.utils.generic import ALLOWED_SAMPLING_PERIODS, SENTINEL_VALUE, SIGNAL_SAMPLING_PERIOD
+from car_sim_etti.utils.profile_format import FIXED_POINT_DECIMALS, PROFILE_EXTENSION, write_binary_profile
+
+
+LOGGER = logging.getLogger(APP_SLUG)
+
+
+MDF_EXTENSIONS = ('.mdf', '.mf4', '.dat')
+
+# (measurement signal name, simulation profile signal name)
+TARGET_SIGNALS = (
+    ('ABSRef', 'abs_ref'),
+    ('VEL_FL', 'fl_vel'),
+    ('VEL_FR', 'fr_vel'),
+    ('VEL_RL', 'rl_vel'),
+    ('VEL_RR', 'rr_vel'),
+
+    ('MkcPmPress_FL_fast_00', 'fl_pres'),
+    ('MkcPmPress_FR_fast_00', 'fr_pres'),
+    ('MkcPmPress_RL_fast_00', 'rl_pres'),
+    ('MkcPmPress_RR_fast_00', 'rr_pres'),
+)
+
+SAMPLING_PERIOD = 0.01  # seconds, default common raster all channels are resampled onto
+
+# samples are kept with the 2 decimals the binary format stores as fixed point
+SAMPLE_DECIMALS = FIXED_POINT_DECIMALS
+
+# bump whenever conversion changes its output, so existing profiles get converted again
+CONVERTER_VERSION = 1
+
+MANIFEST_FILE_NAME = 'conversion_manifest.json'  # kept within the output directory
+MANIFEST_VERSION = 2  # 2: entries keyed by absolute measurement path instead of file name
+HASH_CHUNK_SIZE = 1024 * 1024  # bytes
+
+CONVERSION_STATUS_CONVERTED = 'converted'
+CONVERSION_STATUS_SKIPPED = 'skipped'  # measurement unchanged since its last conversion
+CONVERSION_STATUS_FAILED = 'failed'
+
+CONVERSION_COLUMNS = ('file', 'status', 'output', 'samples', 'size', 'time', 'error')
+
+
+def build_raster(timestamps, period):
+    """build_raster
+
+        Build the common time raster of channels recorded at different rates, spanning the time all channels cover.
+    :param timestamps: timestamps of each channel, in seconds
+    :type timestamps: list of numpy.ndarray
+    :param period: raster period in seconds
+    :type period: float
+    :return: raster timestamps
+    :rtype: numpy.ndarray
+    """
+    if any(len(channel_timestamps) == 0 for channel_timestamps in timestamps):
+        raise ValueError('Empty channel, nothing to resample!')
+
+    start = max(channel_timestamps[0] for channel_timestamps in timestamps)
+    end = min(channel_timestamps[-1] for channel_timestamps in timestamps)
+    if end < start:
+        raise ValueError('Channels do not overlap in time!')
+
+    # tolerance keeps the last raster point when the span is a whole number of periods up to float error
+    count = int((end - start) / period + 1e-6) + 1
+    return start + numpy.arange(count) * period
+
+
+def reforge_samples(samples, timestamps=None, raster=None):
+    """reforge_samples
+
+        Replace sentinel values by 0, resample onto raster if given and round to SAMPLE_DECIMALS, on the whole array
+        at once.
+    :param samples: measured samples
+    :type samples: numpy.ndarray
+    :param timestamps: samples timestamps in seconds, required for resampling
+    :type timestamps: numpy.ndarray
+    :param raster: timestamps samples are linearly interpolated at, None to keep samples as they are
+    :type raster: numpy.ndarray
+    :return: reforged samples, new array
+    :rtype: numpy.ndarray
+    """
+    samples = numpy.asarray(samples)
+    # sentinel is compared in the channel own dtype, float32 0.12 is not float64 0.12
+    sentinel = samples.dtype.type(SENTINEL_VALUE) if numpy.issubdtype(samples.dtype, numpy.floating) \
+        else SENTINEL_VALUE
+    reforged = samples.astype(numpy.float64)
+    # sentinels are replaced before interpolation, so they do not leak into neighbouring raster points
+    reforged[samples == sentinel] = 0
+    if raster is not None:
+        reforged = numpy.interp(raster, numpy.asarray(timestamps, dtype=numpy.float64), reforged)
+    return numpy.round(reforged, SAMPLE_DECIMALS, out=reforged)
+
+
+def convert_mdf_to_sim_profile(mdf_file, output_file, period=SAMPLING_PERIOD):
     """convert_mdf_to_sim_profile
 
-    :param mdf_file:
-    :return:
+        Convert measurement to a binary simulation profile. Each channel is read with its own timestamps and
+        resampled onto a common raster, so channels recorded at different rates line up.
+    :param mdf_file: MDF measurement path
+    :type mdf_file: str
+    :param output_file: binary simulation profile path
+    :type output_file: str
+    :param period: common raster period in seconds, recorded as the profile sampling period
+    :type period: float
+    :return: number of samples per signal
+    :rtype: int
     """
-    target_signals = [
-        ('ABSRef', 'abs_ref'),
-        ('VEL_FL', 'fl_vel'),
-        ('VEL_FR', 'fr_vel'),
-        ('VEL_RL', 'rl_vel'),
-        ('VEL_RR', 'rr_vel'),
-
-        ('MkcPmPress_FL_fast_00', 'fl_pres'),
-        ('MkcPmPress_FR_fast_00', 'fr_pres'),
-        ('MkcPmPress_RL_fast_00', 'rl_pres'),
-        ('MkcPmPress_RR_fast_00', 'rr_pres'),
-    ]
+    if period not in ALLOWED_SAMPLING_PERIODS:
+        raise ValueError('Invalid sampling period [{}]! Allowed periods are: {}!'
+                         .format(period, ALLOWED_SAMPLING_PERIODS))
+
     x = MDF(mdf_file)
+    signals = [next(x.iter_get(measurement_signal_name, )) for measurement_signal_name, _ in TARGET_SIGNALS]
+    raster = build_raster([signal.timestamps for signal in signals], period)
+
+    sim_profile = {SIGNAL_SAMPLING_PERIOD: period}
+
+    for (_, signal_name), signal in zip(TARGET_SIGNALS, signals):
+        sim_profile[signal_name] = reforge_samples(signal.samples, signal.timestamps, raster)
+
+    write_binary_profile(sim_profile, output_file)
+
+    return len(raster)
 
-    sim_profile = {'sampling_period': 0.01}
 
-    for target_signal in target_signals:
-        signal = next(x.iter_get(target_signal[0], ))
-        samples = signal.samples
-        reforged_samples = []
-        for sample in samples:
-            if sample == 0.12:
-                sample = 0
-                reforged_samples.append(round(sample, 2))
-            else:
-                reforged_samples.append(round(sample, 2))
+def get_output_file(mdf_file, output_directory):
+    """get_output_file
+
+    :param mdf_file: MDF measurement path
+    :type mdf_file: str
+    :param output_directory: simulation profiles output directory
+    :type output_directory: str
+    :return: simulation profile path, named after the measurement
+    :rtype: str
+    """
+    file_name = os.path.splitext(os.path.basename(mdf_file))[0]
+    return os.path.join(output_directory, file_name + PROFILE_EXTENSION)
+
+
+def collect_mdf_files(sources):
+    """collect_mdf_files
+
+    :param sources: MDF files, directories (MDF files directly within) or glob patterns
+    :type sources: list of str
+    :return: MDF measurement paths, sorted and without duplicates
+    :rtype: list of str
+    """
+    mdf_files = set()
+    for source in sources:
+        if os.path.isdir(source):
+            mdf_files.update(os.path.join(source, file_name) for file_name in os.listdir(source)
+                             if file_name.lower().endswith(MDF_EXTENSIONS))
+        elif os.path.isfile(source):
+            mdf_files.add(source)
+        else:
+            matches = [match for match in glob.glob(source) if os.path.isfile(match)]
+            if not matches:
+                LOGGER.warning('No MDF files matching {}'.format(source))
+            mdf_files.update(matches)
+
+    return sorted(os.path.abspath(mdf_file) for mdf_file in mdf_files)
+
+
+def hash_file(file):
+    """hash_file
+
+    :param file: file path
+    :type file: str
+    :return: SHA-256 hex digest of file content
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(file, 'rb') as file_handler:
+        for chunk in iter(lambda: file_handler.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_converter_settings(period=SAMPLING_PERIOD):
+    """get_converter_settings
+
+        Everything the content of a converted profile depends on, besides its measurement.
+    :param period: common raster period in seconds
+    :type period: float
+    :return: converter settings, JSON compatible
+    :rtype: dict
+    """
+    return {
+        'converter_version': CONVERTER_VERSION,
+        'period': period,
+        'sentinel': SENTINEL_VALUE,
+        'decimals': SAMPLE_DECIMALS,
+        'signals': [list(target_signal) for target_signal in TARGET_SIGNALS],
+    }
+
+
+def get_manifest_key(mdf_file):
+    """get_manifest_key
+
+    :param mdf_file: MDF measurement path
+    :type mdf_file: str
+    :return: manifest entry key, the absolute measurement path, so same named measurements do not share entries
+    :rtype: str
+    """
+    return os.path.normcase(os.path.abspath(mdf_file))
+
+
+def load_manifest(output_directory):
+    """load_manifest
+
+    :param output_directory: simulation profiles output directory
+    :type output_directory: str
+    :return: conversion manifest, empty if missing or unreadable
+    :rtype: dict
+    """
+    manifest_file = os.path.join(output_directory, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_file):
+        return {'version': MANIFEST_VERSION, 'settings': None, 'files': {}}
+
+    try:
+        with open(manifest_file, 'r') as file_handler:
+            manifest = json.load(file_handler)
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError('Unsupported manifest version [{}]!'.format(manifest.get('version')))
+    except Exception as err:
+        LOGGER.warning('Ignoring conversion manifest {}, every file is converted again!'.format(manifest_file))
+        LOGGER.warning(err)
+        return {'version': MANIFEST_VERSION, 'settings': None, 'files': {}}
+
+    return manifest
+
+
+def save_manifest(manifest, output_directory):
+    """save_manifest
+
+        Write manifest atomically, an interrupted write never leaves a corrupted manifest behind.
+    :param manifest: conversion manifest
+    :type manifest: dict
+    :param output_directory: simulation profiles output directory
+    :type output_directory: str
+    :return: None
+    """
+    manifest_file = os.path.join(output_directory, MANIFEST_FILE_NAME)
+    temporary_file = manifest_file + '.tmp'
+    with open(temporary_file, 'w') as file_handler:
+        json.dump(manifest, file_handler, indent=1, sort_keys=True)
+    os.replace(temporary_file, manifest_file)
+
+
+def get_output_collisions(mdf_files, output_directory):
+    """get_output_collisions
+
+        Find measurements converted to the same simulation profile, e.g. a/x.mf4 and b/x.mf4 or x.mdf and x.mf4.
+    :param mdf_files: MDF measurement paths
+    :type mdf_files: list of str
+    :param output_directory: simulation profiles output directory
+    :type output_directory: str
+    :return: colliding measurements by measurement path, measurements without collisions are left out
+    :rtype: dict
+    """
+    by_output = OrderedDict()
+    for mdf_file in mdf_files:
+        output_file = os.path.normcase(os.path.abspath(get_output_file(mdf_file, output_directory)))
+        by_output.setdefault(output_file, []).append(mdf_file)
+
+    collisions = {}
+    for colliding in by_output.values():
+        if len(colliding) > 1:
+            for mdf_file in colliding:
+                collisions[mdf_file] = [other for other in colliding if other != mdf_file]
+    return collisions
+
+
+def convert_mdf_file(mdf_file, output_directory, overwrite=False, period=SAMPLING_PERIOD, known_entry=None):
+    """convert_mdf_file
+
+        Convert one measurement unless known_entry shows it was already converted from the same content.
+        Never raises, so a bad file does not abort a batch.
+    :param mdf_file: MDF measurement path
+    :type mdf_file: str
+    :param output_directory: simulation profiles output directory
+    :type output_directory: str
+    :param overwrite: convert even if the measurement did not change
+    :type overwrite: bool
+    :param period: common raster period in seconds
+    :type period: float
+    :param known_entry: manifest entry of the previous conversion, made with the same converter settings
+    :type known_entry: dict
+    :return: conversion summary row and manifest entry (None if the conversion failed)
+    :rtype: tuple
+    """
+    start = perf_counter()
+    output_file = get_output_file(mdf_file, output_directory)
+    row = OrderedDict((column, None) for column in CONVERSION_COLUMNS)
+    row.update(file=mdf_file, output=output_file)
+    entry = None
+
+    try:
+        stat = os.stat(mdf_file)
+        # unchanged size and modification time means unchanged content, so the file is not even read
+        if known_entry and known_entry['size'] == stat.st_size and known_entry['mtime_ns'] == stat.st_mtime_ns:
+            content_hash = known_entry['hash']
+        else:
+            content_hash = hash_file(mdf_file)
+        entry = {'hash': content_hash, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                 'output': os.path.basename(output_file)}
+
+        if (not overwrite and known_entry and known_entry['hash'] == content_hash and
+                known_entry['output'] == entry['output'] and os.path.exists(output_file)):
+            row['status'] = CONVERSION_STATUS_SKIPPED
+        else:
+            row['samples'] = convert_mdf_to_sim_profile(mdf_file, output_file, period)
+            row['status'] = CONVERSION_STATUS_CONVERTED
+        row['size'] = os.path.getsize(output_file)
+    except Exception as err:
+        row['status'] = CONVERSION_STATUS_FAILED
+        row['error'] = '{}: {}'.format(type(err).__name__, err)
+        entry = None
+
+    row['time'] = round(perf_counter() - start, 3)
+    return row, entry
+
+
+def convert_mdf_batch(mdf_files, output_directory, workers=None, overwrite=False, period=SAMPLING_PERIOD):
+    """convert_mdf_batch
+
+        Convert measurements in parallel, across a process pool. Only new or changed measurements are converted:
+        a manifest of source content hashes and converter settings is kept within the output directory.
+        Measurements sharing an output name fail, none of them is converted.
+    :param mdf_files: MDF measurement paths
+    :type mdf_files: list of str
+    :param output_directory: simulation profiles output directory, created if missing
+    :type output_directory: str
+    :param workers: number of worker processes, defaults to the number of CPUs
+    :type workers: int
+    :param overwrite: convert even if the measurement did not change
+    :type overwrite: bool
+    :param period: common raster period in seconds
+    :type period: float
+    :return: conversion summary rows, in mdf_files order
+    :rtype: list of OrderedDict
+    """
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
+
+    manifest = load_manifest(output_directory)
+    settings = get_converter_settings(period)
+    if manifest['settings'] != settings:
+        if manifest['files']:
+            LOGGER.info('Converter settings changed, every file is converted again')
+        manifest = {'version': MANIFEST_VERSION, 'settings': settings, 'files': {}}
+
+    rows = [None] * len(mdf_files)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            collisions = get_output_collisions(mdf_files, output_directory)
+            for index, mdf_file in enumerate(mdf_files):
+                if mdf_file in collisions:
+                    row = OrderedDict((column, None) for column in CONVERSION_COLUMNS)
+                    row.update(file=mdf_file, output=get_output_file(mdf_file, output_directory),
+                               status=CONVERSION_STATUS_FAILED,
+                               error='Output name collides with: {}'.format(', '.join(collisions[mdf_file])))
+                    rows[index] = row
+                    LOGGER.error('{} output name collides with: {}'.format(mdf_file, collisions[mdf_file]))
+                    continue
+
+                known_entry = manifest['files'].get(get_manifest_key(mdf_file))
+                futures[executor.submit(convert_mdf_file, mdf_file, output_directory, overwrite, period,
+                                        known_entry)] = index
+
+            for done, future in enumerate(as_completed(futures), 1):
+                row, entry = future.result()
+                rows[futures[future]] = row
+                if entry is None:
+                    manifest['files'].pop(get_manifest_key(row['file']), None)
+                else:
+                    manifest['files'][get_manifest_key(row['file'])] = entry
+                LOGGER.info('[{}/{}] {}: {}'.format(done, len(futures), os.path.basename(row['file']), row['status']))
+    finally:
+        # conversions finished so far are kept even if the batch gets interrupted
+        save_manifest(manifest, output_directory)
+
+    return rows
+
+
+def format_conversion_summary(rows):
+    """format_conversion_summary
+
+    :param rows: conversion summary rows
+    :type rows: list of OrderedDict
+    :return: fixed width text table, one line per file, followed by status totals
+    :rtype: str
+    """
+    table = [CONVERSION_COLUMNS]
+    for row in rows:
+        line = dict(row, file=os.path.basename(row['file']), output=os.path.basename(row['output']))
+        table.append(tuple('' if line[column] is None else str(line[column]) for column in CONVERSION_COLUMNS))
+    widths = [max(len(line[column]) for line in table) for column in range(len(CONVERSION_COLUMNS))]
+    lines = ['  '.join(value.ljust(width) for value, width in zip(line, widths)).rstrip() for line in table]
 
-        sim_profile[target_signal[1]] = list(reforged_samples)
+    totals = OrderedDict((status, 0) for status in (CONVERSION_STATUS_CONVERTED, CONVERSION_STATUS_SKIPPED,
+                                                    CONVERSION_STATUS_FAILED))
+    for row in rows:
+        totals[row['status']] += 1
+    lines.append(', '.join('{} {}'.format(count, status) for status, count in totals.items()))
 
-    file_name = os.path.basename(mdf_file)
-    file_handler = open(r'D:\masu\{}.json'.format(rename), 'w+')
-    # file_handler = open(r'D:\{}.json'.format(file_name.lower().replace('.mdf', '')), 'w+')
-    file_handler.write(json.dumps(sim_profile, indent=3))
-    file_handler.close()
+    return '\n'.join(lines)
 
 
 if __name__ == '__main__':
-    # rename files
-    # ==================================================================================================================
-    path = r'C:\Users\ScorpionIPX\Desktop\meas_ipx'
-    json_files = [os.path.join(path, f) for f in os.listdir(path) if f.endswith('.json')]
-    # for json_file in json_files:
-    #     print(json_file)
-
-    speeds = [50, 60, 70, 80, 90, 100, 110, 120, 130]
-    us = ['03', '04', '05', '06', '07', '08', '09', '38']
-
-    index = 0
-    for u in us:
-        for s in speeds:
-            rename = '{}_{}.json'.format(s, u)
-            old = json_files[index]
-            new = os.path.join(path, rename)
-            print('{} - > {}'.format(old, new))
-            index += 1
-            # os.rename(old, new)
-    # ==================================================================================================================
-
-    # path = r'C:\Users\ScorpionIPX\Desktop\meas_ipx'
-    # mdf_files = [os.path.join(path, f) for f in os.listdir(path) if f.endswith('.json')]
-    # files = []
-    # for mdf_file in mdf_files:
-    #     files.append(mdf_file)
-    # speeds = [50, 60, 70, 80, 90, 100, 110, 120, 130]
-    # us = [0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 3.8]
-    # file_index = 0
-    # for speed in speeds:
-    #     for u in us:
-    #         renaming = '{}_{}'.format(speed, u)
-    #         print(file_index, renaming)
-    #         file_index += 1
-    #         mdf_file = files[file_index]
-    #         # convert_mdf_to_sim_profile(mdf_file, rename=renaming)
-    #         # print(mdf_file)
-
-    path = r'C:\Users\ScorpionIPX\Desktop\meas_ipx'
-    json_files = [os.path.join(path, f) for f in os.listdir(path) if f.endswith('.json')]
-    print('{} files'.format(len(json_files)))
-    # for file in json_files:
-    #     print(file)
-
-    for file in json_files:
-        # if '07' in file:
-        #     continue
-        # if '08' in file:
-        #     continue
-        file_handler = open(file, 'r')
-        content = file_handler.read()
-        file_handler.close()
-        signals = json.loads(content)
-        speeds = signals['abs_ref']
-        max_speed = max(signals['abs_ref'])
-        file_name = os.path.basename(file)
-        diff = int(file_name[:file_name.find('_')]) - max_speed
-        warning = 'WARNING! ' * 3 + '\n' if abs(diff) > 2 else 'OK'
-        lenu = len(speeds)
-        print('{} -> max speed: {}km/h diff: {} len: {} {}'
-              .format(file.split('\\')[-1], max_speed, diff, lenu, warning))
+    parser = argparse.ArgumentParser(description='Convert MDF measurements to simulation profiles.')
+    parser.add_argument('sources', nargs='+', help='MDF files, directories or glob patterns')
+    parser.add_argument('-o', '--output', required=True, help='simulation profiles output directory')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, defaults to CPU count')
+    parser.add_argument('--overwrite', action='store_true', help='convert even unchanged measurements')
+    parser.add_argument('--period', type=float, default=SAMPLING_PERIOD, choices=ALLOWED_SAMPLING_PERIODS,
+                        help='common raster period in seconds, all channels are resampled onto it')
+    arguments = parser.parse_args()
 
+    measurements = collect_mdf_files(arguments.sources)
+    if not measurements:
+        LOGGER.error('No MDF files found!')
+        sys.exit(1)
 
+    batch_start = perf_counter()
+    conversion_rows = convert_mdf_batch(measurements, arguments.output, workers=arguments.workers,
+                                        overwrite=arguments.overwrite, period=arguments.period)
 
+    print(format_conversion_summary(conversion_rows))
+    LOGGER.info('{} files processed in {:.2f}s'.format(len(conversion_rows), perf_counter() - batch_start))
+    sys.exit(1 if any(row['status'] == CONVERSION_STATUS_FAILED for row in conversion_rows) else 0)
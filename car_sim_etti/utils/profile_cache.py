@@ -0,0 +1,169 @@
+import logging
+import numpy
+import os
+
+
+from collections import OrderedDict
+
+
+from car_sim_etti import APP_SLUG
+
+
+LOGGER = logging.getLogger(APP_SLUG)
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def profile_key(file):
+    """profile_key
+
+        Get cache key of a simulation profile file: its path, modification time and size.
+    :param file: simulation profile path
+    :type file: str
+    :return: cache key
+    :rtype: tuple
+    """
+    file = os.path.abspath(file)
+    stat = os.stat(file)
+    return file, stat.st_mtime_ns, stat.st_size
+
+
+def freeze_profile(profile):
+    """freeze_profile
+
+        Convert simulation profile signals to read only arrays, so they can be safely shared.
+    :param profile: simulation profile
+    :type profile: dict
+    :return: simulation profile with read only signals
+    :rtype: dict
+    """
+    frozen = {}
+    for name, value in profile.items():
+        if (isinstance(value, numpy.ndarray) and value.dtype == numpy.float64 and value.base is None and
+                not value.flags.writeable):
+            # already frozen and owning its data, e.g. decoded binary profile columns, no need for another copy
+            pass
+        elif isinstance(value, (list, numpy.ndarray)):
+            value = numpy.array(value, dtype=numpy.float64)
+            value.flags.writeable = False
+        frozen[name] = value
+    return frozen
+
+
+def profile_size(profile):
+    """profile_size
+
+    :param profile: frozen simulation profile
+    :type profile: dict
+    :return: memory used by signals, in bytes
+    :rtype: int
+    """
+    return sum(value.nbytes for value in profile.values() if isinstance(value, numpy.ndarray))
+
+
+class ProfileCache:
+    """ProfileCache
+
+        Bounded LRU cache of parsed and validated simulation profiles.
+        Cached signals are read only, copy them before altering.
+    """
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+
+        :param max_bytes: memory ceiling for cached signals, in bytes
+        :type max_bytes: int
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__profiles__ = OrderedDict()
+
+    def __len__(self):
+        return len(self.__profiles__)
+
+    def get(self, file):
+        """get
+
+        :param file: simulation profile path
+        :type file: str
+        :return: cached simulation profile or None
+        :rtype: dict
+        """
+        try:
+            key = profile_key(file)
+        except OSError:
+            self.misses += 1
+            return None
+
+        profile = self.__profiles__.get(key)
+        if profile is None:
+            self.misses += 1
+            return None
+
+        self.__profiles__.move_to_end(key)
+        self.hits += 1
+        return profile
+
+    def put(self, file, profile):
+        """put
+
+            Cache a validated simulation profile.
+        :param file: simulation profile path
+        :type file: str
+        :param profile: validated simulation profile
+        :type profile: dict
+        :return: frozen simulation profile, as cached
+        :rtype: dict
+        """
+        profile = freeze_profile(profile)
+        try:
+            key = profile_key(file)
+        except OSError:
+            return profile
+
+        # older versions of the same file will never be hit again
+        for stale_key in [k for k in self.__profiles__ if k[0] == key[0]]:
+            self.__remove__(stale_key)
+
+        size = profile_size(profile)
+        if size > self.max_bytes:
+            LOGGER.warning('Simulation profile too large to be cached: {} bytes'.format(size))
+            return profile
+
+        self.__profiles__[key] = profile
+        self.size += size
+
+        while self.size > self.max_bytes:
+            self.__remove__(next(iter(self.__profiles__)))
+            self.evictions += 1
+
+        return profile
+
+    def clear(self):
+        """clear
+
+        :return: None
+        """
+        self.__profiles__.clear()
+        self.size = 0
+
+    def __remove__(self, key):
+        """__remove__
+
+        :param key: cache key
+        :type key: tuple
+        :return: None
+        """
+        self.size -= profile_size(self.__profiles__.pop(key))
+
+    def stats(self):
+        """stats
+
+        :return: cache statistics
+        :rtype: str
+        """
+        return 'profile cache: {} hits, {} misses, {} evictions, {} profiles, {}/{} bytes'.format(
+            self.hits, self.misses, self.evictions, len(self.__profiles__), self.size, self.max_bytes)
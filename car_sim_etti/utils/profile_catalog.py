@@ -0,0 +1,227 @@
+import logging
+import os
+
+
+from car_sim_etti import APP_SLUG
+from car_sim_etti.utils.generic import SIGNAL_ABS_REF
+from car_sim_etti.utils.profile_format import PROFILE_EXTENSION, BinaryProfile
+
+
+LOGGER = logging.getLogger(APP_SLUG)
+
+
+# profile file names are formatted as {speed}_{road friction coefficient}, e.g. 50_03 is 50km/h on 0.3 mu
+# split road friction coefficient profiles encode both sides, e.g. 38 is 0.3/0.8 mu
+PROFILE_NAME_SEPARATOR = '_'
+SPLIT_MU_CODE_LENGTH = 2
+
+# profiles whose max ABS reference speed deviates more than this from the speed in their name are unusable
+SPEED_TOLERANCE = 2
+
+
+class ProfileCatalogEntry:
+    """ProfileCatalogEntry
+
+        Simulation profile metadata.
+    """
+    def __init__(self, path, speed, mu, split_mu, length, max_abs_ref, data_offset, signature):
+        """
+
+        :param path: simulation profile path
+        :param speed: profile speed, as encoded in file name, in km/h
+        :param mu: road friction coefficient (left side for split profiles)
+        :param split_mu: right side road friction coefficient for split profiles, None otherwise
+        :param length: number of samples
+        :param max_abs_ref: max ABS reference speed in km/h
+        :param data_offset: file offset of the columns data
+        :param signature: file size and modification time, used to detect changes
+        """
+        self.path = path
+        self.speed = speed
+        self.mu = mu
+        self.split_mu = split_mu
+        self.length = length
+        self.max_abs_ref = max_abs_ref
+        self.data_offset = data_offset
+        self.signature = signature
+
+    @property
+    def file_name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def split(self):
+        return self.split_mu is not None
+
+    @property
+    def usable(self):
+        """usable
+
+            Check if profile actually reaches the speed encoded in its name.
+        :return: check result
+        :rtype: bool
+        """
+        return abs(self.speed - self.max_abs_ref) <= SPEED_TOLERANCE
+
+    def __repr__(self):
+        return '{} (speed: {}, mu: {}, split mu: {}, length: {}, max abs ref: {}, data offset: {})'.format(
+            self.file_name, self.speed, self.mu, self.split_mu, self.length, self.max_abs_ref, self.data_offset)
+
+
+def parse_profile_name(file_name):
+    """parse_profile_name
+
+        Get speed and road friction coefficients encoded in profile file name.
+    :param file_name: profile file name, e.g. 50_03.csp
+    :type file_name: str
+    :return: speed, mu and split mu (None if not split), or None if name does not follow the convention
+    :rtype: tuple or None
+    """
+    name = os.path.splitext(os.path.basename(file_name))[0]
+    try:
+        speed, mu_code = name.split(PROFILE_NAME_SEPARATOR)
+        speed = int(speed)
+        if mu_code.startswith('0'):
+            return speed, int(mu_code) / 10, None
+        if len(mu_code) == SPLIT_MU_CODE_LENGTH:
+            return speed, int(mu_code[0]) / 10, int(mu_code[1]) / 10
+    except ValueError:
+        pass
+
+    return None
+
+
+def __file_signature__(path):
+    """__file_signature__
+
+    :param path: file path
+    :type path: str
+    :return: file size and modification time
+    :rtype: tuple
+    """
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class ProfileCatalog:
+    """ProfileCatalog
+
+        In memory index of a simulation profiles directory.
+        Entries are built once and only rebuilt for files that changed.
+    """
+    def __init__(self, directory):
+        """
+
+        :param directory: simulation profiles directory
+        :type directory: str
+        """
+        self.directory = directory
+        self.entries = {}
+        self.__directory_signature__ = None
+        self.refresh()
+
+    def refresh(self):
+        """refresh
+
+            Synchronize catalog with the profiles directory content.
+        :return: None
+        """
+        self.__directory_signature__ = self.__get_directory_signature__()
+
+        entries = {}
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith(PROFILE_EXTENSION):
+                continue
+
+            path = os.path.join(self.directory, file_name)
+            signature = __file_signature__(path)
+            entry = self.entries.get(path)
+            if entry is None or entry.signature != signature:
+                entry = self.__build_entry__(path, signature)
+            if entry is not None:
+                entries[path] = entry
+
+        self.entries = entries
+
+    def refresh_if_changed(self):
+        """refresh_if_changed
+
+            Refresh catalog if files were added, removed, renamed or rewritten since the last refresh.
+        :return: None
+        """
+        if self.__get_directory_signature__() != self.__directory_signature__:
+            self.refresh()
+
+    def __get_directory_signature__(self):
+        """__get_directory_signature__
+
+            Directory modification time alone misses profiles rewritten in place, e.g. by the MDF converter, so every
+            profile signature is part of it.
+        :return: profiles names and signatures
+        :rtype: tuple
+        """
+        signatures = []
+        for dir_entry in os.scandir(self.directory):
+            if dir_entry.name.endswith(PROFILE_EXTENSION):
+                stat = dir_entry.stat()
+                signatures.append((dir_entry.name, stat.st_size, stat.st_mtime_ns))
+        return tuple(sorted(signatures))
+
+    @staticmethod
+    def __build_entry__(path, signature):
+        """__build_entry__
+
+        :param path: simulation profile path
+        :type path: str
+        :param signature: file signature
+        :type signature: tuple
+        :return: catalog entry or None if file is not a valid profile
+        :rtype: ProfileCatalogEntry
+        """
+        parsed_name = parse_profile_name(path)
+        if parsed_name is None:
+            LOGGER.warning('Simulation profile name not recognized: {}'.format(path))
+            return None
+
+        try:
+            profile = BinaryProfile(path)
+            abs_ref = profile.column(SIGNAL_ABS_REF)
+        except Exception as err:
+            LOGGER.warning('Failed to index simulation profile {}! {}'.format(path, err))
+            return None
+
+        speed, mu, split_mu = parsed_name
+        max_abs_ref = float(abs_ref.max()) if profile.length else 0.
+
+        return ProfileCatalogEntry(path, speed, mu, split_mu, profile.length, max_abs_ref, profile.data_offset,
+                                   signature)
+
+    def find(self, target_speed, mu, split_mu=None):
+        """find
+
+            Find the best usable profile for the specified conditions.
+            Profile speed must reach the target speed, so the lowest speed above it is preferred.
+            Road friction coefficient is matched to the nearest available one.
+            In memory query only, callers knowing the directory may have changed call refresh_if_changed first.
+        :param target_speed: target speed in km/h
+        :type target_speed: int or float
+        :param mu: road friction coefficient (left side for split conditions)
+        :type mu: float
+        :param split_mu: right side road friction coefficient for split conditions
+        :type split_mu: float
+        :return: best matching entry or None if no usable profile exists
+        :rtype: ProfileCatalogEntry
+        """
+        split = split_mu is not None
+        candidates = [entry for entry in self.entries.values() if entry.usable and entry.split == split]
+        if not candidates:
+            return None
+
+        def distance(entry):
+            speed_short = entry.speed < target_speed
+            mu_distance = abs(entry.mu - mu)
+            if split:
+                mu_distance += abs(entry.split_mu - split_mu)
+            return speed_short, abs(entry.speed - target_speed), round(mu_distance, 3), entry.mu
+
+        return min(candidates, key=distance)
@@ -0,0 +1,330 @@
+import argparse
+import json
+import logging
+import numpy
+import os
+import struct
+
+
+from collections.abc import Mapping
+
+from car_sim_etti import APP_SLUG
+from car_sim_etti.utils.generic import SIGNAL_SAMPLING_PERIOD, SIGNAL_SCHEMA
+
+
+LOGGER = logging.getLogger(APP_SLUG)
+
+
+PROFILE_EXTENSION = '.csp'
+JSON_PROFILE_EXTENSION = '.json'
+
+PROFILE_MAGIC = b'CSPROF1\n'
+PROFILE_VERSION = 1
+PROFILE_HEADER_LENGTH_FORMAT = '<I'
+PROFILE_DATA_ALIGNMENT = 16
+
+PROFILE_SIGNALS = tuple(spec.name for spec in SIGNAL_SCHEMA)
+
+# signals are recorded with 2 decimals, so they are stored as fixed point 16 bits integers whenever lossless
+FIXED_POINT_DECIMALS = 2
+FIXED_POINT_DTYPE = '<i2'
+FLOAT_DTYPE = '<f8'
+
+
+def __align__(value, alignment=PROFILE_DATA_ALIGNMENT):
+    """__align__
+
+        Round value up to the next multiple of alignment.
+    :param value: value to be aligned
+    :type value: int
+    :param alignment: alignment in bytes
+    :type alignment: int
+    :return: aligned value
+    :rtype: int
+    """
+    return (value + alignment - 1) // alignment * alignment
+
+
+def __encode_column__(values):
+    """__encode_column__
+
+        Encode signal values using the most compact lossless column type.
+    :param values: signal values
+    :type values: list or numpy.ndarray
+    :return: encoded column, dtype and number of decimals
+    :rtype: tuple
+    """
+    values = numpy.asarray(values, dtype=numpy.float64)
+    scale = 10 ** FIXED_POINT_DECIMALS
+    fixed_point = numpy.round(values * scale)
+
+    info = numpy.iinfo(FIXED_POINT_DTYPE)
+    if fixed_point.size == 0 or (
+            fixed_point.min() >= info.min and fixed_point.max() <= info.max and
+            numpy.array_equal(fixed_point / scale, values)):
+        return fixed_point.astype(FIXED_POINT_DTYPE), FIXED_POINT_DTYPE, FIXED_POINT_DECIMALS
+
+    return values.astype(FLOAT_DTYPE), FLOAT_DTYPE, 0
+
+
+def write_binary_profile(profile, file):
+    """write_binary_profile
+
+        Write simulation profile using the binary columnar format.
+        File layout: magic, header length, JSON header, 16 bytes aligned columns.
+    :param profile: simulation profile, same structure as the JSON simulation profile
+    :type profile: dict
+    :param file: output file path
+    :type file: str
+    :return: None
+    """
+    signal_names = [signal_name for signal_name in PROFILE_SIGNALS if signal_name in profile]
+    if not signal_names:
+        raise ValueError('No signal to write! Expected at least one of: {}!'.format(PROFILE_SIGNALS))
+    length = len(profile[signal_names[0]])
+
+    columns = []
+    descriptors = []
+    offset = 0
+    for signal_name in signal_names:
+        data, dtype, decimals = __encode_column__(profile[signal_name])
+        if len(data) != length:
+            raise ValueError('Signal <{}> has {} entries, {} expected!'.format(signal_name, len(data), length))
+
+        descriptors.append({
+            'name': signal_name,
+            'dtype': dtype,
+            'decimals': decimals,
+            'offset': offset,
+        })
+        columns.append((offset, data))
+        offset = __align__(offset + data.nbytes)
+
+    header = {
+        'version': PROFILE_VERSION,
+        SIGNAL_SAMPLING_PERIOD: profile[SIGNAL_SAMPLING_PERIOD],
+        'length': length,
+        'columns': descriptors,
+    }
+    header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    prefix_length = len(PROFILE_MAGIC) + struct.calcsize(PROFILE_HEADER_LENGTH_FORMAT)
+    header += b' ' * (__align__(prefix_length + len(header)) - prefix_length - len(header))
+    data_offset = prefix_length + len(header)
+
+    with open(file, 'wb') as file_handler:
+        file_handler.write(PROFILE_MAGIC)
+        file_handler.write(struct.pack(PROFILE_HEADER_LENGTH_FORMAT, len(header)))
+        file_handler.write(header)
+        for column_offset, data in columns:
+            file_handler.seek(data_offset + column_offset)
+            file_handler.write(data.tobytes())
+
+
+def read_binary_profile_header(file):
+    """read_binary_profile_header
+
+        Read the header of a binary simulation profile. Column data is not touched.
+    :param file: binary simulation profile path
+    :type file: str
+    :return: header, including absolute data offset under 'data_offset' key
+    :rtype: dict
+    """
+    with open(file, 'rb') as file_handler:
+        magic = file_handler.read(len(PROFILE_MAGIC))
+        if magic != PROFILE_MAGIC:
+            raise ValueError('Not a binary simulation profile: {}'.format(file))
+
+        raw_length = file_handler.read(struct.calcsize(PROFILE_HEADER_LENGTH_FORMAT))
+        header_length, = struct.unpack(PROFILE_HEADER_LENGTH_FORMAT, raw_length)
+        header = json.loads(file_handler.read(header_length).decode('utf-8'))
+
+    if header.get('version') != PROFILE_VERSION:
+        raise ValueError('Unsupported binary simulation profile version [{}]: {}'.format(header.get('version'), file))
+
+    header['data_offset'] = len(PROFILE_MAGIC) + struct.calcsize(PROFILE_HEADER_LENGTH_FORMAT) + header_length
+    return header
+
+
+class BinaryProfile:
+    """BinaryProfile
+
+        Memory mapped binary simulation profile. Opening it only reads the header, columns are mapped on demand.
+    """
+    def __init__(self, file):
+        """
+
+        :param file: binary simulation profile path
+        :type file: str
+        """
+        self.file = file
+        self.header = read_binary_profile_header(file)
+        self.sampling_period = self.header[SIGNAL_SAMPLING_PERIOD]
+        self.length = self.header['length']
+        self.data_offset = self.header['data_offset']
+        self.columns = {column['name']: column for column in self.header['columns']}
+        self.signal_names = [column['name'] for column in self.header['columns']]
+
+    def raw_column(self, signal_name):
+        """raw_column
+
+            Get stored column values, as memory map.
+        :param signal_name: signal name
+        :type signal_name: str
+        :return: stored values
+        :rtype: numpy.ndarray
+        """
+        column = self.columns[signal_name]
+        if self.length == 0:
+            return numpy.zeros(0, dtype=column['dtype'])
+
+        return numpy.memmap(self.file, dtype=column['dtype'], mode='r',
+                            offset=self.data_offset + column['offset'], shape=(self.length, ))
+
+    def column(self, signal_name):
+        """column
+
+            Get decoded column values.
+        :param signal_name: signal name
+        :type signal_name: str
+        :return: signal values
+        :rtype: numpy.ndarray
+        """
+        column = self.columns[signal_name]
+        raw = self.raw_column(signal_name)
+        if column['decimals']:
+            # division (not multiplication by 0.01) yields the very same floats the JSON parser produces
+            # decoded into a new array owning its data, plain division of a memory map yields a view
+            return numpy.divide(raw, float(10 ** column['decimals']), out=numpy.empty(len(raw), dtype=numpy.float64))
+        return numpy.array(raw, dtype=numpy.float64)
+
+    def to_dict(self):
+        """to_dict
+
+            Get simulation profile with the same structure as the JSON simulation profile, every column decoded.
+        :return: simulation profile
+        :rtype: dict
+        """
+        profile = {SIGNAL_SAMPLING_PERIOD: self.sampling_period}
+        for signal_name in self.signal_names:
+            profile[signal_name] = self.column(signal_name)
+        return profile
+
+
+class LazyBinaryProfile(Mapping):
+    """LazyBinaryProfile
+
+        Binary simulation profile read as the JSON simulation profile structure. Columns are decoded on first access
+        only, as read only arrays, and kept.
+    """
+    def __init__(self, profile):
+        """
+
+        :param profile: memory mapped binary simulation profile
+        """
+        self.profile = profile
+        self.__decoded__ = {}
+
+    def __getitem__(self, key):
+        if key == SIGNAL_SAMPLING_PERIOD:
+            return self.profile.sampling_period
+
+        value = self.__decoded__.get(key)
+        if value is None:
+            if key not in self.profile.columns:
+                raise KeyError(key)
+            value = self.__decoded__[key] = self.profile.column(key)
+            value.flags.writeable = False
+        return value
+
+    def __contains__(self, key):
+        return key == SIGNAL_SAMPLING_PERIOD or key in self.profile.columns
+
+    def __iter__(self):
+        yield SIGNAL_SAMPLING_PERIOD
+        for signal_name in self.profile.signal_names:
+            yield signal_name
+
+    def __len__(self):
+        return len(self.profile.signal_names) + 1
+
+
+def load_binary_profile(file):
+    """load_binary_profile
+
+        Load binary simulation profile. Only the header is read, columns are decoded on first access.
+    :param file: binary simulation profile path
+    :type file: str
+    :return: simulation profile
+    :rtype: LazyBinaryProfile
+    """
+    return LazyBinaryProfile(BinaryProfile(file))
+
+
+def convert_json_profile(json_file, output_file=None):
+    """convert_json_profile
+
+        Convert JSON simulation profile to the binary columnar format.
+    :param json_file: JSON simulation profile path
+    :type json_file: str
+    :param output_file: binary simulation profile path, defaults to the JSON path with binary extension
+    :type output_file: str
+    :return: binary simulation profile path
+    :rtype: str
+    """
+    if output_file is None:
+        output_file = os.path.splitext(json_file)[0] + PROFILE_EXTENSION
+
+    with open(json_file, 'r') as file_handler:
+        profile = json.load(file_handler)
+
+    write_binary_profile(profile, output_file)
+
+    converted = load_binary_profile(output_file)
+    for signal_name in converted.keys() - {SIGNAL_SAMPLING_PERIOD}:
+        if not numpy.array_equal(converted[signal_name], numpy.asarray(profile[signal_name], dtype=numpy.float64)):
+            raise ValueError('Signal <{}> not preserved by conversion: {}'.format(signal_name, json_file))
+
+    return output_file
+
+
+def convert_json_profile_library(directory, remove_source=False, output_directory=None):
+    """convert_json_profile_library
+
+        Convert all JSON simulation profiles within directory to the binary columnar format.
+    :param directory: simulation profiles directory
+    :type directory: str
+    :param output_directory: binary simulation profiles directory, defaults to directory
+    :type output_directory: str
+    :param remove_source: remove JSON simulation profiles after successful conversion
+    :type remove_source: bool
+    :return: binary simulation profiles paths
+    :rtype: list of str
+    """
+    converted = []
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(JSON_PROFILE_EXTENSION):
+            continue
+
+        json_file = os.path.join(directory, file_name)
+        output_file = None
+        if output_directory is not None:
+            output_file = os.path.join(output_directory, os.path.splitext(file_name)[0] + PROFILE_EXTENSION)
+        output_file = convert_json_profile(json_file, output_file)
+        LOGGER.info('{} ({} bytes) -> {} ({} bytes)'.format(
+            file_name, os.path.getsize(json_file), os.path.basename(output_file), os.path.getsize(output_file)))
+        if remove_source:
+            os.remove(json_file)
+        converted.append(output_file)
+
+    return converted
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert JSON simulation profiles to the binary columnar format.')
+    parser.add_argument('directory', help='simulation profiles directory')
+    parser.add_argument('-o', '--output', default=None, help='binary profiles directory, defaults to directory')
+    parser.add_argument('--remove-json', action='store_true', help='remove JSON files after conversion')
+    arguments = parser.parse_args()
+
+    convert_json_profile_library(arguments.directory, remove_source=arguments.remove_json,
+                                 output_directory=arguments.output)
@@ -0,0 +1,375 @@
+import json
+import logging
+import numpy
+
+
+from collections import OrderedDict
+
+
+from car_sim_etti import APP_SLUG
+from car_sim_etti.utils.generic import (
+    SIGNAL_SAMPLING_PERIOD,
+
+    SIGNAL_ABS_REF,
+
+    SIGNAL_FL_VEL,
+    SIGNAL_FR_VEL,
+    SIGNAL_RL_VEL,
+    SIGNAL_RR_VEL,
+
+    sim_profile_valid,
+)
+from car_sim_etti.utils.profile_cache import ProfileCache, profile_key
+from car_sim_etti.utils.profile_format import PROFILE_EXTENSION, PROFILE_SIGNALS, load_binary_profile
+from car_sim_etti.utils.signal_store import SignalStore
+from car_sim_etti.utils.wss_faults import WssFaultSet, apply_wss_faults
+
+
+LOGGER = logging.getLogger(APP_SLUG)
+
+
+# speeds above target speed + margin are limited to target speed + noise (+ offset for wheel speeds)
+TARGET_SPEED_MARGIN = 1
+WHEEL_SPEED_OFFSET = 0.69
+SPEED_NOISE_STEPS = 20
+SPEED_NOISE_RESOLUTION = 0.1
+
+# preparation stages drawing random numbers, each one gets its own generator
+STAGE_TARGET_SPEED = 1
+STAGE_WSS_FAULTS = 2
+
+DEFAULT_STAGE_ENTRIES = 8
+
+
+def __report__(progress, percent, stage):
+    """__report__
+
+    :param progress: progress callback, called with percent and stage description
+    :type progress: callable or None
+    :param percent: preparation progress
+    :type percent: int
+    :param stage: preparation stage description
+    :type stage: str
+    :return: None
+    """
+    if progress is not None:
+        progress(percent, stage)
+
+
+class PreparedProfile:
+    """PreparedProfile
+
+        Simulation profile signals ready to be played.
+    """
+    def __init__(self, file, profile, signals, seed=None):
+        """
+
+        :param file: simulation profile path
+        :param profile: source simulation profile, as cached
+        :param signals: prepared signals, shared by the simulation and the data viewers
+        :param seed: noise seed used for preparation
+        """
+        self.file = file
+        self.profile = profile
+        self.signals = signals
+        self.sampling_period = profile[SIGNAL_SAMPLING_PERIOD]
+        self.stamps = len(signals[SIGNAL_ABS_REF])
+        self.seed = seed
+
+
+def load_validated_profile(file, profile_cache=None):
+    """load_validated_profile
+
+        Load and validate simulation profile, going through the cache when available.
+    :param file: simulation profile path
+    :type file: str
+    :param profile_cache: parsed profiles cache
+    :type profile_cache: ProfileCache
+    :return: validated simulation profile or None on failure
+    :rtype: dict
+    """
+    if profile_cache is not None:
+        sim_profile = profile_cache.get(file)
+        if sim_profile is not None:
+            return sim_profile
+
+    if file.endswith(PROFILE_EXTENSION):
+        try:
+            sim_profile = load_binary_profile(file)
+        except Exception as err:
+            error = 'Failed to load simulation profile! {}'.format(err)
+            LOGGER.error(error)
+            return None
+    else:
+        try:
+            file_handler = open(file, 'r')
+            file_content = file_handler.read()
+            file_handler.close()
+        except Exception as err:
+            error = 'Failed to load simulation profile! {}'.format(err)
+            LOGGER.error(error)
+            return None
+
+        try:
+            sim_profile = json.loads(file_content)
+        except Exception as err:
+            error = 'Failed to parse simulation profile file content! {}'.format(err)
+            LOGGER.error(error)
+            return None
+
+    if not sim_profile_valid(sim_profile):
+        error = 'Invalid simulation profile! {}'.format(file)
+        LOGGER.error(error)
+        return None
+
+    if profile_cache is not None:
+        sim_profile = profile_cache.put(file, sim_profile)
+
+    return sim_profile
+
+
+def apply_target_speed(signals, target_speed, rng):
+    """apply_target_speed
+
+        Limit wheel speeds and ABS reference speed to target speed, with a small random noise on top.
+    :param signals: signals by name, as arrays, altered in place
+    :type signals: dict
+    :param target_speed: target speed in km/h
+    :type target_speed: int or float
+    :param rng: random generator, seeded for reproducible noise
+    :type rng: numpy.random.Generator
+    :return: None
+    """
+    abs_ref = signals[SIGNAL_ABS_REF]
+    limit = target_speed + TARGET_SPEED_MARGIN
+    abs_ref_limited = abs_ref > limit
+
+    for wheel_signal in (SIGNAL_FL_VEL, SIGNAL_FR_VEL, SIGNAL_RL_VEL, SIGNAL_RR_VEL):
+        wheel_vel = signals[wheel_signal]
+        limited = (wheel_vel > limit) & abs_ref_limited
+        noise = rng.integers(0, SPEED_NOISE_STEPS, numpy.count_nonzero(limited)) * SPEED_NOISE_RESOLUTION
+        wheel_vel[limited] = numpy.round(target_speed + WHEEL_SPEED_OFFSET + noise, 2)
+
+    noise = rng.integers(0, SPEED_NOISE_STEPS, numpy.count_nonzero(abs_ref_limited)) * SPEED_NOISE_RESOLUTION
+    abs_ref[abs_ref_limited] = numpy.round(target_speed + noise, 2)
+
+
+def __stage_rng__(seed, stage_id):
+    """__stage_rng__
+
+        Get random generator of a stage, so each stage output only depends on its own inputs.
+    :param seed: preparation seed
+    :type seed: int
+    :param stage_id: stage identifier
+    :type stage_id: int
+    :return: random generator
+    :rtype: numpy.random.Generator
+    """
+    return numpy.random.default_rng([seed, stage_id])
+
+
+def slice_signals(profile, skip_until_index):
+    """slice_signals
+
+    :param profile: validated simulation profile
+    :type profile: dict
+    :param skip_until_index: number of leading samples to be skipped
+    :type skip_until_index: int
+    :return: sliced signals
+    :rtype: SignalStore
+    """
+    signal_names = [signal_name for signal_name in PROFILE_SIGNALS if signal_name in profile]
+    return SignalStore.from_signals(profile, signal_names, start=skip_until_index).freeze()
+
+
+def limit_target_speed(signals, target_speed, seed):
+    """limit_target_speed
+
+    :param signals: sliced signals
+    :type signals: SignalStore
+    :param target_speed: target speed in km/h
+    :type target_speed: int or float
+    :param seed: preparation seed
+    :type seed: int
+    :return: limited signals
+    :rtype: SignalStore
+    """
+    signals = signals.copy()
+    apply_target_speed(signals, target_speed, __stage_rng__(seed, STAGE_TARGET_SPEED))
+    return signals.freeze()
+
+
+def inject_wss_faults(signals, wss_faults, sampling_period, seed):
+    """inject_wss_faults
+
+    :param signals: limited signals
+    :type signals: SignalStore
+    :param wss_faults: simulated wheel speed sensor faults
+    :type wss_faults: WssFaultSet
+    :param sampling_period: sampling period in seconds
+    :type sampling_period: float
+    :param seed: preparation seed
+    :type seed: int
+    :return: faulty signals
+    :rtype: SignalStore
+    """
+    if not wss_faults:
+        return signals
+
+    signals = signals.copy()
+    apply_wss_faults(signals, wss_faults, sampling_period, __stage_rng__(seed, STAGE_WSS_FAULTS))
+    return signals.freeze()
+
+
+class PipelineStage:
+    """PipelineStage
+
+        Preparation stage, memoized under the key of its inputs.
+    """
+    def __init__(self, name, function, max_entries=DEFAULT_STAGE_ENTRIES):
+        """
+
+        :param name: stage name
+        :param function: stage function
+        :param max_entries: number of outputs kept, least recently used ones are dropped first
+        """
+        self.name = name
+        self.function = function
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.__outputs__ = OrderedDict()
+
+    def __call__(self, key, *args):
+        """__call__
+
+        :param key: hashable description of all stage inputs
+        :type key: tuple
+        :param args: stage function arguments
+        :return: stage output
+        """
+        output = self.__outputs__.get(key)
+        if output is not None:
+            self.__outputs__.move_to_end(key)
+            self.hits += 1
+            return output
+
+        self.misses += 1
+        output = self.function(*args)
+        self.__outputs__[key] = output
+        while len(self.__outputs__) > self.max_entries:
+            self.__outputs__.popitem(last=False)
+        return output
+
+    def clear(self):
+        self.__outputs__.clear()
+
+    def stats(self):
+        return '{}: {} hits, {} misses'.format(self.name, self.hits, self.misses)
+
+
+class PreparationPipeline:
+    """PreparationPipeline
+
+        load -> slice -> target speed -> WSS faults.
+        Each stage is cached under its inputs, so changing e.g. only the WSS faults reuses the limited signals.
+        Stage outputs are read only signal stores, each stage copies its input block once before altering it.
+    """
+    def __init__(self, profile_cache=None, max_entries=DEFAULT_STAGE_ENTRIES):
+        """
+
+        :param profile_cache: parsed profiles cache, acts as load stage
+        :param max_entries: number of outputs kept by each stage
+        """
+        if profile_cache is None:
+            profile_cache = ProfileCache()
+
+        self.profile_cache = profile_cache
+        self.slice_stage = PipelineStage('slice', slice_signals, max_entries)
+        self.target_speed_stage = PipelineStage('target speed', limit_target_speed, max_entries)
+        self.wss_faults_stage = PipelineStage('wss faults', inject_wss_faults, max_entries)
+        self.stages = (self.slice_stage, self.target_speed_stage, self.wss_faults_stage)
+
+    def prepare(self, file, target_speed, wss_faults=None, skip_until_index=0, seed=None, progress=None):
+        """prepare
+
+            See prepare_simulation_profile.
+        """
+        if wss_faults is None:
+            wss_faults = WssFaultSet()
+        if seed is None:
+            seed = numpy.random.SeedSequence().entropy
+
+        __report__(progress, 0, 'Loading')
+        try:
+            load_key = profile_key(file)
+        except OSError as err:
+            LOGGER.error('Failed to load simulation profile! {}'.format(err))
+            return None
+
+        sim_profile = load_validated_profile(file, self.profile_cache)
+        if sim_profile is None:
+            return None
+
+        __report__(progress, 30, 'Slicing')
+        slice_key = (load_key, skip_until_index)
+        signals = self.slice_stage(slice_key, sim_profile, skip_until_index)
+
+        __report__(progress, 40, 'Applying target speed')
+        target_speed_key = (slice_key, target_speed, seed)
+        signals = self.target_speed_stage(target_speed_key, signals, target_speed, seed)
+
+        LOGGER.info('Treating WSS error: {}'.format(wss_faults))
+        __report__(progress, 70, 'Applying WSS error')
+        wss_faults_key = (target_speed_key, wss_faults.key())
+        signals = self.wss_faults_stage(wss_faults_key, signals, wss_faults, sim_profile[SIGNAL_SAMPLING_PERIOD],
+                                        seed)
+
+        __report__(progress, 100, 'Ready')
+        return PreparedProfile(file, sim_profile, signals, seed)
+
+    def clear(self):
+        """clear
+
+        :return: None
+        """
+        for stage in self.stages:
+            stage.clear()
+
+    def stats(self):
+        """stats
+
+        :return: stages statistics
+        :rtype: str
+        """
+        return '{}; {}'.format(self.profile_cache.stats(), '; '.join(stage.stats() for stage in self.stages))
+
+
+def prepare_simulation_profile(file, target_speed, wss_faults=None, skip_until_index=0, seed=None, pipeline=None,
+                               progress=None):
+    """prepare_simulation_profile
+
+        Load simulation profile and transform its signals for playback. Does not touch any widget, so it can be
+        executed on a worker thread.
+    :param file: simulation profile path
+    :type file: str
+    :param target_speed: target speed in km/h
+    :type target_speed: int or float
+    :param wss_faults: simulated wheel speed sensor faults
+    :type wss_faults: WssFaultSet
+    :param skip_until_index: number of leading samples to be skipped
+    :type skip_until_index: int
+    :param seed: noise seed, same seed yields same signals, random if None
+    :type seed: int
+    :param pipeline: memoized preparation pipeline, a new one is used if None
+    :type pipeline: PreparationPipeline
+    :param progress: progress callback, called with percent and stage description
+    :type progress: callable
+    :return: prepared simulation profile (read only signals) or None on failure
+    :rtype: PreparedProfile
+    """
+    if pipeline is None:
+        pipeline = PreparationPipeline()
+
+    return pipeline.prepare(file, target_speed, wss_faults=wss_faults, skip_until_index=skip_until_index, seed=seed,
+                            progress=progress)
@@ -0,0 +1,341 @@
+import argparse
+import json
+import logging
+import numpy
+import os
+import sys
+
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from time import gmtime, perf_counter, strftime
+
+
+from car_sim_etti import APP_SLUG
+from car_sim_etti.utils.generic import (
+    ALLOWED_SAMPLING_PERIODS,
+    SENTINEL_VALUE,
+    SIGNAL_ABS_REF,
+    SIGNAL_SAMPLING_PERIOD,
+    SIGNAL_SCHEMA,
+)
+from car_sim_etti.utils.profile_catalog import SPEED_TOLERANCE, parse_profile_name
+from car_sim_etti.utils.profile_format import JSON_PROFILE_EXTENSION, PROFILE_EXTENSION, load_binary_profile
+
+
+LOGGER = logging.getLogger(APP_SLUG)
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(__file__))
+DEFAULT_PROFILES_PATH = os.path.join(PACKAGE_DIR, 'static', 'simulation_profiles', 'ABS')
+
+SEVERITY_WARNING = 'warning'
+SEVERITY_ERROR = 'error'
+
+STATUS_OK = 'ok'
+STATUSES = (STATUS_OK, SEVERITY_WARNING, SEVERITY_ERROR)
+
+CHECK_FORMAT = 'format'
+CHECK_NAME = 'name'
+CHECK_LENGTH = 'length'
+CHECK_CHANNELS = 'channels'
+CHECK_SENTINEL = 'sentinel'
+CHECK_SPEED = 'speed'
+CHECK_MU = 'mu'
+
+MIN_PROFILE_DURATION = 10  # seconds, shorter profiles cannot hold a full braking
+GRAVITY = 9.81  # m/s^2
+
+# road friction coefficient is estimated from the mean deceleration while ABS reference speed drops from the first to
+# the second fraction of its max, away from brake onset and standstill
+MU_ESTIMATION_WINDOW = (0.9, 0.2)
+MU_TOLERANCE = 0.15  # max deviation of the estimated road friction coefficient from the one in profile name
+
+
+class QAResult:
+    """QAResult
+
+        Checks outcome of one simulation profile.
+    """
+    def __init__(self, file):
+        """
+
+        :param file: simulation profile path
+        :type file: str
+        """
+        self.file = file
+        self.findings = []
+        self.metrics = OrderedDict()
+
+    def add(self, check, severity, message):
+        """add
+
+        :param check: check name
+        :type check: str
+        :param severity: finding severity, SEVERITY_WARNING or SEVERITY_ERROR
+        :type severity: str
+        :param message: finding description
+        :type message: str
+        :return: None
+        """
+        self.findings.append(OrderedDict([('check', check), ('severity', severity), ('message', message)]))
+
+    @property
+    def status(self):
+        severities = {finding['severity'] for finding in self.findings}
+        if SEVERITY_ERROR in severities:
+            return SEVERITY_ERROR
+        if SEVERITY_WARNING in severities:
+            return SEVERITY_WARNING
+        return STATUS_OK
+
+    def to_dict(self):
+        """to_dict
+
+        :return: JSON compatible result
+        :rtype: OrderedDict
+        """
+        result = OrderedDict([('file', os.path.basename(self.file)), ('status', self.status)])
+        result.update(self.metrics)
+        result['findings'] = self.findings
+        return result
+
+
+def load_profile_file(file):
+    """load_profile_file
+
+    :param file: binary or JSON simulation profile path
+    :type file: str
+    :return: simulation profile
+    :rtype: dict
+    """
+    if file.endswith(JSON_PROFILE_EXTENSION):
+        with open(file, 'r') as file_handler:
+            return json.load(file_handler)
+    return load_binary_profile(file)
+
+
+def count_sentinel_leftovers(samples):
+    """count_sentinel_leftovers
+
+        Count sentinel samples which are not part of a monotonic transition, i.e. isolated spikes or flat runs.
+        A signal passing through the sentinel value on its way up or down is legit.
+    :param samples: signal samples
+    :type samples: numpy.ndarray
+    :return: number of sentinel leftovers
+    :rtype: int
+    """
+    sentinel = samples == SENTINEL_VALUE
+    if not sentinel.any():
+        return 0
+
+    previous = numpy.concatenate(([numpy.nan], samples[:-1]))
+    following = numpy.concatenate((samples[1:], [numpy.nan]))
+    rising = (previous < samples) & (samples < following)
+    falling = (previous > samples) & (samples > following)
+    return int(numpy.count_nonzero(sentinel & ~rising & ~falling))
+
+
+def estimate_mu(abs_ref, sampling_period):
+    """estimate_mu
+
+        Estimate road friction coefficient from the ABS reference speed deceleration after its max.
+    :param abs_ref: ABS reference speed in km/h
+    :type abs_ref: numpy.ndarray
+    :param sampling_period: sampling period in seconds
+    :type sampling_period: float
+    :return: estimated road friction coefficient, None if the profile holds no braking
+    :rtype: float
+    """
+    peak = int(abs_ref.argmax())
+    braking = abs_ref[peak:]
+    high_fraction, low_fraction = MU_ESTIMATION_WINDOW
+    start = numpy.flatnonzero(braking <= braking[0] * high_fraction)
+    end = numpy.flatnonzero(braking <= braking[0] * low_fraction)
+    if braking[0] <= 0 or not start.size or not end.size or end[0] <= start[0]:
+        return None
+
+    deceleration = (braking[start[0]] - braking[end[0]]) / 3.6 / ((end[0] - start[0]) * sampling_period)
+    return round(float(deceleration / GRAVITY), 3)
+
+
+def check_profile(file):
+    """check_profile
+
+        Run every QA check on one simulation profile. Never raises, a broken file is reported instead.
+    :param file: simulation profile path
+    :type file: str
+    :return: JSON compatible result
+    :rtype: OrderedDict
+    """
+    result = QAResult(file)
+
+    parsed_name = parse_profile_name(file)
+    speed, mu, split_mu = parsed_name if parsed_name is not None else (None, None, None)
+    result.metrics.update(speed=speed, mu=mu, split_mu=split_mu)
+    if parsed_name is None:
+        result.add(CHECK_NAME, SEVERITY_ERROR, 'File name does not follow the {speed}_{mu} convention')
+
+    try:
+        profile = load_profile_file(file)
+    except Exception as err:
+        result.add(CHECK_FORMAT, SEVERITY_ERROR, '{}: {}'.format(type(err).__name__, err))
+        return result.to_dict()
+
+    # length
+    sampling_period = profile.get(SIGNAL_SAMPLING_PERIOD)
+    if sampling_period not in ALLOWED_SAMPLING_PERIODS:
+        result.add(CHECK_LENGTH, SEVERITY_ERROR, 'Sampling period [{}] not allowed'.format(sampling_period))
+        return result.to_dict()
+
+    signals = OrderedDict()
+    for spec in SIGNAL_SCHEMA:
+        if spec.name in profile:
+            signals[spec.name] = numpy.asarray(profile[spec.name], dtype=numpy.float64)
+        elif spec.required:
+            result.add(CHECK_CHANNELS, SEVERITY_ERROR, 'Signal <{}> missing'.format(spec.name))
+
+    lengths = {len(samples) for samples in signals.values()}
+    length = min(lengths) if lengths else 0
+    result.metrics.update(length=length, duration=round(length * sampling_period, 2))
+    if len(lengths) > 1:
+        result.add(CHECK_LENGTH, SEVERITY_ERROR, 'Signals length mismatch: {}'.format(
+            ', '.join('{} {}'.format(name, len(samples)) for name, samples in signals.items())))
+    if length * sampling_period < MIN_PROFILE_DURATION:
+        result.add(CHECK_LENGTH, SEVERITY_ERROR, 'Profile lasts {:.2f}s, at least {}s expected'.format(
+            length * sampling_period, MIN_PROFILE_DURATION))
+
+    # channels sanity
+    for spec in SIGNAL_SCHEMA:
+        samples = signals.get(spec.name)
+        if samples is None or not samples.size:
+            continue
+
+        finite = numpy.isfinite(samples)
+        if not finite.all():
+            result.add(CHECK_CHANNELS, SEVERITY_ERROR, 'Signal <{}> has {} non finite values'.format(
+                spec.name, samples.size - int(numpy.count_nonzero(finite))))
+            continue
+        if spec.minimum is not None and samples.min() < spec.minimum:
+            result.add(CHECK_CHANNELS, SEVERITY_ERROR, 'Signal <{}> has {} values below {}'.format(
+                spec.name, int(numpy.count_nonzero(samples < spec.minimum)), spec.minimum))
+        if spec.maximum is not None and samples.max() > spec.maximum:
+            result.add(CHECK_CHANNELS, SEVERITY_ERROR, 'Signal <{}> has {} values above {}'.format(
+                spec.name, int(numpy.count_nonzero(samples > spec.maximum)), spec.maximum))
+        if samples.min() == samples.max():
+            result.add(CHECK_CHANNELS, SEVERITY_WARNING, 'Signal <{}> is constant ({})'.format(
+                spec.name, samples[0]))
+
+    # sentinel leftovers
+    leftovers = OrderedDict((name, count_sentinel_leftovers(samples)) for name, samples in signals.items())
+    result.metrics['sentinel_leftovers'] = sum(leftovers.values())
+    if result.metrics['sentinel_leftovers']:
+        result.add(CHECK_SENTINEL, SEVERITY_WARNING, 'Sentinel value {} left in {}'.format(
+            SENTINEL_VALUE, ', '.join('<{}> x{}'.format(name, count) for name, count in leftovers.items() if count)))
+
+    abs_ref = signals.get(SIGNAL_ABS_REF)
+    if abs_ref is None or not abs_ref.size or not numpy.isfinite(abs_ref).all():
+        return result.to_dict()
+
+    # speed against file name
+    max_abs_ref = float(abs_ref.max())
+    result.metrics['max_abs_ref'] = max_abs_ref
+    speed_ok = speed is not None and abs(speed - max_abs_ref) <= SPEED_TOLERANCE
+    if speed is not None and not speed_ok:
+        result.add(CHECK_SPEED, SEVERITY_ERROR, 'Max ABS reference speed {}km/h, {}km/h expected'.format(
+            max_abs_ref, speed))
+
+    # road friction coefficient plausibility, only meaningful for a proper braking from the expected speed
+    estimated_mu = estimate_mu(abs_ref, sampling_period) if speed_ok else None
+    result.metrics['estimated_mu'] = estimated_mu
+    if estimated_mu is not None and mu is not None:
+        low, high = (mu, mu) if split_mu is None else (min(mu, split_mu), max(mu, split_mu))
+        if not low - MU_TOLERANCE <= estimated_mu <= high + MU_TOLERANCE:
+            result.add(CHECK_MU, SEVERITY_WARNING, 'Deceleration suggests mu {}, {} expected'.format(
+                estimated_mu, mu if split_mu is None else '{}/{}'.format(mu, split_mu)))
+
+    return result.to_dict()
+
+
+def collect_profiles(directory):
+    """collect_profiles
+
+    :param directory: simulation profiles directory
+    :type directory: str
+    :return: binary and JSON simulation profiles paths, sorted
+    :rtype: list of str
+    """
+    return [os.path.join(directory, file_name) for file_name in sorted(os.listdir(directory))
+            if file_name.endswith((PROFILE_EXTENSION, JSON_PROFILE_EXTENSION))]
+
+
+def run_library_qa(files, workers=None):
+    """run_library_qa
+
+        Check simulation profiles in parallel, across a process pool.
+    :param files: simulation profiles paths
+    :type files: list of str
+    :param workers: number of worker processes, defaults to the number of CPUs
+    :type workers: int
+    :return: QA report, JSON compatible
+    :rtype: OrderedDict
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(check_profile, files, chunksize=max(len(files) // 64, 1)))
+
+    totals = OrderedDict((status, 0) for status in STATUSES)
+    for result in results:
+        totals[result['status']] += 1
+
+    return OrderedDict([
+        ('generated', strftime('%Y-%m-%dT%H:%M:%SZ', gmtime())),
+        ('profiles', len(results)),
+        ('totals', totals),
+        ('results', results),
+    ])
+
+
+def format_qa_report(report, verbose=False):
+    """format_qa_report
+
+    :param report: QA report
+    :type report: dict
+    :param verbose: list passing profiles as well
+    :type verbose: bool
+    :return: one line per finding, followed by status totals
+    :rtype: str
+    """
+    lines = []
+    for result in report['results']:
+        if result['status'] == STATUS_OK:
+            if verbose:
+                lines.append('{}: {}'.format(result['file'], STATUS_OK))
+            continue
+        for finding in result['findings']:
+            lines.append('{}: {} [{}] {}'.format(result['file'], finding['severity'].upper(), finding['check'],
+                                                 finding['message']))
+
+    lines.append('{} profiles: {}'.format(report['profiles'], ', '.join(
+        '{} {}'.format(count, status) for status, count in report['totals'].items())))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check every simulation profile of a library before shipping it.')
+    parser.add_argument('directory', nargs='?', default=DEFAULT_PROFILES_PATH, help='simulation profiles directory')
+    parser.add_argument('--report', help='JSON report output file')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, defaults to CPU count')
+    parser.add_argument('--verbose', action='store_true', help='list passing profiles as well')
+    arguments = parser.parse_args()
+
+    qa_start = perf_counter()
+    qa_report = run_library_qa(collect_profiles(arguments.directory), workers=arguments.workers)
+    qa_report['directory'] = os.path.abspath(arguments.directory)
+
+    print(format_qa_report(qa_report, verbose=arguments.verbose))
+    if arguments.report:
+        with open(arguments.report, 'w') as report_file:
+            json.dump(qa_report, report_file, indent=2)
+        LOGGER.info('QA report: {}'.format(arguments.report))
+    LOGGER.info('{} profiles checked in {:.2f}s'.format(qa_report['profiles'], perf_counter() - qa_start))
+    sys.exit(1 if qa_report['totals'][SEVERITY_ERROR] else 0)
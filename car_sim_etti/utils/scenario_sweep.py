@@ -0,0 +1,298 @@
+import argparse
+import csv
+import logging
+import os
+
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+
+from car_sim_etti import APP_SLUG
+from car_sim_etti.utils.generic import (
+    SIGNAL_ABS_REF,
+
+    SIGNAL_FL_VEL,
+    SIGNAL_FR_VEL,
+    SIGNAL_RL_VEL,
+    SIGNAL_RR_VEL,
+
+    SIGNAL_FL_PRES,
+    SIGNAL_FR_PRES,
+    SIGNAL_RL_PRES,
+    SIGNAL_RR_PRES,
+)
+from car_sim_etti.utils.profile_catalog import ProfileCatalog
+from car_sim_etti.utils.profile_preparation import PreparationPipeline
+from car_sim_etti.utils.simulation_engine import FrameSink, SimulationEngine
+from car_sim_etti.utils.wss_faults import WHEELS, WSS_FAULT_TYPES, WssFault, WssFaultSet
+
+
+LOGGER = logging.getLogger(APP_SLUG)
+
+
+DEFAULT_SPEEDS = tuple(range(50, 131, 10))  # km/h
+DEFAULT_MUS = (0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+DEFAULT_SPLIT_MUS = ((0.3, 0.8), )
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(__file__))
+DEFAULT_PROFILES_PATH = os.path.join(PACKAGE_DIR, 'static', 'simulation_profiles', 'ABS')
+
+WHEEL_SPEED_SIGNALS = (SIGNAL_FL_VEL, SIGNAL_FR_VEL, SIGNAL_RL_VEL, SIGNAL_RR_VEL)
+FRONT_PRESSURE_SIGNALS = (SIGNAL_FL_PRES, SIGNAL_FR_PRES)
+REAR_PRESSURE_SIGNALS = (SIGNAL_RL_PRES, SIGNAL_RR_PRES)
+
+SUMMARY_COLUMNS = (
+    'speed', 'mu', 'split_mu', 'wss_faults', 'profile', 'completed', 'frames', 'simulated_time',
+    'max_abs_ref', 'min_wheel_speed', 'max_wheel_speed', 'max_front_pressure', 'max_rear_pressure', 'run_time',
+)
+
+# pipeline kept by each worker process, so scenarios sharing a profile reuse its cached stages
+__worker_pipeline__ = None
+
+
+class Scenario:
+    """Scenario
+
+        One point of the sweep matrix.
+    """
+    def __init__(self, speed, mu, split_mu=None, wss_faults=None):
+        """
+
+        :param speed: target speed in km/h
+        :param mu: road friction coefficient (left side for split conditions)
+        :param split_mu: right side road friction coefficient for split conditions, None otherwise
+        :param wss_faults: simulated wheel speed sensor faults
+        """
+        self.speed = speed
+        self.mu = mu
+        self.split_mu = split_mu
+        self.wss_faults = wss_faults if wss_faults is not None else WssFaultSet()
+
+    def __repr__(self):
+        mu = self.mu if self.split_mu is None else '{}/{}'.format(self.mu, self.split_mu)
+        return '{}km/h mu {} {}'.format(self.speed, mu, self.wss_faults)
+
+
+def build_scenario_matrix(speeds=DEFAULT_SPEEDS, mus=DEFAULT_MUS, split_mus=DEFAULT_SPLIT_MUS, faults=True):
+    """build_scenario_matrix
+
+        Build every speed x road friction coefficient x WSS fault combination.
+        Fault scenarios are a single fault type on a single wheel, plus the fault free scenario.
+    :param speeds: target speeds in km/h
+    :type speeds: iterable of int
+    :param mus: uniform road friction coefficients
+    :type mus: iterable of float
+    :param split_mus: split road friction coefficients, as (left, right) pairs
+    :type split_mus: iterable of tuple
+    :param faults: include WSS fault scenarios
+    :type faults: bool
+    :return: scenarios
+    :rtype: list of Scenario
+    """
+    fault_sets = [WssFaultSet()]
+    if faults:
+        fault_sets.extend(WssFaultSet([WssFault(wheel, kind)]) for kind in WSS_FAULT_TYPES for wheel in WHEELS)
+
+    road_conditions = [(mu, None) for mu in mus] + list(split_mus)
+
+    return [Scenario(speed, mu, split_mu, wss_faults)
+            for speed in speeds for mu, split_mu in road_conditions for wss_faults in fault_sets]
+
+
+class ScenarioSummary(FrameSink):
+    """ScenarioSummary
+
+        Collects scenario metrics from the played frames.
+    """
+    def __init__(self):
+        self.completed = False
+        self.frames = 0
+        self.max_abs_ref = 0.
+        self.min_wheel_speed = None
+        self.max_wheel_speed = 0.
+        self.max_front_pressure = 0.
+        self.max_rear_pressure = 0.
+
+    def on_frame(self, frame):
+        values = frame.values
+        wheel_speeds = [values[signal_name] for signal_name in WHEEL_SPEED_SIGNALS]
+
+        self.frames += 1
+        self.max_abs_ref = max(self.max_abs_ref, values[SIGNAL_ABS_REF])
+        self.max_wheel_speed = max(self.max_wheel_speed, max(wheel_speeds))
+        if self.min_wheel_speed is None or min(wheel_speeds) < self.min_wheel_speed:
+            self.min_wheel_speed = min(wheel_speeds)
+        self.max_front_pressure = max(self.max_front_pressure,
+                                      max(values[signal_name] for signal_name in FRONT_PRESSURE_SIGNALS))
+        self.max_rear_pressure = max(self.max_rear_pressure,
+                                     max(values[signal_name] for signal_name in REAR_PRESSURE_SIGNALS))
+
+    def on_stop(self, engine, completed):
+        self.completed = completed
+
+
+def __init_worker__(log_level):
+    """__init_worker__
+
+    :param log_level: worker processes logging level
+    :type log_level: int
+    :return: None
+    """
+    LOGGER.setLevel(log_level)
+
+
+def __new_summary_row__(scenario):
+    """__new_summary_row__
+
+    :param scenario: scenario
+    :type scenario: Scenario
+    :return: summary row, scenario columns filled in
+    :rtype: OrderedDict
+    """
+    row = OrderedDict((column, None) for column in SUMMARY_COLUMNS)
+    row.update(speed=scenario.speed, mu=scenario.mu, split_mu=scenario.split_mu,
+               wss_faults=repr(scenario.wss_faults), completed=False)
+    return row
+
+
+def run_scenarios(entry, scenarios, seed=0, time_base=1):
+    """run_scenarios
+
+        Prepare and play scenarios sharing one simulation profile headless, on a virtual clock.
+    :param entry: simulation profile, as found in the profiles catalog
+    :type entry: ProfileCatalogEntry
+    :param scenarios: scenarios to be played
+    :type scenarios: list of Scenario
+    :param seed: noise seed, shared by all scenarios so results are reproducible
+    :type seed: int
+    :param time_base: playback speed factor
+    :type time_base: int or float
+    :return: summary rows, one per scenario
+    :rtype: list of OrderedDict
+    """
+    global __worker_pipeline__
+    if __worker_pipeline__ is None:
+        __worker_pipeline__ = PreparationPipeline()
+
+    rows = []
+    for scenario in scenarios:
+        start = perf_counter()
+        row = __new_summary_row__(scenario)
+        row['profile'] = entry.file_name
+        prepared = __worker_pipeline__.prepare(entry.path, scenario.speed, wss_faults=scenario.wss_faults, seed=seed)
+
+        if prepared is None:
+            LOGGER.error('Scenario {} could not be prepared!'.format(scenario))
+        else:
+            summary = ScenarioSummary()
+            engine = SimulationEngine(prepared.signals, prepared.sampling_period, time_base=time_base,
+                                      sinks=[summary])
+            engine.run()
+            row.update(completed=summary.completed, frames=summary.frames,
+                       simulated_time=round(engine.clock.elapsed(), 2), max_abs_ref=summary.max_abs_ref,
+                       min_wheel_speed=summary.min_wheel_speed, max_wheel_speed=summary.max_wheel_speed,
+                       max_front_pressure=summary.max_front_pressure, max_rear_pressure=summary.max_rear_pressure)
+
+        row['run_time'] = round(perf_counter() - start, 3)
+        rows.append(row)
+
+    return rows
+
+
+def run_sweep(directory, scenarios, workers=None, seed=0, time_base=1, log_level=logging.WARNING):
+    """run_sweep
+
+        Fan scenarios out across a process pool. Profiles are looked up once, here, and scenarios sharing a profile
+        are sent to the same worker, so its parsed profile and preparation stages are reused.
+    :param directory: simulation profiles directory
+    :type directory: str
+    :param scenarios: scenarios to be played
+    :type scenarios: list of Scenario
+    :param workers: number of worker processes, defaults to the number of CPUs
+    :type workers: int
+    :param seed: noise seed
+    :type seed: int
+    :param time_base: playback speed factor
+    :type time_base: int or float
+    :param log_level: worker processes logging level
+    :type log_level: int
+    :return: summary rows, in scenarios order
+    :rtype: list of OrderedDict
+    """
+    catalog = ProfileCatalog(directory)
+    rows = [None] * len(scenarios)
+    groups = OrderedDict()
+    for index, scenario in enumerate(scenarios):
+        entry = catalog.find(scenario.speed, scenario.mu, scenario.split_mu)
+        if entry is None:
+            LOGGER.error('No simulation profile available for scenario {}!'.format(scenario))
+            rows[index] = __new_summary_row__(scenario)
+            continue
+        groups.setdefault(entry.path, (entry, []))[1].append(index)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=__init_worker__, initargs=(log_level, )) as executor:
+        futures = {executor.submit(run_scenarios, entry, [scenarios[index] for index in indexes], seed,
+                                   time_base): indexes
+                   for entry, indexes in groups.values()}
+        for done, future in enumerate(as_completed(futures), 1):
+            for index, row in zip(futures[future], future.result()):
+                rows[index] = row
+            LOGGER.info('Sweep progress: {}/{} scenario groups'.format(done, len(futures)))
+
+    return rows
+
+
+def format_summary_table(rows):
+    """format_summary_table
+
+    :param rows: summary rows
+    :type rows: list of OrderedDict
+    :return: fixed width text table
+    :rtype: str
+    """
+    table = [SUMMARY_COLUMNS] + [tuple('' if row[column] is None else str(row[column]) for column in SUMMARY_COLUMNS)
+                                 for row in rows]
+    widths = [max(len(line[column]) for line in table) for column in range(len(SUMMARY_COLUMNS))]
+    return '\n'.join('  '.join(value.ljust(width) for value, width in zip(line, widths)).rstrip() for line in table)
+
+
+def write_summary_csv(rows, file):
+    """write_summary_csv
+
+    :param rows: summary rows
+    :type rows: list of OrderedDict
+    :param file: output CSV file path
+    :type file: str
+    :return: None
+    """
+    with open(file, 'w', newline='') as file_handler:
+        writer = csv.DictWriter(file_handler, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play the speed x mu x WSS fault scenario matrix headless.')
+    parser.add_argument('--directory', default=DEFAULT_PROFILES_PATH, help='simulation profiles directory')
+    parser.add_argument('--speeds', type=int, nargs='+', default=DEFAULT_SPEEDS, help='target speeds in km/h')
+    parser.add_argument('--mus', type=float, nargs='+', default=DEFAULT_MUS, help='road friction coefficients')
+    parser.add_argument('--no-split', action='store_true', help='skip split road friction coefficient scenarios')
+    parser.add_argument('--no-faults', action='store_true', help='skip WSS fault scenarios')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes, defaults to CPU count')
+    parser.add_argument('--seed', type=int, default=0, help='noise seed')
+    parser.add_argument('--time-base', type=float, default=1, help='playback speed factor')
+    parser.add_argument('--csv', help='summary CSV output file')
+    arguments = parser.parse_args()
+
+    matrix = build_scenario_matrix(arguments.speeds, arguments.mus, () if arguments.no_split else DEFAULT_SPLIT_MUS,
+                                   faults=not arguments.no_faults)
+    sweep_start = perf_counter()
+    summary_rows = run_sweep(arguments.directory, matrix, workers=arguments.workers, seed=arguments.seed,
+                             time_base=arguments.time_base)
+
+    print(format_summary_table(summary_rows))
+    if arguments.csv:
+        write_summary_csv(summary_rows, arguments.csv)
+    LOGGER.info('{} scenarios played in {:.2f}s'.format(len(summary_rows), perf_counter() - sweep_start))
@@ -0,0 +1,161 @@
+import math
+
+
+from time import perf_counter, sleep
+
+
+# what to do with ticks whose deadline already passed
+TICK_POLICY_CATCH_UP = 'catch_up'  # run every missed tick back to back until the schedule is met again
+TICK_POLICY_SKIP = 'skip'  # drop missed ticks and resume on the latest due deadline
+
+TICK_POLICIES = (TICK_POLICY_CATCH_UP, TICK_POLICY_SKIP)
+
+# OS sleep may overshoot by a few milliseconds, the end of the wait is spun instead
+DEFAULT_SPIN_THRESHOLD = 0.002  # seconds
+
+
+class TimingStats:
+    """TimingStats
+
+        Running statistics of tick lateness, constant memory regardless of run length.
+    """
+    def __init__(self, period):
+        """
+
+        :param period: tick period in seconds
+        :type period: float
+        """
+        self.period = period
+        self.ticks = 0
+        self.late_ticks = 0
+        self.skipped_ticks = 0
+        self.max_lateness = 0.
+        self.__mean__ = 0.
+        self.__m2__ = 0.
+
+    def add(self, lateness):
+        """add
+
+            Record the lateness of a tick (Welford's online algorithm).
+        :param lateness: time elapsed since the tick deadline, in seconds
+        :type lateness: float
+        :return: None
+        """
+        self.ticks += 1
+        if lateness >= self.period:
+            self.late_ticks += 1
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+
+        delta = lateness - self.__mean__
+        self.__mean__ += delta / self.ticks
+        self.__m2__ += delta * (lateness - self.__mean__)
+
+    @property
+    def mean_lateness(self):
+        return self.__mean__
+
+    @property
+    def jitter(self):
+        """jitter
+
+        :return: standard deviation of tick lateness, in seconds
+        :rtype: float
+        """
+        if self.ticks < 2:
+            return 0.
+        return math.sqrt(self.__m2__ / (self.ticks - 1))
+
+    def __repr__(self):
+        return ('{} ticks, {} late, {} skipped, lateness mean {:.3f}ms max {:.3f}ms, jitter {:.3f}ms'
+                .format(self.ticks, self.late_ticks, self.skipped_ticks, self.mean_lateness * 1000,
+                        self.max_lateness * 1000, self.jitter * 1000))
+
+
+class DeadlineScheduler:
+    """DeadlineScheduler
+
+        Periodic ticks on absolute deadlines: tick n is due at start + n * period, so sleep overshoot and
+        per tick work never accumulate into drift.
+    """
+    def __init__(self, period, policy=TICK_POLICY_CATCH_UP, clock=perf_counter,
+                 spin_threshold=DEFAULT_SPIN_THRESHOLD):
+        """
+
+        :param period: tick period in seconds
+        :param policy: late ticks policy, one of TICK_POLICIES
+        :param clock: monotonic clock, in seconds
+        :param spin_threshold: the last part of each wait is spun (yielding) instead of slept, in seconds
+        """
+        if period <= 0:
+            raise ValueError('Invalid tick period [{}]!'.format(period))
+        if policy not in TICK_POLICIES:
+            raise ValueError('Unknown tick policy [{}]! Supported policies are: {}!'.format(policy, TICK_POLICIES))
+
+        self.period = period
+        self.policy = policy
+        self.clock = clock
+        self.spin_threshold = spin_threshold
+        self.stats = TimingStats(period)
+        self.start_time = None
+        self.tick_index = 0
+
+    def start(self):
+        """start
+
+            Start the schedule, first tick is due right away.
+        :return: None
+        """
+        self.start_time = self.clock()
+        self.tick_index = 0
+        self.stats = TimingStats(self.period)
+
+    def elapsed(self):
+        """elapsed
+
+        :return: time elapsed since schedule start, in seconds
+        :rtype: float
+        """
+        return self.clock() - self.start_time
+
+    def deadline(self, tick_index):
+        """deadline
+
+        :param tick_index: tick index
+        :type tick_index: int
+        :return: tick deadline, in clock time
+        :rtype: float
+        """
+        return self.start_time + tick_index * self.period
+
+    def wait(self):
+        """wait
+
+            Wait for the next tick deadline.
+        :return: index of the due tick, counted from schedule start (skipped ticks included)
+        :rtype: int
+        """
+        if self.start_time is None:
+            self.start()
+
+        deadline = self.deadline(self.tick_index)
+        current = self.clock()
+
+        if self.policy == TICK_POLICY_SKIP and current - deadline >= self.period:
+            skipped = int((current - deadline) // self.period)
+            self.stats.skipped_ticks += skipped
+            self.tick_index += skipped
+            deadline = self.deadline(self.tick_index)
+
+        remaining = deadline - current
+        if remaining > self.spin_threshold:
+            sleep(remaining - self.spin_threshold)
+        while self.clock() < deadline:
+            # yields the GIL, a bare spin would starve the GUI and profile loader threads
+            sleep(0)
+
+        self.stats.add(self.clock() - deadline)
+
+        tick_index = self.tick_index
+        self.tick_index += 1
+        return tick_index
@@ -0,0 +1,103 @@
+import numpy
+
+
+class SignalStore:
+    """SignalStore
+
+        Columnar signals storage: a single 2-D float array, one row per signal, plus a name index.
+        Signals are served as row views, so the simulation and every viewer read the same memory.
+    """
+    def __init__(self, names, data):
+        """
+
+        :param names: signal names, in row order
+        :type names: list of str
+        :param data: signals values, shape (number of signals, number of samples)
+        :type data: numpy.ndarray
+        """
+        if data.ndim != 2 or data.shape[0] != len(names):
+            raise ValueError('Signal store data shape {} does not match {} signals!'.format(data.shape, len(names)))
+
+        self.names = list(names)
+        self.data = data
+        self.index = {name: row for row, name in enumerate(self.names)}
+
+    @classmethod
+    def from_signals(cls, signals, names=None, start=0):
+        """from_signals
+
+            Pack separate signals into a new store, copying each of them exactly once.
+        :param signals: signals by name
+        :type signals: dict
+        :param names: names of the signals to be packed, all by default
+        :type names: list of str
+        :param start: number of leading samples to be skipped
+        :type start: int
+        :return: signal store
+        :rtype: SignalStore
+        """
+        if names is None:
+            names = list(signals)
+
+        length = max(len(signals[names[0]]) - start, 0) if names else 0
+        data = numpy.empty((len(names), length), dtype=numpy.float64)
+        for row, name in enumerate(names):
+            data[row] = signals[name][start:]
+        return cls(names, data)
+
+    @property
+    def length(self):
+        return self.data.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def __getitem__(self, name):
+        return self.data[self.index[name]]
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def keys(self):
+        return list(self.names)
+
+    def values(self):
+        return [self.data[row] for row in range(len(self.names))]
+
+    def items(self):
+        return [(name, self.data[row]) for row, name in enumerate(self.names)]
+
+    def sample(self, index):
+        """sample
+
+        :param index: sample index
+        :type index: int
+        :return: all signals values at index, by name
+        :rtype: dict
+        """
+        return dict(zip(self.names, self.data[:, index].tolist()))
+
+    def copy(self):
+        """copy
+
+        :return: writable copy of the store
+        :rtype: SignalStore
+        """
+        return SignalStore(self.names, self.data.copy())
+
+    def freeze(self):
+        """freeze
+
+            Make store read only, row views handed out afterwards are read only as well.
+        :return: same store
+        :rtype: SignalStore
+        """
+        self.data.flags.writeable = False
+        return self
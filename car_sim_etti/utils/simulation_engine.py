@@ -0,0 +1,294 @@
+import argparse
+import logging
+import os
+import sys
+import threading
+
+
+from time import perf_counter
+
+
+from car_sim_etti import APP_SLUG
+from car_sim_etti.utils.generic import SIGNAL_ABS_REF, __get_fps_growth__
+from car_sim_etti.utils.profile_catalog import ProfileCatalog
+from car_sim_etti.utils.profile_preparation import prepare_simulation_profile
+
+
+LOGGER = logging.getLogger(APP_SLUG)
+
+
+class SimulationFrame:
+    """SimulationFrame
+
+        Signals values at one simulation step.
+    """
+    __slots__ = ('tick', 'index', 'time', 'values')
+
+    def __init__(self, tick, index, time, values):
+        """
+
+        :param tick: engine tick index, skipped ticks included
+        :param index: profile sample index
+        :param time: profile time in seconds
+        :param values: signals values by name
+        """
+        self.tick = tick
+        self.index = index
+        self.time = time
+        self.values = values
+
+    def __repr__(self):
+        return 'frame {} (index: {}, time: {:.2f}s)'.format(self.tick, self.index, self.time)
+
+
+class FrameSink:
+    """FrameSink
+
+        Simulation frames subscriber. Methods are called on the engine thread.
+    """
+    def on_start(self, engine):
+        """on_start
+
+        :param engine: started engine
+        :type engine: SimulationEngine
+        :return: None
+        """
+        pass
+
+    def on_frame(self, frame):
+        """on_frame
+
+        :param frame: simulation frame
+        :type frame: SimulationFrame
+        :return: None
+        """
+        pass
+
+    def on_stop(self, engine, completed):
+        """on_stop
+
+        :param engine: stopped engine
+        :type engine: SimulationEngine
+        :param completed: True if the whole profile was played, False if stopped or timed out
+        :type completed: bool
+        :return: None
+        """
+        pass
+
+
+class FrameRecorder(FrameSink):
+    """FrameRecorder
+
+        Keeps every emitted frame, mainly for headless checks.
+    """
+    def __init__(self):
+        self.frames = []
+        self.completed = None
+
+    def on_start(self, engine):
+        self.frames = []
+        self.completed = None
+
+    def on_frame(self, frame):
+        self.frames.append(frame)
+
+    def on_stop(self, engine, completed):
+        self.completed = completed
+
+
+class VirtualClock:
+    """VirtualClock
+
+        Tick source which never waits: time only advances by one period per tick.
+        Same interface as DeadlineScheduler, so the engine runs as fast as possible.
+    """
+    def __init__(self, period):
+        """
+
+        :param period: tick period in seconds
+        :type period: float
+        """
+        self.period = period
+        self.tick_index = 0
+
+    def start(self):
+        """start
+
+        :return: None
+        """
+        self.tick_index = 0
+
+    def elapsed(self):
+        """elapsed
+
+        :return: virtual time elapsed since start, in seconds
+        :rtype: float
+        """
+        return self.tick_index * self.period
+
+    def wait(self):
+        """wait
+
+        :return: index of the due tick
+        :rtype: int
+        """
+        tick_index = self.tick_index
+        self.tick_index += 1
+        return tick_index
+
+
+class SimulationEngine:
+    """SimulationEngine
+
+        Plays prepared simulation signals and emits frames to sinks. No GUI involved, the pace is set by the clock:
+        a DeadlineScheduler for wall clock playback or a VirtualClock for faster than real time runs.
+    """
+    def __init__(self, signals, sampling_period, time_base=1, clock=None, sinks=None, timeout=None):
+        """
+
+        :param signals: prepared signals
+        :param sampling_period: signals sampling period in seconds
+        :param time_base: playback speed factor
+        :param clock: tick source, defaults to a VirtualClock
+        :param sinks: frames subscribers, list of FrameSink
+        :param timeout: max run duration in clock seconds, None for no limit
+        """
+        self.signals = signals
+        self.sampling_period = sampling_period
+        self.time_base = time_base
+        self.stamps = len(signals[SIGNAL_ABS_REF])
+
+        fps, self.index_growth = __get_fps_growth__(sampling_period, time_base)
+        self.period = 1 / fps
+        self.clock = clock if clock is not None else VirtualClock(self.period)
+        self.sinks = list(sinks) if sinks else []
+        self.timeout = timeout
+
+        self.index = 0
+        self.frames = 0
+        self.__stop_event__ = threading.Event()
+
+    def add_sink(self, sink):
+        """add_sink
+
+        :param sink: frames subscriber
+        :type sink: FrameSink
+        :return: None
+        """
+        self.sinks.append(sink)
+
+    def stop(self):
+        """stop
+
+            Request the engine to stop, safe to call from any thread.
+        :return: None
+        """
+        self.__stop_event__.set()
+
+    @property
+    def stopped(self):
+        return self.__stop_event__.is_set()
+
+    def frame(self, tick, index):
+        """frame
+
+        :param tick: tick index
+        :type tick: int
+        :param index: profile sample index
+        :type index: int
+        :return: simulation frame
+        :rtype: SimulationFrame
+        """
+        return SimulationFrame(tick, index, index * self.sampling_period, self.signals.sample(index))
+
+    def run(self):
+        """run
+
+            Play signals until the end of the profile, a stop request or timeout.
+        :return: True if the whole profile was played
+        :rtype: bool
+        """
+        self.__stop_event__.clear()
+        self.index = 0
+        self.frames = 0
+        completed = False
+
+        for sink in self.sinks:
+            sink.on_start(self)
+
+        self.clock.start()
+        while self.timeout is None or self.clock.elapsed() < self.timeout:
+            tick = self.clock.wait()
+            if self.stopped:
+                break
+
+            # tick index includes skipped ticks, so the playback position always follows the clock
+            index = (tick + 1) * self.index_growth
+            if index > self.stamps - 1:
+                self.index = self.stamps - 1
+                completed = True
+                break
+
+            self.index = index
+            frame = self.frame(tick, index)
+            for sink in self.sinks:
+                sink.on_frame(frame)
+            self.frames += 1
+
+        for sink in self.sinks:
+            sink.on_stop(self, completed)
+
+        return completed
+
+
+def replay_profile_library(directory, time_base=1, seed=0):
+    """replay_profile_library
+
+        Replay every usable simulation profile within directory on a virtual clock.
+    :param directory: simulation profiles directory
+    :type directory: str
+    :param time_base: playback speed factor
+    :type time_base: int or float
+    :param seed: noise seed used for preparation
+    :type seed: int
+    :return: number of profiles failing to play
+    :rtype: int
+    """
+    catalog = ProfileCatalog(directory)
+    played = 0
+    skipped = 0
+    failures = 0
+    start = perf_counter()
+    for entry in sorted(catalog.entries.values(), key=lambda item: item.file_name):
+        if not entry.usable:
+            LOGGER.info('{}: skipped, not usable'.format(entry.file_name))
+            skipped += 1
+            continue
+
+        played += 1
+        prepared = prepare_simulation_profile(entry.path, entry.speed, seed=seed)
+        if prepared is None:
+            failures += 1
+            continue
+
+        engine = SimulationEngine(prepared.signals, prepared.sampling_period, time_base=time_base)
+        if not engine.run():
+            failures += 1
+        LOGGER.info('{}: {} frames, {:.2f}s simulated'.format(
+            entry.file_name, engine.frames, engine.clock.elapsed()))
+
+    LOGGER.info('Replayed {} profiles in {:.2f}s, {} failures, {} skipped as not usable'.format(
+        played, perf_counter() - start, failures, skipped))
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay simulation profiles headless, faster than real time.')
+    parser.add_argument('directory', nargs='?', help='simulation profiles directory',
+                        default=os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                             'static', 'simulation_profiles', 'ABS'))
+    parser.add_argument('--time-base', type=float, default=1, help='playback speed factor')
+    parser.add_argument('--seed', type=int, default=0, help='noise seed')
+    arguments = parser.parse_args()
+
+    sys.exit(1 if replay_profile_library(arguments.directory, arguments.time_base, arguments.seed) else 0)
@@ -0,0 +1,407 @@
+import argparse
+import logging
+import numpy
+import sys
+
+
+from car_sim_etti import APP_SLUG
+from car_sim_etti.settings import SPI_MAX_DATA_LENGTH, build_spi_command
+from car_sim_etti.utils.generic import (
+    SIGNAL_ABS_REF,
+
+    SIGNAL_FL_VEL,
+    SIGNAL_FR_VEL,
+    SIGNAL_RL_VEL,
+    SIGNAL_RR_VEL,
+
+    SIGNAL_FL_PRES,
+    SIGNAL_FR_PRES,
+    SIGNAL_RL_PRES,
+    SIGNAL_RR_PRES,
+)
+
+
+LOGGER = logging.getLogger(APP_SLUG)
+
+
+MAX_CMD_ID = 31
+MAX_SHORT_PAYLOAD_LENGTH = 7  # longer payloads use extended frames, with a length byte after the header
+EXTENDED_LENGTH_MODULO = 1 << 10  # extended frames length field is 10 bits wide, 0 standing for 1024
+
+# frame start chain is resolved by jumping this many frames at once, see decode_frames
+DECODER_JUMP_LEVELS = 6
+
+SPI_CMD_ABS_REF = 1
+SPI_CMD_WHEEL_SPEEDS = 2
+SPI_CMD_PRESSURES = 3
+
+SPI_VALUE_SCALE = 100  # signals have 2 decimals, sent as fixed point integers
+SPI_VALUE_DTYPE = '>u2'
+
+
+class FrameField:
+    """FrameField
+
+        Signal carried by a frame payload, as fixed point integer.
+    """
+    def __init__(self, signal, scale=SPI_VALUE_SCALE, dtype=SPI_VALUE_DTYPE):
+        """
+
+        :param signal: signal name
+        :param scale: value is multiplied by scale and rounded before being sent
+        :param dtype: numpy integer dtype, including byte order
+        """
+        self.signal = signal
+        self.scale = scale
+        self.dtype = numpy.dtype(dtype)
+        if self.dtype.kind not in 'iu':
+            raise ValueError('Frame field <{}> integer dtype expected! Got {} instead!'.format(signal, self.dtype))
+
+
+class FrameLayout:
+    """FrameLayout
+
+        One SPI command per tick, its payload being the fields packed back to back.
+    """
+    def __init__(self, cmd_id, fields):
+        """
+
+        :param cmd_id: command's ID in range [0, 31]
+        :param fields: payload fields, in order
+        """
+        if not 0 <= cmd_id <= MAX_CMD_ID:
+            raise ValueError('Invalid SPI command ID [{}]! Expected range is [0, {}]!'.format(cmd_id, MAX_CMD_ID))
+
+        self.cmd_id = cmd_id
+        self.fields = list(fields)
+        self.payload_length = sum(field.dtype.itemsize for field in self.fields)
+
+        # frame skeleton is built once by the reference encoder, so header, length byte and padding match it exactly
+        self.template = numpy.array(build_spi_command(cmd_id, [0] * self.payload_length), dtype=numpy.uint8)
+        if self.payload_length > MAX_SHORT_PAYLOAD_LENGTH:
+            self.payload_offset = len(self.template) - self.payload_length
+        else:
+            self.payload_offset = 1
+
+    @property
+    def frame_length(self):
+        return len(self.template)
+
+
+DEFAULT_FRAME_LAYOUTS = (
+    FrameLayout(SPI_CMD_ABS_REF, [FrameField(SIGNAL_ABS_REF)]),
+    FrameLayout(SPI_CMD_WHEEL_SPEEDS, [FrameField(SIGNAL_FL_VEL), FrameField(SIGNAL_FR_VEL),
+                                       FrameField(SIGNAL_RL_VEL), FrameField(SIGNAL_RR_VEL)]),
+    FrameLayout(SPI_CMD_PRESSURES, [FrameField(SIGNAL_FL_PRES), FrameField(SIGNAL_FR_PRES),
+                                    FrameField(SIGNAL_RL_PRES), FrameField(SIGNAL_RR_PRES)]),
+)
+
+
+class SpiFrameBuffer:
+    """SpiFrameBuffer
+
+        Encoded frames of a whole profile: one contiguous byte buffer plus an offset index.
+        Frames are stored tick after tick, each tick holding one frame per layout, in layouts order.
+    """
+    def __init__(self, data, offsets, frames_per_tick):
+        """
+
+        :param data: frames bytes
+        :type data: numpy.ndarray
+        :param offsets: start offset of every frame within data, followed by the data length
+        :type offsets: numpy.ndarray
+        :param frames_per_tick: number of frames sent each tick
+        :type frames_per_tick: int
+        """
+        self.data = data
+        self.offsets = offsets
+        self.frames_per_tick = frames_per_tick
+
+    @property
+    def ticks(self):
+        return (len(self.offsets) - 1) // self.frames_per_tick if self.frames_per_tick else 0
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def frame(self, index):
+        """frame
+
+        :param index: frame index
+        :type index: int
+        :return: frame bytes, view on the buffer
+        :rtype: memoryview
+        """
+        return memoryview(self.data)[self.offsets[index]:self.offsets[index + 1]]
+
+    def tick(self, tick):
+        """tick
+
+        :param tick: tick index
+        :type tick: int
+        :return: bytes of every frame sent on tick, view on the buffer
+        :rtype: memoryview
+        """
+        first = tick * self.frames_per_tick
+        return memoryview(self.data)[self.offsets[first]:self.offsets[first + self.frames_per_tick]]
+
+
+def encode_frames(signals, layouts=DEFAULT_FRAME_LAYOUTS, indexes=None):
+    """encode_frames
+
+        Encode every tick of a profile at once: each field is scaled, saturated to its dtype range and written into
+        a column of a 2-D (ticks, tick bytes) array, so no Python object is built per frame.
+    :param signals: prepared signals by name, e.g. SignalStore
+    :type signals: dict or SignalStore
+    :param layouts: frames sent each tick
+    :type layouts: tuple of FrameLayout
+    :param indexes: sample index of every tick, all samples by default
+    :type indexes: numpy.ndarray
+    :return: encoded frames
+    :rtype: SpiFrameBuffer
+    """
+    if indexes is None:
+        indexes = numpy.arange(len(signals[layouts[0].fields[0].signal]) if layouts and layouts[0].fields else 0)
+    indexes = numpy.asarray(indexes, dtype=numpy.int64)
+
+    ticks = len(indexes)
+    frame_starts = numpy.cumsum([0] + [layout.frame_length for layout in layouts])
+    tick_length = int(frame_starts[-1])
+
+    frames = numpy.empty((ticks, tick_length), dtype=numpy.uint8)
+    for layout, frame_start in zip(layouts, frame_starts):
+        frames[:, frame_start:frame_start + layout.frame_length] = layout.template
+
+        column = frame_start + layout.payload_offset
+        for field in layout.fields:
+            limits = numpy.iinfo(field.dtype)
+            values = numpy.round(numpy.asarray(signals[field.signal], dtype=numpy.float64)[indexes] * field.scale)
+            values = numpy.clip(values, limits.min, limits.max).astype(field.dtype)
+            frames[:, column:column + field.dtype.itemsize] = values.view(numpy.uint8).reshape(ticks,
+                                                                                              field.dtype.itemsize)
+            column += field.dtype.itemsize
+
+    offsets = numpy.empty(ticks * len(layouts) + 1, dtype=numpy.int64)
+    offsets[:-1] = (numpy.arange(ticks, dtype=numpy.int64)[:, None] * tick_length + frame_starts[:-1]).ravel()
+    offsets[-1] = ticks * tick_length
+
+    return SpiFrameBuffer(frames.reshape(-1), offsets, len(layouts))
+
+
+def get_tick_indexes(stamps, index_growth):
+    """get_tick_indexes
+
+        Sample indexes the simulation engine plays, one per tick.
+    :param stamps: number of samples
+    :type stamps: int
+    :param index_growth: samples advanced per tick
+    :type index_growth: int
+    :return: sample indexes
+    :rtype: numpy.ndarray
+    """
+    return numpy.arange(index_growth, stamps, index_growth, dtype=numpy.int64)
+
+
+class SpiFrames:
+    """SpiFrames
+
+        Frames decoded from a byte stream, as parallel arrays. Payloads are views on the stream.
+        Short frames payloads include their dummy padding bytes, the protocol does not tell them apart from data.
+    """
+    def __init__(self, data, offsets, cmd_ids, extended, payload_offsets, payload_lengths, truncated):
+        """
+
+        :param data: decoded byte stream
+        :param offsets: frames start offsets
+        :param cmd_ids: frames command IDs
+        :param extended: frames extended flags
+        :param payload_offsets: payloads start offsets
+        :param payload_lengths: payloads lengths
+        :param truncated: number of trailing bytes not holding a whole frame
+        """
+        self.data = data
+        self.offsets = offsets
+        self.cmd_ids = cmd_ids
+        self.extended = extended
+        self.payload_offsets = payload_offsets
+        self.payload_lengths = payload_lengths
+        self.truncated = truncated
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def payload(self, index):
+        """payload
+
+        :param index: frame index
+        :type index: int
+        :return: frame payload, view on the stream
+        :rtype: memoryview
+        """
+        start = self.payload_offsets[index]
+        return memoryview(self.data)[start:start + self.payload_lengths[index]]
+
+    def payload_matrix(self, cmd_id):
+        """payload_matrix
+
+            Gather the payloads of every frame of a command, all of the same length, at once.
+        :param cmd_id: command's ID
+        :type cmd_id: int
+        :return: payloads, one row per frame
+        :rtype: numpy.ndarray
+        """
+        selected = numpy.flatnonzero(self.cmd_ids == cmd_id)
+        lengths = numpy.unique(self.payload_lengths[selected])
+        if len(lengths) > 1:
+            raise ValueError('SPI command {} payloads have different lengths: {}!'.format(cmd_id, lengths.tolist()))
+
+        length = int(lengths[0]) if len(lengths) else 0
+        return self.data[self.payload_offsets[selected][:, None] + numpy.arange(length)]
+
+
+def decode_frames(data):
+    """decode_frames
+
+        Split a byte stream into frames. Frame length is computed at once for every byte position, as if a frame
+        started there. Following the chain of frame starts from offset 0 is the only serial part: positions
+        2 ** DECODER_JUMP_LEVELS frames apart are found by pointer jumping, the frames in between are filled in by
+        vectorized steps.
+    :param data: byte stream, starting on a frame boundary
+    :type data: bytes or bytearray or numpy.ndarray
+    :return: decoded frames
+    :rtype: SpiFrames
+    """
+    data = numpy.frombuffer(data, dtype=numpy.uint8) if not isinstance(data, numpy.ndarray) else data
+    size = len(data)
+
+    header = data.astype(numpy.int64)
+    extended = (header >> 2) & 1
+    n = header & 0b11
+    length_byte = numpy.zeros(size, dtype=numpy.int64)
+    length_byte[:-1] = header[1:]
+    # extended frames: 10 bits field holds data bytes + 1, frame is header + length byte + data bytes
+    length_field = (n << 8) | length_byte
+    length_field[length_field == 0] = EXTENDED_LENGTH_MODULO
+    frame_lengths = numpy.where(extended == 1, length_field + 1, 1 << n)
+
+    # next frame start for every position, positions past the end collapse onto size
+    following = numpy.empty(size + 1, dtype=numpy.int64)
+    numpy.minimum(numpy.arange(size, dtype=numpy.int64) + frame_lengths, size, out=following[:-1])
+    following[-1] = size
+
+    jump = following
+    for _ in range(DECODER_JUMP_LEVELS):
+        jump = jump[jump]
+
+    coarse = []
+    position = 0
+    while position < size:
+        coarse.append(position)
+        position = int(jump[position])
+
+    steps = [numpy.array(coarse, dtype=numpy.int64)]
+    for _ in range((1 << DECODER_JUMP_LEVELS) - 1):
+        steps.append(following[steps[-1]])
+    offsets = numpy.stack(steps, axis=1).ravel()
+    offsets = offsets[offsets < size]
+
+    ends = offsets + frame_lengths[offsets]
+    truncated = 0
+    if len(offsets) and ends[-1] > size:
+        truncated = int(size - offsets[-1])
+        offsets = offsets[:-1]
+
+    headers = header[offsets]
+    frames_extended = extended[offsets] == 1
+    payload_lengths = numpy.where(frames_extended, length_field[offsets] - 1, frame_lengths[offsets] - 1)
+
+    return SpiFrames(data, offsets, (headers >> 3).astype(numpy.uint8), frames_extended,
+                     offsets + numpy.where(frames_extended, 2, 1), payload_lengths, truncated)
+
+
+def verify_round_trip(seed=0, max_data_length=SPI_MAX_DATA_LENGTH):
+    """verify_round_trip
+
+        Encode every command ID with every data length up to max_data_length, random data and shuffled frame order,
+        into a single stream and check decoding gives every frame back. Batch encoded profile frames are checked
+        against their signals as well.
+    :param seed: random data and frames order seed
+    :type seed: int
+    :param max_data_length: longest data checked
+    :type max_data_length: int
+    :return: failures description, empty if round trip holds
+    :rtype: list of str
+    """
+    failures = []
+    generator = numpy.random.RandomState(seed)
+
+    cases = [(cmd_id, length) for cmd_id in range(MAX_CMD_ID + 1) for length in range(max_data_length + 1)]
+    cases = [cases[index] for index in generator.permutation(len(cases))]
+    payloads = [generator.randint(0, 256, length).astype(numpy.uint8) for _, length in cases]
+
+    stream = bytearray()
+    for (cmd_id, _), payload in zip(cases, payloads):
+        stream.extend(build_spi_command(cmd_id, payload.tolist()))
+
+    frames = decode_frames(bytes(stream))
+    if len(frames) != len(cases) or frames.truncated:
+        return ['{} frames decoded ({} truncated bytes), {} encoded'.format(len(frames), frames.truncated,
+                                                                            len(cases))]
+
+    for index, ((cmd_id, length), payload) in enumerate(zip(cases, payloads)):
+        decoded = numpy.frombuffer(frames.payload(index), dtype=numpy.uint8)
+        padding = decoded[length:]
+        if (frames.cmd_ids[index] != cmd_id or not numpy.array_equal(decoded[:length], payload) or
+                bool(frames.extended[index]) != (length > MAX_SHORT_PAYLOAD_LENGTH) or padding.any() or
+                (frames.extended[index] and len(padding))):
+            failures.append('Command {} with {} data bytes not preserved'.format(cmd_id, length))
+
+    # a truncated stream keeps every whole frame
+    cut = decode_frames(bytes(stream[:-1]))
+    if len(cut) != len(cases) - 1 or not cut.truncated:
+        failures.append('Truncated stream: {} frames decoded, {} expected'.format(len(cut), len(cases) - 1))
+
+    try:
+        build_spi_command(0, [0] * (max_data_length + 1))
+        if max_data_length == SPI_MAX_DATA_LENGTH:
+            failures.append('{} data bytes accepted, not representable'.format(max_data_length + 1))
+    except ValueError:
+        pass
+
+    # batch encoder output decodes to its fixed point signal values
+    ticks = 1000
+    signals = {field.signal: generator.randint(0, 30000, ticks) / 100.
+               for layout in DEFAULT_FRAME_LAYOUTS for field in layout.fields}
+    frames = decode_frames(encode_frames(signals).data)
+    for layout in DEFAULT_FRAME_LAYOUTS:
+        payloads = frames.payload_matrix(layout.cmd_id)
+        column = 0
+        for field in layout.fields:
+            raw = payloads[:, column:column + field.dtype.itemsize].copy().view(field.dtype).ravel()
+            column += field.dtype.itemsize
+            if not numpy.array_equal(raw / field.scale, signals[field.signal]):
+                failures.append('Batch encoded <{}> not preserved'.format(field.signal))
+
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Verify SPI frames round trip or decode a captured SPI stream.')
+    parser.add_argument('--capture', help='captured SPI byte stream file to be decoded instead')
+    parser.add_argument('--seed', type=int, default=0, help='round trip random data seed')
+    arguments = parser.parse_args()
+
+    if arguments.capture:
+        with open(arguments.capture, 'rb') as capture_file:
+            captured_frames = decode_frames(capture_file.read())
+        for captured_cmd_id, count in zip(*numpy.unique(captured_frames.cmd_ids, return_counts=True)):
+            LOGGER.info('Command {}: {} frames'.format(captured_cmd_id, count))
+        LOGGER.info('{} frames, {} truncated bytes'.format(len(captured_frames), captured_frames.truncated))
+        sys.exit(1 if captured_frames.truncated else 0)
+
+    round_trip_failures = verify_round_trip(arguments.seed)
+    for failure in round_trip_failures:
+        LOGGER.error(failure)
+    LOGGER.info('SPI round trip: {}'.format('{} failures'.format(len(round_trip_failures))
+                                            if round_trip_failures else 'OK'))
+    sys.exit(1 if round_trip_failures else 0)
@@ -0,0 +1,224 @@
+import numpy
+
+
+from car_sim_etti.utils.generic import (
+    SIGNAL_FL_VEL,
+    SIGNAL_FR_VEL,
+    SIGNAL_RL_VEL,
+    SIGNAL_RR_VEL,
+
+    SIGNAL_FL_PRES,
+    SIGNAL_FR_PRES,
+    SIGNAL_RL_PRES,
+    SIGNAL_RR_PRES,
+)
+
+
+WSS_FAULT_NONE = 'none'
+WSS_FAULT_GND = 'gnd'
+WSS_FAULT_VCC = 'vcc'
+WSS_FAULT_OPEN = 'open'
+
+WSS_FAULT_TYPES = (WSS_FAULT_GND, WSS_FAULT_VCC, WSS_FAULT_OPEN)
+
+WHEEL_FL = 'fl'
+WHEEL_FR = 'fr'
+WHEEL_RL = 'rl'
+WHEEL_RR = 'rr'
+
+WHEELS = (WHEEL_FL, WHEEL_FR, WHEEL_RL, WHEEL_RR)
+
+WHEEL_SPEED_SIGNALS = {
+    WHEEL_FL: SIGNAL_FL_VEL,
+    WHEEL_FR: SIGNAL_FR_VEL,
+    WHEEL_RL: SIGNAL_RL_VEL,
+    WHEEL_RR: SIGNAL_RR_VEL,
+}
+
+# a faulty wheel speed sensor makes the brake system limit the whole axle pressure
+AXLE_PRESSURE_SIGNALS = {
+    WHEEL_FL: (SIGNAL_FL_PRES, SIGNAL_FR_PRES),
+    WHEEL_FR: (SIGNAL_FL_PRES, SIGNAL_FR_PRES),
+    WHEEL_RL: (SIGNAL_RL_PRES, SIGNAL_RR_PRES),
+    WHEEL_RR: (SIGNAL_RL_PRES, SIGNAL_RR_PRES),
+}
+
+AXLE_PRESSURE_THRESHOLD = 5  # bars, axle pressure is limited only while braking
+AXLE_PRESSURE_LIMIT = 39.5  # bars
+
+
+def __gnd_speed__(rng, count):
+    return numpy.round(rng.integers(0, 169, count) / 100, 2)
+
+
+def __vcc_speed__(rng, count):
+    return numpy.round(253 + rng.integers(0, 20, count) / 10, 2)
+
+
+def __open_speed__(rng, count):
+    return (10 + rng.integers(0, 235, count)).astype(numpy.float64)
+
+
+# wheel speed reported by a faulty sensor, by fault type
+FAULT_SPEED_GENERATORS = {
+    WSS_FAULT_GND: __gnd_speed__,
+    WSS_FAULT_VCC: __vcc_speed__,
+    WSS_FAULT_OPEN: __open_speed__,
+}
+
+
+class WssFault:
+    """WssFault
+
+        Wheel speed sensor fault on one wheel.
+    """
+    def __init__(self, wheel, kind, onset=0., clear=None, period=None, duty=0.5):
+        """
+
+        :param wheel: faulty wheel, one of WHEELS
+        :param kind: fault type, one of WSS_FAULT_TYPES
+        :param onset: fault start, in seconds from profile start
+        :param clear: fault end, in seconds from profile start, None if fault is never cleared
+        :param period: intermittent fault period in seconds, None for a permanent fault
+        :param duty: fraction of the intermittent fault period the fault is active
+        """
+        if wheel not in WHEELS:
+            raise ValueError('Unknown wheel [{}]! Supported wheels are: {}!'.format(wheel, WHEELS))
+        if kind not in WSS_FAULT_TYPES:
+            raise ValueError('Unknown WSS fault [{}]! Supported faults are: {}!'.format(kind, WSS_FAULT_TYPES))
+
+        self.wheel = wheel
+        self.kind = kind
+        self.onset = onset
+        self.clear = clear
+        self.period = period
+        self.duty = duty
+
+    def key(self):
+        """key
+
+        :return: hashable fault description
+        :rtype: tuple
+        """
+        return self.wheel, self.kind, self.onset, self.clear, self.period, self.duty
+
+    def active_mask(self, stamps, sampling_period):
+        """active_mask
+
+        :param stamps: number of samples
+        :type stamps: int
+        :param sampling_period: sampling period in seconds
+        :type sampling_period: float
+        :return: samples the fault is active on
+        :rtype: numpy.ndarray
+        """
+        time = numpy.arange(stamps) * sampling_period
+        active = time >= self.onset
+        if self.clear is not None:
+            active &= time < self.clear
+        if self.period:
+            active &= numpy.mod(time - self.onset, self.period) < self.duty * self.period
+        return active
+
+    def __repr__(self):
+        description = '{}_{}'.format(self.kind, self.wheel)
+        if self.onset or self.clear is not None:
+            description += '@{}-{}'.format(self.onset, '' if self.clear is None else self.clear)
+        if self.period:
+            description += '~{}/{}'.format(self.period, self.duty)
+        return description
+
+
+def __fault_order__(fault):
+    """__fault_order__
+
+        Sort key of a fault. Unset (None) fields of its key sort last, as None does not compare to numbers.
+    :param fault: simulated fault
+    :type fault: WssFault
+    :return: comparable fault description
+    :rtype: tuple
+    """
+    return tuple((value is None, 0. if value is None else value) for value in fault.key())
+
+
+class WssFaultSet:
+    """WssFaultSet
+
+        Wheel speed sensor faults simulated at the same time.
+    """
+    def __init__(self, faults=()):
+        """
+
+        :param faults: simulated faults
+        :type faults: iterable of WssFault
+        """
+        # kept in key order: faults draw from one shared random generator, so application order matches the key
+        self.faults = sorted(faults, key=__fault_order__)
+
+    def __iter__(self):
+        return iter(self.faults)
+
+    def __len__(self):
+        return len(self.faults)
+
+    def __bool__(self):
+        return bool(self.faults)
+
+    def key(self):
+        """key
+
+        :return: hashable fault set description
+        :rtype: tuple
+        """
+        return tuple(fault.key() for fault in self.faults)
+
+    def __repr__(self):
+        if not self.faults:
+            return WSS_FAULT_NONE
+        return ','.join(repr(fault) for fault in self.faults)
+
+
+def parse_wss_faults(description):
+    """parse_wss_faults
+
+        Build fault set from a description such as 'gnd_fl,vcc_rr' or 'none'.
+    :param description: comma separated {fault type}_{wheel} items
+    :type description: str
+    :return: fault set
+    :rtype: WssFaultSet
+    """
+    faults = []
+    for item in description.split(','):
+        item = item.strip()
+        if not item or item == WSS_FAULT_NONE:
+            continue
+        kind, wheel = item.split('_')
+        faults.append(WssFault(wheel, kind))
+    return WssFaultSet(faults)
+
+
+def apply_wss_faults(signals, faults, sampling_period, rng):
+    """apply_wss_faults
+
+        Simulate wheel speed sensor faults, each one in a single pass over the signals.
+    :param signals: signals by name, as arrays, altered in place
+    :type signals: dict
+    :param faults: simulated faults
+    :type faults: WssFaultSet
+    :param sampling_period: sampling period in seconds
+    :type sampling_period: float
+    :param rng: random generator, seeded for reproducible faults
+    :type rng: numpy.random.Generator
+    :return: None
+    """
+    for fault in faults:
+        wheel_vel = signals[WHEEL_SPEED_SIGNALS[fault.wheel]]
+        active = fault.active_mask(len(wheel_vel), sampling_period)
+
+        wheel_vel[active] = FAULT_SPEED_GENERATORS[fault.kind](rng, numpy.count_nonzero(active))
+
+        left_pres, right_pres = (signals[signal_name] for signal_name in AXLE_PRESSURE_SIGNALS[fault.wheel])
+        limited = active & (left_pres > AXLE_PRESSURE_THRESHOLD)
+        count = numpy.count_nonzero(limited)
+        left_pres[limited] = numpy.round(AXLE_PRESSURE_LIMIT + rng.integers(0, 11, count) / 10, 2)
+        right_pres[limited] = numpy.round(AXLE_PRESSURE_LIMIT + rng.integers(0, 9, count) / 10, 2)